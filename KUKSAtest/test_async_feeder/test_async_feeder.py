@@ -0,0 +1,241 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import asyncio
+import os
+import unittest.mock as mock
+
+from typing import Any, Dict, List, Tuple
+
+import can  # type: ignore
+import pytest  # type: ignore
+
+import kuksa_client.grpc  # type: ignore
+
+from kuksa_client.grpc import DataType, EntryUpdate, Metadata  # type: ignore
+
+from dbcfeederlib.asynccanreader import AsyncCanReader
+from dbcfeederlib import asyncfeeder
+from dbcfeederlib.asyncfeeder import AsyncFeeder
+from dbcfeederlib.dbc2vssmapper import Mapper, VSSObservation
+from dbcfeederlib.observationqueue import InlineDispatcher
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+dbc_file_name = test_path + "/../test_dbc/test1_1.dbc"
+mapping_file_name = test_path + "/../test_frame_dispatch/mapping.json"
+
+
+# data types of the VSS Data Entries in the mapping file, all others are floats
+data_types = {
+    "A.CellSignalBars": DataType.STRING,
+    "A.CellSignalBarsCount": DataType.UINT8,
+    "A.FactoryReset": DataType.UINT8,
+    "A.CpuTemperature": DataType.INT8,
+}
+
+
+class FakeVSSClient:
+    """Records the updates sent by the feeder and stops it after the first request."""
+
+    def __init__(self, feeder_stopper):
+        self.updates: List[List[EntryUpdate]] = []
+        self.feeder_stopper = feeder_stopper
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+    async def get_metadata(self, paths, **rpc_kwargs) -> Dict[str, Metadata]:
+        return {path: Metadata(data_type=data_types.get(path, DataType.FLOAT)) for path in paths}
+
+    async def set(self, updates, **rpc_kwargs):
+        self.updates.append(updates)
+        self.feeder_stopper()
+
+
+class FakeClientWrapper:
+
+    def __init__(self, max_in_flight: int = 1):
+        self.client: Any = None
+        self.max_in_flight = max_in_flight
+
+    def get_rpc_kwargs(self) -> Dict[str, Any]:
+        return {}
+
+    def get_max_in_flight(self) -> int:
+        return self.max_in_flight
+
+    def create_async_client(self):
+        return self.client
+
+
+class BlockingVSSClient:
+    """Records the values of the set requests, which complete once their future's result has been set."""
+
+    def __init__(self):
+        self.requests: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+
+    async def set(self, updates, **rpc_kwargs):
+        completed = asyncio.get_running_loop().create_future()
+        self.requests.append(({update.entry.path: update.entry.value.value for update in updates}, completed))
+        await completed
+
+
+@pytest.fixture
+def dump_file(tmp_path):
+    dump_file = tmp_path / "candump.log"
+    dump_file.write_text("(1690000000.000000) vcan0 00C#00C00000000C0007\n")
+    return str(dump_file)
+
+
+def test_async_reader_processes_messages_in_event_loop():
+    mapper = Mapper(mapping_file_name, [dbc_file_name])
+
+    async def receive() -> List[VSSObservation]:
+        loop = asyncio.get_running_loop()
+        received = loop.create_future()
+        observations: List[VSSObservation] = []
+
+        def handle(observation: VSSObservation):
+            observations.append(observation)
+            if observation.vss_name == "A.CpuTemperature" and not received.done():
+                received.set_result(loop)
+
+        reader = AsyncCanReader(InlineDispatcher(handle), mapper, "async_reader_test", False)
+        reader._can_kwargs["interface"] = "virtual"
+        reader.start()
+        with can.Bus(interface="virtual", channel="async_reader_test") as bus:
+            bus.send(can.Message(arbitration_id=0x00C, is_extended_id=False,
+                                 data=bytes([0x00, 0xC0, 0x00, 0x00, 0x00, 0x0C, 0x00, 0x07])))
+            await asyncio.wait_for(received, timeout=5)
+        reader.stop()
+        return observations
+
+    observations = asyncio.run(receive())
+    assert {observation.vss_name: observation.raw_value for observation in observations}["A.CpuTemperature"] == 47
+
+
+def test_async_feeder_sends_transformed_values(dump_file: str):
+    wrapper = FakeClientWrapper()
+    feeder = AsyncFeeder(wrapper, dbc2vss=True, vss2dbc=False)  # type: ignore[arg-type]
+    wrapper.client = FakeVSSClient(feeder.stop)
+
+    asyncio.run(asyncio.wait_for(feeder.run(
+        canport="async_feeder_test",
+        can_fd=False,
+        dbc_file_names=[dbc_file_name],
+        mappingfile=mapping_file_name,
+        dbc_default_file=None,
+        candumpfile=dump_file), timeout=10))
+
+    assert not feeder.is_running()
+    assert len(wrapper.client.updates) == 1
+    values = {update.entry.path: update.entry.value.value for update in wrapper.client.updates[0]}
+    assert values["A.CpuTemperature"] == 47
+    assert values["A.FactoryReset"] == 2
+    assert values["A.CellSignalBars"] == "THREE"
+
+
+def test_async_feeder_keeps_values_of_entry_in_order_while_requests_are_in_flight():
+    feeder = AsyncFeeder(FakeClientWrapper(max_in_flight=2), dbc2vss=True, vss2dbc=False)  # type: ignore[arg-type]
+    client = BlockingVSSClient()
+
+    async def send() -> List[Dict[str, Any]]:
+        feeder._values_pending = asyncio.Event()
+        feeder._templates = {name: (float, Metadata(data_type=DataType.FLOAT)) for name in ["A", "B", "C"]}
+        writer = asyncio.create_task(feeder._run_writer(client))  # type: ignore[arg-type]
+
+        async def process(**values):
+            feeder._pending_values.update(values)
+            feeder._values_pending.set()
+            for _ in range(5):
+                await asyncio.sleep(0)
+
+        await process(A=1)
+        # A is in flight, so its next value waits for the first request to complete
+        await process(A=2, B=1)
+        await process(C=1)
+        assert [values for values, _ in client.requests] == [{"A": 1.0}, {"B": 1.0}]
+        client.requests[0][1].set_result(None)
+        await process()
+        assert len(client.requests) == 3
+        for _, completed in client.requests[1:]:
+            completed.set_result(None)
+        await process()
+        writer.cancel()
+        await asyncio.gather(writer, return_exceptions=True)
+        return [values for values, _ in client.requests]
+
+    assert asyncio.run(send()) == [{"A": 1.0}, {"B": 1.0}, {"A": 2.0, "C": 1.0}]
+    assert feeder._values_sent == 4
+
+
+class InterruptedVSSClient:
+    """Interrupts the first subscription like a restarting databroker does."""
+
+    def __init__(self):
+        self.subscriptions = 0
+
+    async def subscribe(self, entries, **rpc_kwargs):
+        self.subscriptions += 1
+        if self.subscriptions == 1:
+            raise kuksa_client.grpc.VSSClientError({"code": 14, "reason": "unavailable"}, [])
+        yield ["update"]
+        # the subscription stays active
+        await asyncio.Event().wait()
+
+
+def test_async_feeder_subscribes_again_after_interruption():
+    feeder = AsyncFeeder(FakeClientWrapper(), dbc2vss=False, vss2dbc=True)  # type: ignore[arg-type]
+    feeder._mapper = Mapper(mapping_file_name, [dbc_file_name])
+    client = InterruptedVSSClient()
+
+    async def subscribe() -> List[Any]:
+        received: asyncio.Future = asyncio.get_running_loop().create_future()
+        with mock.patch.object(asyncfeeder, "_RESUBSCRIBE_DELAY", 0), \
+                mock.patch.object(feeder, "_vss_update", received.set_result):
+            subscriber = asyncio.create_task(feeder._run_subscriber(client))  # type: ignore[arg-type]
+            updates = await asyncio.wait_for(received, timeout=5)
+            subscriber.cancel()
+            await asyncio.gather(subscriber, return_exceptions=True)
+        return updates
+
+    assert asyncio.run(subscribe()) == ["update"]
+    assert client.subscriptions == 2
+
+
+def test_async_feeder_stops_if_task_fails():
+    feeder = AsyncFeeder(FakeClientWrapper(), dbc2vss=True, vss2dbc=False)  # type: ignore[arg-type]
+
+    async def fail():
+        raise RuntimeError("unexpected")
+
+    async def run_failing_task():
+        feeder._running = True
+        feeder._loop = asyncio.get_running_loop()
+        feeder._stopped = asyncio.Event()
+        task = asyncio.create_task(fail(), name="writer")
+        task.add_done_callback(feeder._task_done)
+        await asyncio.wait_for(feeder._stopped.wait(), timeout=5)
+
+    asyncio.run(run_failing_task())
+    assert not feeder.is_running()
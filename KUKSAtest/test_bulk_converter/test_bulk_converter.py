@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import json
+import os
+
+import cantools.database  # type: ignore
+import pytest  # type: ignore
+
+from dbcfeederlib.bulkconverter import BulkConverter
+from dbcfeederlib.outputwriter import OutputFormat, OutputWriter
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+mapping_path = test_path + "/../test_frame_dispatch/mapping.json"
+dbc_file_names = [test_path + "/../test_dbc/test1_1.dbc"]
+database = cantools.database.load_file(dbc_file_names[0], strict=False)
+
+START_TIME = 1700000000.0
+
+
+def encode(frame_id: int, **signal_values) -> bytes:
+    message = database.get_message_by_frame_id(frame_id)
+    values = {signal.name: 0 for signal in message.signals}
+    values.update(signal_values)
+    return message.encode(values, strict=False)
+
+
+def write_dump(file_name: str, first: int, count: int):
+    # UI_status (0x00C) every 10 ms, UI_tripPlanning (0x082) every 20 ms
+    with open(file_name, "w", encoding="utf-8") as file:
+        for number in range(first, first + count):
+            timestamp = START_TIME + number * 0.01
+            payload = encode(12, UI_cellSignalBars=(number // 50) % 6, UI_cpuTemperature=number % 50)
+            file.write(f"({timestamp:.6f}) vcan0 00C#{payload.hex().upper()}\n")
+            if number % 2 == 0:
+                payload = encode(130, UI_predictedEnergy=(number % 100) / 10)
+                file.write(f"({timestamp + 0.005:.6f}) vcan0 082#{payload.hex().upper()}\n")
+
+
+def convert(tmp_path, dump_files, **kwargs) -> list:
+    file_name = str(tmp_path / "out.jsonl")
+    if os.path.exists(file_name):
+        os.remove(file_name)
+    output = OutputWriter(file_name, OutputFormat.JSONL, block=True, max_buffered=100)
+    output.start()
+    BulkConverter(mapping_path, dbc_file_names, **kwargs).convert(dump_files, output)
+    output.stop()
+    with open(file_name, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+@pytest.fixture
+def dump_file(tmp_path) -> str:
+    file_name = str(tmp_path / "drive.log")
+    write_dump(file_name, 0, 500)
+    return file_name
+
+
+def test_conditions_are_evaluated_on_recorded_timestamps(tmp_path, dump_file):
+    values = convert(tmp_path, [dump_file], jobs=1)
+    times = [value["time"] for value in values]
+    assert times == sorted(times)
+
+    # interval_ms 1000: one value per second of recorded time, starting with the first value
+    temperatures = [value for value in values if value["path"] == "A.CpuTemperature"]
+    assert [value["time"] for value in temperatures] == pytest.approx(
+        [START_TIME, START_TIME + 1.0, START_TIME + 2.0, START_TIME + 3.0, START_TIME + 4.0])
+    assert [value["value"] for value in temperatures] == [0, 0, 0, 0, 0]
+
+    # on_change: only changed values
+    bars = [value for value in values if value["path"] == "A.CellSignalBarsCount"]
+    assert [value["value"] for value in bars] == [0, 1, 2, 3, 4, 5, 0, 1, 2, 3]
+
+    # neither interval nor on_change: every value
+    energies = [value for value in values if value["path"] == "A.PredictedEnergy"]
+    assert len(energies) == 250
+    assert energies[1]["value"] == pytest.approx(200)
+
+
+def test_chunks_converted_in_parallel_yield_same_values(tmp_path, dump_file):
+    expected = convert(tmp_path, [dump_file], jobs=1)
+    assert convert(tmp_path, [dump_file], jobs=3, chunk_size=1000) == expected
+
+
+def test_files_are_merged_by_timestamp(tmp_path, dump_file):
+    expected = convert(tmp_path, [dump_file], jobs=1)
+    first = str(tmp_path / "first.log")
+    second = str(tmp_path / "second.log")
+    write_dump(first, 0, 250)
+    write_dump(second, 250, 250)
+    assert convert(tmp_path, [second, first], jobs=2) == expected
+
+
+def test_changes_between_overlapping_files_are_kept(tmp_path):
+    # both files contain the same value, which changes in between in the merged recording
+    first = str(tmp_path / "first.log")
+    second = str(tmp_path / "second.log")
+    with open(first, "w", encoding="utf-8") as file:
+        for number, bars in [(0, 1), (2, 1)]:
+            payload = encode(12, UI_cellSignalBars=bars)
+            file.write(f"({START_TIME + number:.6f}) vcan0 00C#{payload.hex().upper()}\n")
+    with open(second, "w", encoding="utf-8") as file:
+        payload = encode(12, UI_cellSignalBars=2)
+        file.write(f"({START_TIME + 1:.6f}) vcan0 00C#{payload.hex().upper()}\n")
+    values = convert(tmp_path, [first, second], jobs=2)
+    bars = [value["value"] for value in values if value["path"] == "A.CellSignalBarsCount"]
+    assert bars == [1, 2, 1]
+
+
+def test_invalid_chunk_size():
+    with pytest.raises(ValueError):
+        BulkConverter(mapping_path, dbc_file_names, chunk_size=0)
@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import threading
+import unittest.mock as mock
+
+from typing import Dict, List
+
+import kuksa_client.grpc  # type: ignore
+import pytest  # type: ignore
+
+from kuksa_client.grpc import DataType  # type: ignore
+
+from dbcfeederlib.databrokerclientwrapper import DatabrokerClientWrapper
+
+
+def sent_values(grpc_client) -> List[Dict[str, object]]:
+    return [{update.entry.path: update.entry.value.value for update in call.kwargs["updates"]}
+            for call in grpc_client.set.call_args_list]
+
+
+@pytest.fixture
+def grpc_client():
+    with mock.patch("kuksa_client.grpc.VSSClient") as client_class:
+        yield client_class.return_value.__enter__.return_value
+
+
+def start_client(batch_size: int, batch_delay_ms: int) -> DatabrokerClientWrapper:
+    client = DatabrokerClientWrapper()
+    client.set_batching(batch_size, batch_delay_ms)
+    client.start()
+    for name in ["A", "B", "C"]:
+        client._name_to_type[name] = DataType.FLOAT
+    return client
+
+
+def test_values_are_sent_one_by_one_without_batching(grpc_client):
+    client = start_client(1, 10)
+    assert client.update_datapoint("A", 1.0)
+    assert client.update_datapoint("A", 2.0)
+    client.stop()
+    assert sent_values(grpc_client) == [{"A": 1.0}, {"A": 2.0}]
+    assert client.get_statistics()["requests"] == 2
+
+
+def test_full_batch_is_sent_with_latest_values(grpc_client):
+    sent = threading.Event()
+    grpc_client.set.side_effect = lambda **kwargs: sent.set()
+    client = start_client(2, 10000)
+    client.update_datapoint("A", 1.0)
+    client.update_datapoint("A", 2.0)
+    client.update_datapoint("B", 3.0)
+    assert sent.wait(timeout=5)
+    client.stop()
+    assert sent_values(grpc_client) == [{"A": 2.0, "B": 3.0}]
+    statistics = client.get_statistics()
+    assert statistics["coalesced_values"] == 1
+    assert statistics["max_batch_size"] == 2
+
+
+def test_batch_is_sent_after_delay(grpc_client):
+    sent = threading.Event()
+    grpc_client.set.side_effect = lambda **kwargs: sent.set()
+    client = start_client(10, 20)
+    client.update_datapoint("C", 1.0)
+    assert sent.wait(timeout=5)
+    client.stop()
+    assert sent_values(grpc_client) == [{"C": 1.0}]
+
+
+def test_pending_values_are_sent_on_stop(grpc_client):
+    client = start_client(10, 10000)
+    client.update_datapoint("A", 1.0)
+    client.update_datapoint("B", 2.0)
+    client.stop()
+    assert sent_values(grpc_client) == [{"A": 1.0, "B": 2.0}]
+
+
+def test_values_of_failed_batch_are_reported(grpc_client):
+    sent = threading.Event()
+
+    def fail(**kwargs):
+        sent.set()
+        raise kuksa_client.grpc.VSSClientError({"code": 503, "reason": "unavailable"}, [])
+
+    grpc_client.set.side_effect = fail
+    failed = []
+    client = start_client(10, 10000)
+    client.set_failure_callback(lambda name, value, timestamp: failed.append((name, value, timestamp)))
+    assert client.update_datapoint("A", 1.0, 100.0)
+    assert client.update_datapoint("B", 2.0)
+    client.stop()
+    assert sent.is_set()
+    assert sorted(failed) == [("A", 1.0, 100.0), ("B", 2.0, None)]
+
+
+def test_synchronous_update_bypasses_batch(grpc_client):
+    client = start_client(10, 10000)
+    client.update_datapoint("A", 1.0)
+    assert client.update_datapoint_sync("B", 2.0)
+    assert sent_values(grpc_client) == [{"B": 2.0}]
+    client.stop()
+    assert sent_values(grpc_client) == [{"B": 2.0}, {"A": 1.0}]
+
+
+def test_failed_synchronous_update_is_reported(grpc_client):
+    grpc_client.set.side_effect = kuksa_client.grpc.VSSClientError({"code": 503, "reason": "unavailable"}, [])
+    client = start_client(10, 10000)
+    assert not client.update_datapoint_sync("A", 1.0)
+    client.stop()
+
+
+def test_batch_size_must_be_positive():
+    with pytest.raises(ValueError):
+        DatabrokerClientWrapper().set_batching(0, 10)
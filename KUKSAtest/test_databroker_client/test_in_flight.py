@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import threading
+import unittest.mock as mock
+
+import pytest  # type: ignore
+
+import kuksa_client.grpc  # type: ignore
+from kuksa_client.grpc import DataType  # type: ignore
+
+from dbcfeederlib.databrokerclientwrapper import DatabrokerClientWrapper
+
+
+@pytest.fixture
+def grpc_client():
+    with mock.patch("kuksa_client.grpc.VSSClient") as client_class:
+        yield client_class.return_value.__enter__.return_value
+
+
+def start_client(max_in_flight: int, batch_size: int = 1) -> DatabrokerClientWrapper:
+    client = DatabrokerClientWrapper()
+    client.set_max_in_flight(max_in_flight)
+    client.set_batching(batch_size, 10)
+    client.start()
+    for name in ["A", "B", "C"]:
+        client._name_to_type[name] = DataType.FLOAT
+    return client
+
+
+def test_sending_blocks_while_window_is_full(grpc_client):
+    release = threading.Event()
+    grpc_client.set.side_effect = lambda **kwargs: release.wait(timeout=5)
+    client = start_client(2)
+    assert client.update_datapoint("A", 1.0)
+    assert client.update_datapoint("B", 1.0)
+    assert client.get_statistics()["in_flight"] == 2
+
+    third = threading.Thread(target=client.update_datapoint, args=("C", 1.0))
+    third.start()
+    third.join(timeout=0.1)
+    assert third.is_alive()
+
+    release.set()
+    third.join(timeout=5)
+    assert not third.is_alive()
+    client.stop()
+    statistics = client.get_statistics()
+    assert statistics["requests"] == 3
+    assert statistics["in_flight"] == 0
+    assert statistics["max_in_flight"] == 2
+
+
+def test_values_of_same_path_are_sent_in_order(grpc_client):
+    sent = []
+    grpc_client.set.side_effect = lambda updates, **kwargs: sent.append(updates[0].entry.value.value)
+    client = start_client(4)
+    for value in range(100):
+        client.update_datapoint("A", float(value))
+    client.stop()
+    assert sent == [float(value) for value in range(100)]
+
+
+def test_rejected_entries_are_reported_per_path(grpc_client):
+    grpc_client.set.side_effect = kuksa_client.grpc.VSSClientError(
+        error={}, errors=[{"path": "B", "error": {"code": 404, "reason": "not_found"}}])
+    client = start_client(1, batch_size=2)
+    client.update_datapoint("A", 1.0)
+    client.update_datapoint("B", 2.0)
+    client.stop()
+    statistics = client.get_statistics()
+    assert statistics["failed_values"] == 1
+    assert statistics["failed_per_path"] == {"B": 1}
+
+
+def test_failed_entries_are_reported_to_callback(grpc_client):
+    def reject_b(updates, **kwargs):
+        if any(update.entry.path == "B" for update in updates):
+            raise kuksa_client.grpc.VSSClientError(
+                error={}, errors=[{"path": "B", "error": {"code": 404, "reason": "not_found"}}])
+
+    grpc_client.set.side_effect = reject_b
+    failed = []
+    client = start_client(4)
+    client.set_failure_callback(lambda name, value, timestamp: failed.append((name, value, timestamp)))
+    assert client.update_datapoint("A", 1.0, 100.0)
+    assert client.update_datapoint("B", 2.0, 101.0)
+    client.stop()
+    assert failed == [("B", 2.0, 101.0)]
+
+
+def test_values_of_failed_requests_are_reported_to_callback(grpc_client):
+    grpc_client.set.side_effect = RuntimeError("channel closed")
+    failed = []
+    client = start_client(2, batch_size=2)
+    client.set_failure_callback(lambda name, value, timestamp: failed.append((name, value, timestamp)))
+    client.update_datapoint("A", 1.0, 100.0)
+    client.update_datapoint("C", 3.0, 102.0)
+    client.stop()
+    assert sorted(failed) == [("A", 1.0, 100.0), ("C", 3.0, 102.0)]
+
+
+def test_max_in_flight_must_be_positive():
+    with pytest.raises(ValueError):
+        DatabrokerClientWrapper().set_max_in_flight(0)
@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import asyncio
+import unittest.mock as mock
+
+import grpc  # type: ignore
+import pytest  # type: ignore
+
+import kuksa_client.grpc  # type: ignore
+
+from dbcfeederlib import databrokerclientwrapper
+from dbcfeederlib.databrokerclientwrapper import DatabrokerClientWrapper
+
+
+@pytest.fixture
+def client_class():
+    with mock.patch("kuksa_client.grpc.VSSClient") as client_class:
+        yield client_class
+
+
+def interrupted_stream(updates):
+    yield updates
+    raise kuksa_client.grpc.VSSClientError(error={"code": 14, "reason": "unavailable"}, errors=[])
+
+
+def test_subscription_shares_channel_and_is_renewed(client_class):
+    grpc_client = client_class.return_value.__enter__.return_value
+    streams = [interrupted_stream(["first"]), iter([["second"]])]
+    grpc_client.subscribe.side_effect = lambda *args, **kwargs: streams.pop(0) if streams else iter([])
+    client = DatabrokerClientWrapper()
+    client.start()
+    on_connectivity_change = grpc_client.channel.subscribe.call_args.args[0]
+    on_connectivity_change(grpc.ChannelConnectivity.READY)
+    assert client.is_connected()
+
+    async def receive():
+        received = []
+        done = asyncio.Event()
+
+        async def callback(updates):
+            received.extend(updates)
+            if len(received) == 2:
+                done.set()
+
+        subscription = asyncio.create_task(client.subscribe(["A"], callback))
+        await asyncio.wait_for(done.wait(), timeout=5)
+        subscription.cancel()
+        return received
+
+    with mock.patch.object(databrokerclientwrapper, "_RESUBSCRIBE_DELAY", 0):
+        assert asyncio.run(receive()) == ["first", "second"]
+    client.stop()
+    assert not client.is_connected()
+
+    # both directions use the one client created by start()
+    assert client_class.call_count == 1
+    assert grpc_client.subscribe.call_count >= 2
+    assert [entry.path for entry in grpc_client.subscribe.call_args.kwargs["entries"]] == ["A"]
+    assert grpc_client.subscribe.call_args.kwargs["wait_for_ready"]
+
+
+def test_subscription_waits_for_connection(client_class):
+    grpc_client = client_class.return_value.__enter__.return_value
+    grpc_client.subscribe.return_value = iter([["update"]])
+    client = DatabrokerClientWrapper()
+    client.start()
+    on_connectivity_change = grpc_client.channel.subscribe.call_args.args[0]
+
+    async def receive():
+        received = asyncio.get_running_loop().create_future()
+
+        async def callback(updates):
+            if not received.done():
+                received.set_result(updates)
+
+        subscription = asyncio.create_task(client.subscribe(["A"], callback))
+        await asyncio.sleep(0.1)
+        assert grpc_client.subscribe.call_count == 0
+        on_connectivity_change(grpc.ChannelConnectivity.READY)
+        updates = await asyncio.wait_for(received, timeout=5)
+        subscription.cancel()
+        return updates
+
+    assert asyncio.run(receive()) == ["update"]
+    client.stop()
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import json
+import unittest.mock as mock
+
+import pytest  # type: ignore
+
+import kuksa_client.grpc  # type: ignore
+from kuksa_client.grpc import DataType, Metadata, ServerInfo  # type: ignore
+
+from dbcfeederlib.databrokerclientwrapper import DatabrokerClientWrapper
+
+
+@pytest.fixture
+def grpc_client():
+    with mock.patch("kuksa_client.grpc.VSSClient") as client_class:
+        grpc_client = client_class.return_value.__enter__.return_value
+        grpc_client.get_server_info.return_value = ServerInfo(name="databroker", version="0.4.1")
+        grpc_client.get_metadata.side_effect = lambda paths, *args, **kwargs: {
+            path: Metadata(data_type=DataType.FLOAT if path != "B" else DataType.UINT8) for path in paths}
+        yield grpc_client
+
+
+@pytest.fixture
+def cache_file(tmp_path) -> str:
+    return str(tmp_path / "types.json")
+
+
+def start_client(cache_file: str) -> DatabrokerClientWrapper:
+    client = DatabrokerClientWrapper()
+    client.set_type_cache_file(cache_file)
+    client.start()
+    return client
+
+
+def requested_paths(grpc_client):
+    return [list(call.args[0]) for call in grpc_client.get_metadata.call_args_list]
+
+
+def test_data_types_are_requested_in_single_request(grpc_client, cache_file: str):
+    client = start_client(cache_file)
+    assert client.are_signals_defined(["A", "B"])
+    assert requested_paths(grpc_client) == [["A", "B"]]
+    assert client._name_to_type == {"A": DataType.FLOAT, "B": DataType.UINT8}
+    with open(cache_file, encoding="utf-8") as file:
+        assert json.load(file) == {"127.0.0.1:55555/databroker/0.4.1": {"A": "FLOAT", "B": "UINT8"}}
+
+
+def test_known_data_types_are_not_requested_again(grpc_client, cache_file: str):
+    start_client(cache_file).are_signals_defined(["A", "B"])
+    grpc_client.get_metadata.reset_mock()
+
+    client = start_client(cache_file)
+    assert client.are_signals_defined(["A", "B", "C"])
+    assert requested_paths(grpc_client) == [["C"]]
+    assert client._name_to_type["B"] == DataType.UINT8
+
+
+def test_data_types_are_requested_for_other_broker_version(grpc_client, cache_file: str):
+    start_client(cache_file).are_signals_defined(["A", "B"])
+    grpc_client.get_metadata.reset_mock()
+    grpc_client.get_server_info.return_value = ServerInfo(name="databroker", version="0.5.0")
+    assert start_client(cache_file).are_signals_defined(["A", "B"])
+    assert requested_paths(grpc_client) == [["A", "B"]]
+
+
+def test_unregistered_signals_are_reported(grpc_client, cache_file: str):
+    grpc_client.get_metadata.side_effect = kuksa_client.grpc.VSSClientError(
+        error={}, errors=[{"path": "C", "error": {"code": 404, "reason": "not_found"}}])
+    assert not start_client(cache_file).are_signals_defined(["A", "C"])
+
+
+def test_data_type_of_rejected_value_is_requested_again(grpc_client, cache_file: str):
+    client = start_client(cache_file)
+    client.are_signals_defined(["A", "B"])
+    grpc_client.set.side_effect = kuksa_client.grpc.VSSClientError(
+        error={}, errors=[{"path": "B", "error": {"code": 400, "reason": "type_mismatch"}}])
+    assert not client.update_datapoint("B", 1.0)
+    assert "B" not in client._name_to_type
+    grpc_client.get_metadata.reset_mock()
+    grpc_client.set.side_effect = None
+    assert client.update_datapoint("B", 1.0)
+    assert requested_paths(grpc_client) == [["B"]]
+    assert client._name_to_type["B"] == DataType.UINT8
+
+
+def test_data_types_are_checked_again_after_reconnecting(grpc_client, cache_file: str):
+    client = start_client(cache_file)
+    assert client.are_signals_defined(["A", "B"])
+    template = client._get_template("A")
+
+    # the databroker has been restarted with a changed data type of B
+    grpc_client.get_metadata.reset_mock()
+    grpc_client.get_metadata.side_effect = lambda paths, *args, **kwargs: {
+        path: Metadata(data_type=DataType.FLOAT if path != "B" else DataType.INT32) for path in paths}
+    assert client.are_signals_defined(["A", "B"])
+    assert requested_paths(grpc_client) == [["A", "B"]]
+    assert client._name_to_type == {"A": DataType.FLOAT, "B": DataType.INT32}
+    # unchanged data types are kept as they are
+    assert client._get_template("A") is template
+    with open(cache_file, encoding="utf-8") as file:
+        assert json.load(file) == {"127.0.0.1:55555/databroker/0.4.1": {"A": "FLOAT", "B": "INT32"}}
+
+
+def test_removed_signals_are_reported_after_reconnecting(grpc_client, cache_file: str):
+    client = start_client(cache_file)
+    assert client.are_signals_defined(["A", "B"])
+    grpc_client.get_metadata.side_effect = kuksa_client.grpc.VSSClientError(
+        error={}, errors=[{"path": "B", "error": {"code": 404, "reason": "not_found"}}])
+    assert not client.are_signals_defined(["A", "B"])
+    assert "B" not in client._name_to_type
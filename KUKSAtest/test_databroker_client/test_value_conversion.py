@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import unittest.mock as mock
+
+import pytest  # type: ignore
+
+from kuksa_client.grpc import DataType, Metadata  # type: ignore
+
+from dbcfeederlib.databrokerclientwrapper import DatabrokerClientWrapper
+
+
+@pytest.fixture
+def grpc_client():
+    with mock.patch("kuksa_client.grpc.VSSClient") as client_class:
+        grpc_client = client_class.return_value.__enter__.return_value
+        grpc_client.get_metadata.side_effect = lambda paths, *args, **kwargs: {
+            path: Metadata(data_type=DataType.UINT8 if path == "A" else DataType.BOOLEAN) for path in paths}
+        yield grpc_client
+
+
+def test_values_are_converted_to_data_type_of_databroker(grpc_client):
+    client = DatabrokerClientWrapper()
+    client.set_data_types({"A": "float", "B": "boolean"})
+    client.start()
+    assert client.are_signals_defined(["A", "B"])
+    assert client.update_datapoint("A", 300.4)
+    assert client.update_datapoint("B", "false")
+    assert client.update_datapoint("A", 7.6)
+
+    updates = [call.kwargs["updates"][0] for call in grpc_client.set.call_args_list]
+    assert [(update.entry.path, update.entry.value.value) for update in updates] == [
+        ("A", 255), ("B", False), ("A", 8)]
+    assert [update.entry.metadata.data_type for update in updates] == [DataType.UINT8, DataType.BOOLEAN, DataType.UINT8]
+    # the metadata of a VSS Data Entry is created once
+    assert updates[0].entry.metadata is updates[2].entry.metadata
+
+
+def test_unconvertible_value_is_not_sent(grpc_client):
+    client = DatabrokerClientWrapper()
+    client.start()
+    assert client.are_signals_defined(["A"])
+    assert not client.update_datapoint("A", "fast")
+    grpc_client.set.assert_not_called()
+    assert client.get_statistics()["failed_per_path"] == {"A": 1}
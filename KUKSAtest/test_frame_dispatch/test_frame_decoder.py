@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import os
+import random
+
+import cantools.database  # type: ignore
+import pytest  # type: ignore
+
+from cantools.database import Message, Signal
+
+from dbcfeederlib.framedecoder import FrameDecoder
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+database = cantools.database.load_file(test_path + "/../test_dbc/test1_1.dbc", strict=False)
+
+
+def random_payloads(message: Message):
+    generator = random.Random(message.frame_id)
+    for length in range(message.length + 1):
+        for _ in range(8):
+            yield bytes(generator.getrandbits(8) for _ in range(length))
+    yield bytes([0xFF] * message.length)
+
+
+@pytest.mark.parametrize("message", [msg for msg in database.messages if not msg.is_multiplexed()],
+                         ids=lambda msg: msg.name)
+def test_decoder_matches_cantools(message: Message):
+    decoder = FrameDecoder(message, [signal.name for signal in message.signals])
+    for payload in random_payloads(message):
+        assert decoder.decode(payload) == message.decode(payload, allow_truncated=True)
+
+
+def test_decoder_only_decodes_selected_signals():
+    message = database.get_message_by_frame_id(130)
+    decoder = FrameDecoder(message, ["UI_predictedEnergy"])
+    payload = bytes([0x01, 0x00, 0x10, 0x27, 0x00, 0x00, 0x00, 0x00])
+    assert decoder.decode(payload) == {"UI_predictedEnergy": 100.0}
+
+
+def test_decoder_decodes_big_endian_float_signal():
+    message = Message(
+        frame_id=0x123,
+        name="FloatMessage",
+        length=8,
+        signals=[
+            Signal(name="Little", start=0, length=32, is_float=True),
+            Signal(name="Big", start=39, length=32, byte_order="big_endian", is_float=True),
+        ])
+    decoder = FrameDecoder(message, ["Little", "Big"])
+    payload = bytes([0x00, 0x00, 0x20, 0x41, 0x41, 0x20, 0x00, 0x00])
+    assert decoder.decode(payload) == {"Little": 10.0, "Big": 10.0}
+
+
+def test_decoder_uses_cantools_for_multiplexed_message():
+    message = database.get_message_by_frame_id(322)
+    decoder = FrameDecoder(message, ["VCLEFT_liftgatePosition"])
+    payload = bytes([0x01, 0x00, 0x60, 0x00, 0x00, 0x00, 0x00, 0x00])
+    assert decoder.decode(payload) == message.decode(payload, allow_truncated=True)
+
+
+def test_decoder_returns_raw_choices_as_integers():
+    message = database.get_message_by_frame_id(12)
+    decoder = FrameDecoder(message, ["UI_cellSignalBars", "UI_factoryReset"], ["UI_cellSignalBars"])
+    payload = bytes([0x00, 0xC0, 0x00, 0x00, 0x00, 0x0C, 0x00, 0x00])
+    decoded = decoder.decode(payload)
+    assert type(decoded["UI_cellSignalBars"]) is int
+    assert decoded["UI_cellSignalBars"] == 3
+    assert decoded["UI_factoryReset"] == "CUSTOMER"
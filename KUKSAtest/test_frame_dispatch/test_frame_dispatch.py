@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import os
+
+from dbcfeederlib import dbc2vssmapper
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+mapping_path = test_path + "/mapping.json"
+dbc_file_names = [test_path + "/../test_dbc/test1_1.dbc"]
+mapper: dbc2vssmapper.Mapper = dbc2vssmapper.Mapper(mapping_path, dbc_file_names)
+
+
+def test_frame_dispatch_contains_mapped_signals_only():
+    frame = mapper.get_frame_dispatch(130)
+    assert frame is not None
+    assert frame.message.name == "ID082UI_tripPlanning"
+    assert set(frame.signals.keys()) == {"UI_predictedEnergy", "UI_energyAtDestination"}
+
+    dispatch = frame.signals["UI_energyAtDestination"]
+    assert dispatch.signal.name == "UI_energyAtDestination"
+    assert dispatch.minimum == -327.67
+    assert dispatch.maximum == 327.67
+    assert [mapping.vss_name for mapping in dispatch.mappings] == ["A.EnergyAtDestination"]
+
+
+def test_frame_dispatch_contains_all_mappings_of_signal():
+    frame = mapper.get_frame_dispatch(12)
+    assert frame is not None
+    vss_names = [mapping.vss_name for mapping in frame.signals["UI_cellSignalBars"].mappings]
+    assert vss_names == ["A.CellSignalBars", "A.CellSignalBarsCount"]
+
+
+def test_frame_dispatch_with_unconditional_mapping_is_always_due():
+    # UI_cpuTemperature is mapped with an interval condition, the other signals are not
+    frame = mapper.get_frame_dispatch(12)
+    assert frame is not None
+    assert frame.interval_mappings == []
+    assert frame.next_due_time() == 0.0
+
+
+def create_signal_dispatch(signal_name: str, *mappings: dbc2vssmapper.VSSMapping) -> dbc2vssmapper.SignalDispatch:
+    signal = mapper.get_message_by_frame_id(12).get_signal_by_name(signal_name)
+    return dbc2vssmapper.SignalDispatch(signal, signal.minimum, signal.maximum, list(mappings))
+
+
+def test_signal_dispatch_uses_raw_choices_for_numeric_mappings():
+    numeric = dbc2vssmapper.VSSMapping("A.Numeric", "UI_cellSignalBars", None, 0, False, "uint8", "...")
+    mapped = dbc2vssmapper.VSSMapping("A.Mapped", "UI_cellSignalBars",
+                                      {"mapping": [{"from": 3, "to": "three"}]}, 0, False, "string", "...")
+    assert create_signal_dispatch("UI_cellSignalBars", numeric, mapped).raw_choices
+
+
+def test_signal_dispatch_uses_named_choices_if_required():
+    string = dbc2vssmapper.VSSMapping("A.String", "UI_cellSignalBars", None, 0, False, "string", "...")
+    named = dbc2vssmapper.VSSMapping("A.Named", "UI_cellSignalBars",
+                                     {"mapping": [{"from": "THREE", "to": 3}]}, 0, False, "uint8", "...")
+    calculated = dbc2vssmapper.VSSMapping("A.Math", "UI_cellSignalBars", {"math": "x+1"}, 0, False, "uint8", "...")
+    numeric = dbc2vssmapper.VSSMapping("A.Numeric", "UI_cellSignalBars", None, 0, False, "uint8", "...")
+    assert not create_signal_dispatch("UI_cellSignalBars", numeric, string).raw_choices
+    assert not create_signal_dispatch("UI_cellSignalBars", numeric, named).raw_choices
+    assert not create_signal_dispatch("UI_cellSignalBars", numeric, calculated).raw_choices
+
+
+def test_signal_dispatch_uses_named_choices_out_of_range():
+    signal = mapper.get_message_by_frame_id(12).get_signal_by_name("UI_cellSignalBars")
+    numeric = dbc2vssmapper.VSSMapping("A.Numeric", "UI_cellSignalBars", None, 0, False, "uint8", "...")
+    # the SNA choice (7) would be discarded by the range check if it was treated as a number
+    assert not dbc2vssmapper.SignalDispatch(signal, 0, 5, [numeric]).raw_choices
+
+
+def test_frame_dispatch_for_unmapped_frame_is_none():
+    # the message with frame ID 22 exists but none of its signals is mapped
+    assert mapper.get_frame_dispatch(22) is None
+    assert mapper.get_frame_dispatch(0x7ff) is None
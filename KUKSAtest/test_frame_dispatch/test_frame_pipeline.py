@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import logging
+import math
+import os
+import random
+
+import cantools.database  # type: ignore
+import pytest  # type: ignore
+
+from cantools.database import Message, Signal
+
+from dbcfeederlib import dbc2vssmapper, framepipeline
+from dbcfeederlib.dbc2vssmapper import Mapper, SignalDispatch, VSSMapping
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+dbc_file_name = test_path + "/../test_dbc/test1_1.dbc"
+database = cantools.database.load_file(dbc_file_name, strict=False)
+mapper = Mapper(test_path + "/mapping.json", [dbc_file_name], use_compiled_pipelines=True)
+
+
+def random_payloads(message: Message):
+    generator = random.Random(message.frame_id)
+    for length in range(message.length + 1):
+        for _ in range(8):
+            yield bytes(generator.getrandbits(8) for _ in range(length))
+
+
+def assert_same_results(expected, actual):
+    assert len(actual) == len(expected)
+    for (expected_mapping, expected_raw, expected_vss), (mapping, raw, vss) in zip(expected, actual):
+        assert mapping is expected_mapping
+        for expected_value, value in [(expected_raw, raw), (expected_vss, vss)]:
+            assert type(value) is type(expected_value)
+            if isinstance(value, float) and math.isnan(value):
+                assert math.isnan(expected_value)
+            else:
+                assert value == expected_value
+
+
+def create_signal_dispatches(message: Message, numeric_only: bool = False):
+    dispatches = []
+    for signal in message.signals:
+        mappings = [
+            VSSMapping("A.Numeric", signal.name, None, 0, False, "float", "..."),
+            VSSMapping("A.Mapped", signal.name, {"mapping": [{"from": 1, "to": 10}]}, 0, False, "uint8", "..."),
+        ]
+        if not numeric_only:
+            mappings.append(VSSMapping("A.String", signal.name, None, 0, False, "string", "..."))
+            mappings.append(VSSMapping("A.Math", signal.name, {"math": "floor(x / 3) + 1"}, 0, False, "float", "..."))
+        dispatches.append(SignalDispatch(signal, signal.minimum, signal.maximum, mappings))
+    return dispatches
+
+
+@pytest.mark.parametrize("numeric_only", [False, True])
+@pytest.mark.parametrize("message", [msg for msg in database.messages if not msg.is_multiplexed()],
+                         ids=lambda msg: msg.name)
+def test_pipeline_matches_cantools(message: Message, numeric_only: bool):
+    signals = create_signal_dispatches(message, numeric_only)
+    pipeline = framepipeline.compile_frame_pipeline(message, signals)
+    assert pipeline is not None
+    for payload in random_payloads(message):
+        assert_same_results(framepipeline.reference_pipeline(message, signals, payload), pipeline(payload))
+
+
+@pytest.mark.parametrize("frame_id", [12, 130, 275, 851])
+def test_mapper_creates_verified_pipelines(frame_id: int):
+    frame = mapper.get_frame_dispatch(frame_id)
+    assert frame is not None
+    assert frame.pipeline is not None
+    for payload in random_payloads(frame.message):
+        expected = framepipeline.reference_pipeline(frame.message, frame.signals.values(), payload)
+        assert_same_results(expected, frame.pipeline(payload))
+
+
+def test_pipeline_applies_transformations():
+    frame = mapper.get_frame_dispatch(12)
+    assert frame is not None and frame.pipeline is not None
+    payload = bytes([0x00, 0xC0, 0x00, 0x00, 0x00, 0x0C, 0x00, 0x07])
+    results = {mapping.vss_name: (raw, vss) for mapping, raw, vss in frame.pipeline(payload)}
+    assert results["A.FactoryReset"] == ("CUSTOMER", 2)
+    assert results["A.CellSignalBars"] == ("THREE", "THREE")
+    assert results["A.CellSignalBarsCount"] == ("THREE", 3)
+    assert results["A.CpuTemperature"] == (47, 47)
+
+
+def test_compiled_transform_of_mapping():
+    assert VSSMapping("A.Numeric", "S", None, 0, False, "float", "...").compiled_transform is None
+    kind, transform = VSSMapping("A.Mapped", "S", {"mapping": [{"from": 1, "to": 10}]}, 0, False, "uint8",
+                                 "...").compiled_transform
+    assert kind == "mapping"
+    assert transform(1) == 10
+    kind, transform = VSSMapping("A.Math", "S", {"math": "floor(x / 3) + 1"}, 0, False, "float",
+                                 "...").compiled_transform
+    assert kind == "math"
+    assert transform(7) == 3
+
+
+def test_pipeline_discards_out_of_range_values():
+    message = Message(
+        frame_id=0x103,
+        name="MyMessage",
+        length=2,
+        signals=[
+            Signal(name="HasMinSignal", start=0, length=8, minimum=5),
+            Signal(name="HasMaxSignal", start=8, length=8, maximum=254),
+        ])
+    signals = create_signal_dispatches(message)
+    pipeline = framepipeline.compile_frame_pipeline(message, signals)
+    assert pipeline is not None
+    assert pipeline(bytes([3, 255])) == []
+    assert [raw for _, raw, _ in pipeline(bytes([5, 254]))] == [5, 5, 5, 5, 254, 254, 254, 254]
+
+
+def test_no_pipeline_for_multiplexed_message():
+    frame = mapper.get_frame_dispatch(322)
+    assert frame is not None
+    assert frame.pipeline is None
+
+
+def test_verification_only_silences_its_own_thread():
+    log_filter = dbc2vssmapper._CurrentThreadErrorsOnly()
+    record = logging.LogRecord("test", logging.WARNING, __file__, 0, "message", None, None)
+    assert not log_filter.filter(record)
+    record.thread = (record.thread or 0) + 1
+    assert log_filter.filter(record)
+    record = logging.LogRecord("test", logging.ERROR, __file__, 0, "message", None, None)
+    assert log_filter.filter(record)
+
+    level = dbc2vssmapper.log.level
+    Mapper(test_path + "/mapping.json", [dbc_file_name], use_compiled_pipelines=True)
+    assert dbc2vssmapper.log.level == level
+    assert dbc2vssmapper.log.filters == []
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import json
+import logging
+import os
+
+import pytest  # type: ignore
+
+from dbcfeederlib import dbc2vssmapper
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+mapping_path = test_path + "/mapping.json"
+default_values_path = test_path + "/dbc_default_values.json"
+dbc_file_names = [test_path + "/../test_dbc/test1_1.dbc"]
+
+
+@pytest.fixture
+def mapper() -> dbc2vssmapper.Mapper:
+    return dbc2vssmapper.Mapper(mapping_path, dbc_file_names, can_signal_default_values_file=default_values_path)
+
+
+def default_values() -> dict:
+    with open(default_values_path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def test_frame_is_encoded_from_default_and_updated_values(mapper: dbc2vssmapper.Mapper):
+    message = mapper.get_message_by_frame_id(12)
+    assert mapper.encode_frame(12) == message.encode(default_values())
+
+    assert mapper.handle_update("A.CellSignalBars", 4) == {"UI_cellSignalBars"}
+    assert mapper.handle_update("A.FactoryReset", "CUSTOMER") == {"UI_factoryReset"}
+    expected = dict(default_values(), UI_cellSignalBars=4, UI_factoryReset=3)
+    assert mapper.get_value_dict(12) == expected
+    assert mapper.encode_frame(12) == message.encode(expected)
+
+
+def test_encoded_frame_is_reused_until_a_value_changes(mapper: dbc2vssmapper.Mapper):
+    mapper.handle_update("A.CellSignalBars", 4)
+    data = mapper.encode_frame(12)
+    mapper.handle_update("A.CellSignalBars", 4)
+    assert mapper.encode_frame(12) is data
+    mapper.handle_update("A.CellSignalBars", 5)
+    assert mapper.encode_frame(12) != data
+
+
+def test_last_mapping_with_value_determines_signal_value(mapper: dbc2vssmapper.Mapper):
+    mapper.handle_update("A.CpuTemperatureOverride", 50)
+    mapper.handle_update("A.CpuTemperature", 30)
+    assert mapper.get_value_dict(12)["UI_cpuTemperature"] == 50
+
+    # a value that cannot be transformed falls back to the other mapping's value or the default value
+    mapper.handle_update("A.CpuTemperatureOverride", None)
+    assert mapper.get_value_dict(12)["UI_cpuTemperature"] == 30
+    mapper.handle_update("A.CpuTemperature", None)
+    assert mapper.get_value_dict(12)["UI_cpuTemperature"] == default_values()["UI_cpuTemperature"]
+
+
+def test_missing_default_values_are_reported_once(tmp_path, caplog: pytest.LogCaptureFixture):
+    values = default_values()
+    del values["UI_pcbTemperature"]
+    incomplete_default_values_path = str(tmp_path / "dbc_default_values.json")
+    with open(incomplete_default_values_path, "w", encoding="utf-8") as file:
+        json.dump(values, file)
+
+    with caplog.at_level(logging.ERROR):
+        mapper = dbc2vssmapper.Mapper(mapping_path, dbc_file_names,
+                                      can_signal_default_values_file=incomplete_default_values_path)
+        missing = [record for record in caplog.records if "UI_pcbTemperature" in record.getMessage()]
+        assert len(missing) == len(mapper.get_messages_for_signal("UI_pcbTemperature"))
+        caplog.clear()
+
+        mapper.handle_update("A.CellSignalBars", 4)
+        assert "UI_pcbTemperature" not in mapper.get_value_dict(12)
+        assert caplog.records == []
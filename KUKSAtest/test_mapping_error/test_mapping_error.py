@@ -40,6 +40,20 @@ def test_unknown_transform(caplog: pytest.LogCaptureFixture):
     assert error_msg in caplog.record_tuples
 
 
+def test_invalid_math_transform(caplog: pytest.LogCaptureFixture):
+
+    mapping_path = test_path + "/test_invalid_math_transform.json"
+    dbc_file_names = [test_path + "/../test_dbc/test1_1.dbc"]
+
+    with pytest.raises(SystemExit) as excinfo:
+        dbc2vssmapper.Mapper(mapping_path, dbc_file_names)
+    assert excinfo.value.code == -1
+    assert any(
+        level == logging.ERROR and msg.startswith("Invalid math transformation definition for A.B")
+        for (_, level, msg) in caplog.record_tuples
+    )
+
+
 def test_vss2dbc_sensor(caplog: pytest.LogCaptureFixture):
 
     mapping_path = test_path + "/mapping_vss2dbc_not_actuator.json"
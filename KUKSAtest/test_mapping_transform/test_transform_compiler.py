@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import pytest  # type: ignore
+
+from cantools.database.can.signal import NamedSignalValue  # type: ignore[import]
+from py_expression_eval import Parser  # type: ignore[import]
+
+from dbcfeederlib import transformcompiler
+
+
+@pytest.mark.parametrize("expression", [
+    "floor(abs(x/5))",
+    "floor((x*40)-100)",
+    "(x+100)/40",
+    "floor(x+0.5)",
+    "x^2 + PI",
+    "max(1, 2, x)",
+    "if(x > 3, 1, 0)",
+    "-x * (1 + 2)",
+])
+def test_compiled_math_matches_interpreted_expression(expression: str):
+    compiled = transformcompiler.compile_math(expression)
+    interpreted = Parser().parse(expression)
+    for value in [0, 5, 26, -26, 7.5]:
+        assert compiled(value) == interpreted.evaluate({"x": value})
+
+
+def test_compiled_math_is_cached():
+    assert transformcompiler.compile_math("x*3.6") is transformcompiler.compile_math("x*3.6")
+
+
+def test_compiled_math_does_not_share_argument_lists():
+    compiled = transformcompiler.compile_math("max(1, 2, x)")
+    assert compiled(0) == 2
+    assert compiled(0) == 2
+    assert compiled(3) == 3
+
+
+@pytest.mark.parametrize("expression", ["x +", "y*2", "x(2)", "1/0", ""])
+def test_invalid_math_expression_raises_value_error(expression: str):
+    with pytest.raises(ValueError):
+        transformcompiler.compile_math(expression)
+
+
+def test_compiled_mapping_normalizes_numeric_keys():
+    compiled = transformcompiler.compile_mapping([
+        {"from": 1, "to": "one"},
+        {"from": 2.0, "to": "two"},
+        {"from": False, "to": "zero"},
+    ])
+    assert compiled(1) == "one"
+    assert compiled(1.0) == "one"
+    assert compiled(True) == "one"
+    assert compiled(2) == "two"
+    assert compiled(0) == "zero"
+    # no conversion between strings and numbers
+    assert compiled("1") is None
+
+
+def test_compiled_mapping_matches_named_signal_value_by_name_then_value():
+    compiled = transformcompiler.compile_mapping([
+        {"from": "DI_GEAR_P", "to": 0},
+        {"from": 4, "to": 1},
+    ])
+    assert compiled(NamedSignalValue(1, "DI_GEAR_P")) == 0
+    assert compiled(NamedSignalValue(4, "DI_GEAR_D")) == 1
+    assert compiled(NamedSignalValue(7, "DI_GEAR_SNA")) is None
+
+
+def test_compiled_mapping_uses_first_of_duplicate_items():
+    compiled = transformcompiler.compile_mapping([
+        {"from": 3, "to": 7},
+        {"from": 3, "to": 8},
+    ])
+    assert compiled(3) == 7
+
+
+def test_compiled_mapping_ignores_unhashable_values():
+    compiled = transformcompiler.compile_mapping([{"from": 3, "to": 7}])
+    assert compiled([3]) is None
+
+
+def test_compiled_mapping_rejects_unhashable_keys():
+    with pytest.raises(ValueError):
+        transformcompiler.compile_mapping([{"from": [3], "to": 7}])
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import math
+
+import numpy as np
+import pytest  # type: ignore
+
+from cantools.database.can.signal import NamedSignalValue  # type: ignore[import]
+
+from dbcfeederlib.dbc2vssmapper import VSSMapping
+
+
+def same_values(actual, expected) -> bool:
+    if len(actual) != len(expected):
+        return False
+    for actual_value, expected_value in zip(actual, expected):
+        if type(actual_value) is not type(expected_value):
+            return False
+        if isinstance(actual_value, float) and math.isnan(actual_value):
+            if not math.isnan(expected_value):
+                return False
+        elif actual_value != expected_value:
+            return False
+    return True
+
+
+def create_mapping(transform, datatype="float", on_change=False) -> VSSMapping:
+    return VSSMapping("A.B", "S", transform, 0, on_change, datatype, "...")
+
+
+@pytest.mark.parametrize("transform", [
+    None,
+    {"math": "x*1000"},
+    {"math": "(x+100)/40"},
+    {"math": "-x*2 + 1/4"},
+    {"math": "x/(x-5)"},
+    {"math": "floor(x/5)"},
+    {"math": "x^2"},
+    {"mapping": [{"from": 0, "to": "zero"}, {"from": 5, "to": "five"}, {"from": 7.5, "to": [7, 5]}]},
+])
+@pytest.mark.parametrize("values", [
+    np.array([0.0, 5.0, 7.5, -3.25, float("nan"), 5.0, float("inf")]),
+    np.array([0, 5, 7, 5, -3, 0]),
+    np.array([True, False, True]),
+])
+def test_transform_values_matches_transform_value(transform, values):
+    mapping = create_mapping(transform)
+    expected = [mapping.transform_value(value) for value in values.tolist()]
+    transformed = mapping.transform_values(values)
+    assert transformed.dtype == object
+    assert same_values(transformed.tolist(), expected)
+
+
+def test_transform_values_handles_named_signal_values():
+    values = np.empty(3, dtype=object)
+    values[:] = [NamedSignalValue(1, "ONE"), 7, NamedSignalValue(0, "ZERO")]
+    assert create_mapping(None, "string").transform_values(values).tolist() == ["ONE", 7, "ZERO"]
+    assert create_mapping(None, "uint8").transform_values(values).tolist() == [1, 7, 0]
+    mapping = create_mapping({"mapping": [{"from": "ONE", "to": 10}, {"from": 0, "to": 20}]}, "uint8")
+    assert mapping.transform_values(values).tolist() == [10, None, 20]
+
+
+def test_transform_values_evaluates_random_numbers_per_value():
+    mapping = create_mapping({"math": "x + random(1)"})
+    transformed = mapping.transform_values(np.zeros(50, dtype=np.int64))
+    assert len(set(transformed.tolist())) > 1
+
+
+@pytest.mark.parametrize("on_change", [False, True])
+def test_change_conditions_fulfilled_matches_change_condition_fulfilled(on_change: bool):
+    vss_values = np.empty(9, dtype=object)
+    vss_values[:] = [None, 1, 1, 2.0, None, 2, 3, 3, float("nan")]
+    scalar = create_mapping(None, on_change=on_change)
+    expected = [scalar.change_condition_fulfilled(value) for value in vss_values]
+
+    batch = create_mapping(None, on_change=on_change)
+    # evaluate in two chunks to verify that the last value is taken into account
+    fulfilled = np.concatenate([batch.change_conditions_fulfilled(vss_values[:3]),
+                                batch.change_conditions_fulfilled(vss_values[3:])])
+    assert fulfilled.tolist() == expected
+    assert batch.last_vss_value is scalar.last_vss_value or math.isnan(batch.last_vss_value)
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import queue
+import time
+import unittest.mock as mock
+
+from typing import List
+
+import pytest  # type: ignore
+
+from dbcfeederlib.dbc2vssmapper import VSSObservation
+from dbcfeederlib.observationqueue import InlineDispatcher, LatestValueMailbox, ObservationQueue, OverflowPolicy
+from dbcfeederlib.observationqueue import QueueMode
+from dbcfeederlib.observationqueue import create_observation_queue
+
+
+def observation(vss_name: str, raw_value: int) -> VSSObservation:
+    return VSSObservation("Signal", vss_name, raw_value, 0.0)
+
+
+def drain(observations: queue.Queue) -> List[VSSObservation]:
+    result = []
+    while not observations.empty():
+        result.append(observations.get_nowait())
+    return result
+
+
+def test_queue_is_fifo_across_buffer_wrap():
+    observations = ObservationQueue(3, OverflowPolicy.DROP_NEWEST)
+    for value in range(10):
+        observations.put(observation("A", value))
+        assert observations.get_nowait().raw_value == value
+    assert observations.empty()
+    with pytest.raises(queue.Empty):
+        observations.get(timeout=0.01)
+
+
+def test_drop_oldest_discards_longest_waiting_observation():
+    on_drop = mock.Mock()
+    observations = ObservationQueue(3, OverflowPolicy.DROP_OLDEST, on_drop)
+    for value in range(5):
+        observations.put(observation("A", value))
+    assert [item.raw_value for item in drain(observations)] == [2, 3, 4]
+    assert [call.args[0].raw_value for call in on_drop.call_args_list] == [0, 1]
+    assert observations.get_statistics()["dropped"] == 2
+
+
+def test_drop_newest_discards_put_observation():
+    on_drop = mock.Mock()
+    observations = ObservationQueue(3, OverflowPolicy.DROP_NEWEST, on_drop)
+    for value in range(5):
+        observations.put(observation("A", value))
+    assert [item.raw_value for item in drain(observations)] == [0, 1, 2]
+    assert [call.args[0].raw_value for call in on_drop.call_args_list] == [3, 4]
+
+
+def test_coalesce_replaces_queued_observation_for_same_path():
+    on_drop = mock.Mock()
+    observations = ObservationQueue(3, OverflowPolicy.COALESCE, on_drop)
+    observations.put(observation("A", 1))
+    observations.put(observation("B", 1))
+    observations.put(observation("A", 2))
+    # the queue is full, the latest observation for A is replaced
+    observations.put(observation("A", 3))
+    # there is no observation for C, so the oldest one is dropped
+    observations.put(observation("C", 1))
+
+    assert [(item.vss_name, item.raw_value) for item in drain(observations)] == [("B", 1), ("A", 3), ("C", 1)]
+    assert [call.args[0].raw_value for call in on_drop.call_args_list] == [1]
+    statistics = observations.get_statistics()
+    assert statistics["coalesced"] == 1
+    assert statistics["dropped"] == 1
+
+
+def test_coalesce_forgets_observations_taken_from_queue():
+    observations = ObservationQueue(2, OverflowPolicy.COALESCE)
+    observations.put(observation("A", 1))
+    observations.put(observation("B", 1))
+    assert observations.get_nowait().vss_name == "A"
+    observations.put(observation("B", 2))
+    # the observation for A has been taken, so the oldest observation is dropped
+    observations.put(observation("A", 2))
+    assert [(item.vss_name, item.raw_value) for item in drain(observations)] == [("B", 2), ("A", 2)]
+
+
+def test_block_waits_for_room():
+    observations = ObservationQueue(1, OverflowPolicy.BLOCK)
+    observations.put(observation("A", 1))
+    with pytest.raises(queue.Full):
+        observations.put(observation("A", 2), timeout=0.01)
+    assert observations.get_statistics()["dropped"] == 0
+
+
+def test_statistics_track_high_water_mark():
+    observations = ObservationQueue(5, OverflowPolicy.DROP_OLDEST)
+    for value in range(4):
+        observations.put(observation("A", value))
+    drain(observations)
+    observations.put(observation("A", 5))
+    statistics = observations.get_statistics()
+    assert statistics["size"] == 1
+    assert statistics["capacity"] == 5
+    assert statistics["high_water_mark"] == 4
+
+
+def test_queue_size_must_be_positive():
+    with pytest.raises(ValueError):
+        ObservationQueue(0)
+
+
+def test_mailbox_keeps_latest_observation_per_path():
+    mailbox = LatestValueMailbox()
+    mailbox.put(observation("A", 1))
+    mailbox.put(observation("B", 1))
+    mailbox.put(observation("A", 2))
+    mailbox.put(observation("A", 3))
+    mailbox.put(observation("C", 1))
+    assert mailbox.qsize() == 3
+    # paths are taken in the order in which they have become dirty
+    assert [(item.vss_name, item.raw_value) for item in drain(mailbox)] == [("A", 3), ("B", 1), ("C", 1)]
+
+    mailbox.put(observation("B", 2))
+    mailbox.put(observation("A", 4))
+    assert [(item.vss_name, item.raw_value) for item in drain(mailbox)] == [("B", 2), ("A", 4)]
+    with pytest.raises(queue.Empty):
+        mailbox.get(timeout=0.01)
+
+
+def test_mailbox_statistics_report_drops_per_path_and_age():
+    mailbox = LatestValueMailbox()
+    now = time.time()
+    mailbox.put(VSSObservation("Signal", "A", 1, now - 2.0))
+    mailbox.put(VSSObservation("Signal", "A", 2, now - 1.0))
+    mailbox.put(VSSObservation("Signal", "B", 1, now))
+    drain(mailbox)
+    statistics = mailbox.get_statistics()
+    assert statistics["size"] == 0
+    assert statistics["high_water_mark"] == 2
+    assert statistics["dropped"] == 1
+    assert statistics["dropped_per_path"] == {"A": 1}
+    assert 1.0 <= statistics["max_age"] < 2.0
+    assert 0.5 <= statistics["mean_age"] < 1.5
+
+
+def test_inline_dispatcher_passes_observations_to_handler():
+    handler = mock.Mock(side_effect=[None, RuntimeError("failed"), None])
+    dispatcher = InlineDispatcher(handler)
+    for value in range(3):
+        dispatcher.put(observation("A", value))
+    assert [call.args[0].raw_value for call in handler.call_args_list] == [0, 1, 2]
+    assert dispatcher.empty()
+    with pytest.raises(queue.Empty):
+        dispatcher.get(timeout=0.01)
+    statistics = dispatcher.get_statistics()
+    assert statistics["dispatched"] == 3
+    assert statistics["failed"] == 1
+
+
+def test_create_observation_queue():
+    assert isinstance(create_observation_queue(QueueMode.LATEST), LatestValueMailbox)
+    assert isinstance(create_observation_queue(QueueMode.INLINE, handler=mock.Mock()), InlineDispatcher)
+    with pytest.raises(ValueError):
+        create_observation_queue(QueueMode.INLINE)
+    fifo = create_observation_queue(QueueMode.FIFO, 5, OverflowPolicy.DROP_NEWEST)
+    assert isinstance(fifo, ObservationQueue)
+    assert fifo.maxsize == 5
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import os
+
+import pytest  # type: ignore
+
+from dbcfeederlib.outagespool import OutageSpool
+
+
+@pytest.fixture
+def spool_file(tmp_path) -> str:
+    return str(tmp_path / "values.spool")
+
+
+def test_spool_keeps_latest_value_per_path(spool_file: str):
+    spool = OutageSpool(spool_file)
+    assert spool.put("A", 1.0, 1.0)
+    assert spool.put("B", True, 2.0)
+    assert spool.put("A", 3.0, 3.0)
+    assert len(spool) == 2
+    assert spool.get_statistics()["coalesced"] == 1
+    # the newest values are taken first
+    assert spool.take(1) == [("A", 3.0, 3.0)]
+    assert spool.take(5) == [("B", True, 2.0)]
+    assert spool.take(5) == []
+    assert os.path.getsize(spool_file) == 0
+
+
+def test_spooled_values_survive_restart(spool_file: str):
+    spool = OutageSpool(spool_file)
+    spool.put("A", 1, 1.0)
+    spool.put("B", "text", 2.0)
+    spool.put("C", [1, 2], 3.0)
+    spool.put("A", 4, 4.0)
+    spool.discard("B")
+    assert spool.take(1) == [("A", 4, 4.0)]
+    spool.close()
+
+    spool = OutageSpool(spool_file)
+    assert spool.take(5) == [("C", [1, 2], 3.0)]
+
+
+def test_incomplete_record_is_ignored(spool_file: str):
+    spool = OutageSpool(spool_file)
+    spool.put("A", 1, 1.0)
+    spool.close()
+    with open(spool_file, "a", encoding="utf-8") as file:
+        file.write('["B",2,')
+
+    spool = OutageSpool(spool_file)
+    assert spool.take(5) == [("A", 1, 1.0)]
+
+
+def test_full_spool_is_compacted_before_dropping_values(spool_file: str):
+    # room for two records
+    spool = OutageSpool(spool_file, max_size=2 * len('["A",1000,1.0]\n'))
+    assert spool.put("A", 1000, 1.0)
+    assert spool.put("A", 1001, 1.0)
+    # the outdated record of A is removed to make room for B
+    assert spool.put("B", 1000, 1.0)
+    assert spool.put("A", 1002, 1.0)
+    assert not spool.put("C", 1000, 1.0)
+    statistics = spool.get_statistics()
+    assert statistics["dropped"] == 1
+    assert statistics["size"] == 2
+    assert statistics["file_size"] <= 2 * len('["A",1000,1.0]\n')
+    assert sorted(spool.take(5)) == [("A", 1002, 1.0), ("B", 1000, 1.0)]
+
+
+def test_unserializable_value_is_not_spooled(spool_file: str):
+    spool = OutageSpool(spool_file)
+    assert not spool.put("A", object(), 1.0)
+    assert len(spool) == 0
+
+
+def test_spool_size_must_be_positive(spool_file: str):
+    with pytest.raises(ValueError):
+        OutageSpool(spool_file, max_size=0)
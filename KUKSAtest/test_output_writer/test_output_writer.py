@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import csv
+import gzip
+import json
+import time
+
+import pytest  # type: ignore
+
+from dbcfeederlib.outputwriter import OutputFormat, OutputWriter
+
+
+def write_values(writer: OutputWriter, values):
+    writer.start()
+    for vss_name, value, timestamp in values:
+        writer.write(vss_name, value, timestamp)
+    writer.stop()
+
+
+def wait_for_flushes(writer: OutputWriter, count: int) -> bool:
+    for _ in range(100):
+        if writer.get_statistics()["flushes"] >= count:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_text_format_matches_datapoint_representation(tmp_path):
+    file_name = str(tmp_path / "out.txt")
+    write_values(OutputWriter(file_name), [("Vehicle.Speed", 12.5, 1.0), ("Vehicle.IsMoving", True, 2.0)])
+    with open(file_name, encoding="utf-8") as file:
+        assert file.read() == "Datapoint(Vehicle.Speed, 12.5, 1.0)\nDatapoint(Vehicle.IsMoving, True, 2.0)\n"
+
+
+def test_jsonl_format(tmp_path):
+    file_name = str(tmp_path / "out.jsonl")
+    write_values(OutputWriter(file_name, OutputFormat.JSONL), [("A", 1, 1.0), ("B", "text", 2.0), ("C", [1, 2], 3.0)])
+    with open(file_name, encoding="utf-8") as file:
+        assert [json.loads(line) for line in file] == [
+            {"path": "A", "value": 1, "time": 1.0},
+            {"path": "B", "value": "text", "time": 2.0},
+            {"path": "C", "value": [1, 2], "time": 3.0}]
+
+
+def test_csv_format_writes_header_once(tmp_path):
+    file_name = str(tmp_path / "out.csv")
+    write_values(OutputWriter(file_name, OutputFormat.CSV), [("A", 1, 1.0), ("B", "a,\"b\"", 2.0)])
+    write_values(OutputWriter(file_name, OutputFormat.CSV), [("C", 3.5, 3.0)])
+    with open(file_name, encoding="utf-8", newline="") as file:
+        assert list(csv.reader(file)) == [
+            ["path", "value", "time"], ["A", "1", "1.0"], ["B", "a,\"b\"", "2.0"], ["C", "3.5", "3.0"]]
+
+
+def test_console_output(capsys):
+    write_values(OutputWriter(), [("A", 1, 1.0)])
+    assert capsys.readouterr().out == "Datapoint(A, 1, 1.0)\n"
+
+
+def test_full_buffer_is_written_before_flush_interval(tmp_path):
+    file_name = str(tmp_path / "out.txt")
+    writer = OutputWriter(file_name, buffer_size=2, flush_interval=60)
+    writer.start()
+    writer.write("A", 1, 1.0)
+    writer.write("A", 2, 2.0)
+    flushed = wait_for_flushes(writer, 1)
+    writer.stop()
+    assert flushed
+
+
+def test_file_is_rotated_and_compressed(tmp_path):
+    file_name = str(tmp_path / "out.txt")
+    writer = OutputWriter(file_name, buffer_size=1, max_file_size=10, max_files=2, compress=True)
+    writer.start()
+    for value in range(4):
+        writer.write("A", value, float(value))
+        assert wait_for_flushes(writer, value + 1)
+    writer.stop()
+
+    # every value exceeds the maximum file size, the oldest value has been rotated out
+    assert not (tmp_path / "out.txt").exists()
+    with gzip.open(file_name + ".1.gz", "rt", encoding="utf-8") as file:
+        assert file.read() == "Datapoint(A, 3, 3.0)\n"
+    with gzip.open(file_name + ".2.gz", "rt", encoding="utf-8") as file:
+        assert file.read() == "Datapoint(A, 2, 2.0)\n"
+    assert not (tmp_path / "out.txt.3.gz").exists()
+    statistics = writer.get_statistics()
+    assert statistics["rotations"] == 4
+    assert statistics["bytes_written"] == 4 * len("Datapoint(A, 0, 0.0)\n")
+
+
+def test_statistics(tmp_path):
+    writer = OutputWriter(str(tmp_path / "out.txt"), max_buffered=2)
+    writer.write("A", 1, 1.0)
+    writer.write("A", 2, 2.0)
+    writer.write("A", 3, 3.0)
+    writer.start()
+    writer.stop()
+    statistics = writer.get_statistics()
+    assert statistics["received"] == 2
+    assert statistics["dropped"] == 1
+    assert statistics["written"] == 2
+    assert statistics["flushes"] == 1
+    assert statistics["buffered"] == 0
+    assert statistics["max_flush_latency"] >= statistics["mean_flush_latency"] > 0
+
+
+def test_invalid_buffer_size():
+    with pytest.raises(ValueError):
+        OutputWriter(buffer_size=0)
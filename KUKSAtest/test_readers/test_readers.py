@@ -26,11 +26,20 @@ from typing import Dict, List
 import pytest  # type: ignore # noqa: F401
 
 from cantools.database import Message, Signal
+from dbcfeederlib import framepipeline
 from dbcfeederlib.canreader import CanReader
-from dbcfeederlib.dbc2vssmapper import Mapper, VSSObservation, VSSMapping
+from dbcfeederlib.dbc2vssmapper import FrameDispatch, Mapper, SignalDispatch, VSSObservation, VSSMapping
 from dbcfeederlib.j1939reader import J1939Reader
 
 
+def create_frame_dispatch(message_def: Message, mappings: Dict[str, List[VSSMapping]]) -> FrameDispatch:
+    signals: Dict[str, SignalDispatch] = {}
+    for signal in message_def.signals:
+        if signal.name in mappings:
+            signals[signal.name] = SignalDispatch(signal, signal.minimum, signal.maximum, mappings[signal.name])
+    return FrameDispatch(message_def, signals)
+
+
 class TestCanReader():
 
     class NoopCanReader(CanReader):
@@ -46,7 +55,6 @@ class TestCanReader():
     def test_process_can_message_handles_known_messages(self) -> None:
 
         # GIVEN a reader based on CAN message and mapping definitions
-        decoded_message = {"UnboundedSignal": 10}
         message_def = Message(
             frame_id=0x0102,
             name="MyMessage",
@@ -54,34 +62,33 @@ class TestCanReader():
             signals=[
                 Signal(name="UnboundedSignal", start=0, length=8),
             ])
-        message_def.decode = mock.Mock(return_value=decoded_message)  # type: ignore
         mapper = mock.create_autospec(spec=Mapper)
-        mapper.get_message_by_frame_id.return_value = message_def
-        mapper.get_dbc2vss_mappings.return_value = [VSSMapping(
-            vss_name="Vehicle.Custom",
-            dbc_name="UnboundedSignal",
-            transform={},
-            interval_ms=0,
-            on_change=True,
-            datatype="uint8",
-            description="some custom signal")]
+        mapper.get_frame_dispatch.return_value = create_frame_dispatch(message_def, {
+            "UnboundedSignal": [VSSMapping(
+                vss_name="Vehicle.Custom",
+                dbc_name="UnboundedSignal",
+                transform={},
+                interval_ms=0,
+                on_change=True,
+                datatype="uint8",
+                description="some custom signal")]})
         queue = mock.create_autospec(spec=Queue)
         reader = TestCanReader.NoopCanReader(queue, mapper)
 
         # WHEN a message with a known frame ID is received
-        reader._process_can_message(0x0102, bytes())
+        reader._process_can_message(0x0102, bytes([10]))
 
         # THEN its signals are mapped to VSS data entries
-        mapper.get_dbc2vss_mappings.assert_called_once_with("UnboundedSignal")
+        mapper.get_frame_dispatch.assert_called_once_with(0x0102)
         queue.put.assert_called_once()
         assert queue.put.call_args.args[0].dbc_name == "UnboundedSignal"
         assert queue.put.call_args.args[0].vss_name == "Vehicle.Custom"
+        assert queue.put.call_args.args[0].raw_value == 10
 
     def test_process_can_message_ignores_out_of_range_values(self) -> None:
 
         # GIVEN a reader based on a CAN message definition that defines signals
         # with min and max values
-        decoded_message = {"HasMinSignal": 3, "HasMaxSignal": 255}
         message_def = Message(
             frame_id=0x103,
             name="MyMessage",
@@ -90,33 +97,140 @@ class TestCanReader():
                 Signal(name="HasMinSignal", start=0, length=8, minimum=5),
                 Signal(name="HasMaxSignal", start=8, length=8, maximum=254),
             ])
-        message_def.decode = mock.Mock(return_value=decoded_message)  # type: ignore
+        mapping = mock.create_autospec(spec=VSSMapping)
+        mapping.interval_ms = 0
         mapper = mock.create_autospec(spec=Mapper)
-        mapper.get_message_by_frame_id.return_value = message_def
+        mapper.get_frame_dispatch.return_value = create_frame_dispatch(message_def, {
+            "HasMinSignal": [mapping],
+            "HasMaxSignal": [mapping]})
         queue = mock.create_autospec(spec=Queue)
         reader = TestCanReader.NoopCanReader(queue, mapper)
 
         # WHEN a  message is received from the CAN bus which only contains signals
         # with values out of range
-        reader._process_can_message(0x103, bytes())
+        reader._process_can_message(0x103, bytes([3, 255]))
 
         # THEN the reader ignores the signal values
-        mapper.get_message_by_frame_id.assert_called_once_with(0x0103)
-        mapper.get_dbc2vss_mappings.assert_not_called()
+        mapper.get_frame_dispatch.assert_called_once_with(0x0103)
+        mapping.time_condition_fulfilled.assert_not_called()
         queue.put.assert_not_called()
 
+    def test_process_can_message_does_not_decode_unchanged_payload(self) -> None:
+
+        # GIVEN a reader based on CAN message and mapping definitions
+        message_def = Message(
+            frame_id=0x0104,
+            name="MyMessage",
+            length=8,
+            signals=[
+                Signal(name="MySignal", start=0, length=8),
+            ])
+        always = VSSMapping("Vehicle.Always", "MySignal", None, 0, False, "uint8", "some custom signal")
+        on_change = VSSMapping("Vehicle.OnChange", "MySignal", None, 0, True, "uint8", "some custom signal")
+        frame = create_frame_dispatch(message_def, {"MySignal": [always, on_change]})
+        frame.decoder.decode = mock.Mock(wraps=frame.decoder.decode)  # type: ignore
+        mapper = mock.create_autospec(spec=Mapper)
+        mapper.get_frame_dispatch.return_value = frame
+        queue = mock.create_autospec(spec=Queue)
+        reader = TestCanReader.NoopCanReader(queue, mapper)
+
+        # WHEN the same payload is received twice
+        reader._process_can_message(0x0104, bytes([10]))
+        reader._process_can_message(0x0104, bytes([10]))
+
+        # THEN the payload is decoded only once
+        frame.decoder.decode.assert_called_once()
+        statistics = reader.get_processing_statistics()
+        assert statistics["payload_cache_hits"] == 1
+        assert statistics["payload_cache_misses"] == 1
+        assert statistics["payload_cache_hit_rate"] == 0.5
+        # AND the unchanged value is queued again for the mapping without on_change condition only
+        vss_names = [call.args[0].vss_name for call in queue.put.call_args_list]
+        assert vss_names == ["Vehicle.Always", "Vehicle.OnChange", "Vehicle.Always"]
+        assert reader.get_processing_statistics()["suppressed_observations"] == 1
+
+        # WHEN a changed payload is received
+        reader._process_can_message(0x0104, bytes([11]))
+
+        # THEN it is decoded and queued for both mappings
+        assert frame.decoder.decode.call_count == 2
+        assert queue.put.call_count == 5
+        assert queue.put.call_args.args[0].raw_value == 11
+
+    def test_process_can_message_drops_frames_with_no_interval_due(self) -> None:
+
+        # GIVEN a reader based on a CAN message whose signals are all mapped with an interval condition
+        message_def = Message(
+            frame_id=0x0105,
+            name="MyMessage",
+            length=8,
+            signals=[
+                Signal(name="MySignal", start=0, length=8),
+                Signal(name="MyOtherSignal", start=8, length=8),
+            ])
+        fast = VSSMapping("Vehicle.Fast", "MySignal", None, 100, False, "uint8", "some custom signal")
+        slow = VSSMapping("Vehicle.Slow", "MyOtherSignal", None, 1000, False, "uint8", "some custom signal")
+        frame = create_frame_dispatch(message_def, {"MySignal": [fast], "MyOtherSignal": [slow]})
+        frame.decoder.decode = mock.Mock(wraps=frame.decoder.decode)  # type: ignore
+        mapper = mock.create_autospec(spec=Mapper)
+        mapper.get_frame_dispatch.return_value = frame
+        queue = mock.create_autospec(spec=Queue)
+        reader = TestCanReader.NoopCanReader(queue, mapper)
+
+        # WHEN frames are received before, at and after the shortest interval has passed
+        with mock.patch("dbcfeederlib.canreader.time.time", side_effect=[1000.0, 1000.05, 1000.1, 1000.15]):
+            for value in range(4):
+                reader._process_can_message(0x0105, bytes([value, value]))
+
+        # THEN frames received before any interval is due are dropped without being decoded
+        assert frame.decoder.decode.call_count == 2
+        assert reader.get_processing_statistics()["gated_frames"] == 2
+        # AND the values of the other frames are queued for the mappings that are due
+        vss_names = [call.args[0].vss_name for call in queue.put.call_args_list]
+        assert vss_names == ["Vehicle.Fast", "Vehicle.Slow", "Vehicle.Fast"]
+        assert queue.put.call_args.args[0].raw_value == 2
+
+    def test_process_can_message_queues_values_transformed_by_pipeline(self) -> None:
+
+        # GIVEN a reader based on a CAN message with a compiled pipeline
+        message_def = Message(
+            frame_id=0x0106,
+            name="MyMessage",
+            length=8,
+            signals=[
+                Signal(name="MySignal", start=0, length=8),
+            ])
+        mapping = VSSMapping("Vehicle.Scaled", "MySignal", {"math": "x*10"}, 0, False, "uint16", "some custom signal")
+        frame = create_frame_dispatch(message_def, {"MySignal": [mapping]})
+        frame.pipeline = framepipeline.compile_frame_pipeline(message_def, frame.signals.values())
+        mapper = mock.create_autospec(spec=Mapper)
+        mapper.get_frame_dispatch.return_value = frame
+        queue = mock.create_autospec(spec=Queue)
+        reader = TestCanReader.NoopCanReader(queue, mapper)
+
+        # WHEN a message is received from the CAN bus
+        reader._process_can_message(0x0106, bytes([12]))
+
+        # THEN the reader queues the raw value along with the transformed value
+        queue.put.assert_called_once()
+        observation = queue.put.call_args.args[0]
+        assert observation.vss_name == "Vehicle.Scaled"
+        assert observation.raw_value == 12
+        assert observation.transformed
+        assert observation.vss_value == 120
+
     def test_process_can_message_ignores_unknown_messages(self) -> None:
         # GIVEN a reader based on an empty mapping definitions database
         queue = mock.create_autospec(spec=Queue)
         mapper = mock.create_autospec(spec=Mapper)
-        mapper.get_message_by_frame_id.return_value = None
+        mapper.get_frame_dispatch.return_value = None
         reader = TestCanReader.NoopCanReader(queue, mapper)
 
         # WHEN a  message with an unknown PGN is received from the CAN bus
         reader._process_can_message(0x0102, bytes())
 
         # THEN the reader ignores the message
-        mapper.get_message_by_frame_id.assert_called_once_with(0x0102)
+        mapper.get_frame_dispatch.assert_called_once_with(0x0102)
         queue.put.assert_not_called()
 
 
@@ -144,7 +258,6 @@ def get_dbc2vss_mappings(signal_name: str) -> List[VSSMapping]:
 
 
 def get_message_definition(frame_id: int, is_extended_frame: bool) -> Message:
-    decoded_message = {"Signal_One": 0x10, "Signal_Two": 0x5432}
     msg_def = Message(
         frame_id=frame_id,
         name="Test_Message",
@@ -154,7 +267,6 @@ def get_message_definition(frame_id: int, is_extended_frame: bool) -> Message:
             Signal(name="Signal_One", start=0, length=8, maximum=213),
             Signal(name="Signal_Two", start=8, length=16, is_signed=True),
         ])
-    msg_def.decode = mock.Mock(return_value=decoded_message)  # type: ignore
     return msg_def
 
 
@@ -173,8 +285,8 @@ class TestJ1939Reader():
         queue = mock.create_autospec(spec=Queue)
         message_def = get_message_definition(0x01FFFF10, True)
         mapper = mock.create_autospec(spec=Mapper)
-        mapper.get_message_by_frame_id.return_value = message_def
-        mapper.get_dbc2vss_mappings.side_effect = get_dbc2vss_mappings
+        mapper.get_frame_dispatch.return_value = create_frame_dispatch(message_def, {
+            signal.name: get_dbc2vss_mappings(signal.name) for signal in message_def.signals})
         j1939reader = J1939Reader(queue, mapper, "vcan0")
 
         # WHEN a message is received from the CAN bus for which a mapping gas been defined
@@ -197,8 +309,8 @@ class TestDBCReader():
         queue = mock.create_autospec(spec=Queue)
         message_def = get_message_definition(0x011A, False)
         mapper = mock.create_autospec(spec=Mapper)
-        mapper.get_message_by_frame_id.return_value = message_def
-        mapper.get_dbc2vss_mappings.side_effect = get_dbc2vss_mappings
+        mapper.get_frame_dispatch.return_value = create_frame_dispatch(message_def, {
+            signal.name: get_dbc2vss_mappings(signal.name) for signal in message_def.signals})
         dbcreader = J1939Reader(queue, mapper, "vcan0")
 
         # WHEN a message is received from the CAN bus for which a mapping has been defined
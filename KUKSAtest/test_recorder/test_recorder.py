@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pytest  # type: ignore
+
+from dbcfeederlib.loggingclientwrapper import LoggingClientWrapper
+from dbcfeederlib.recorder import BLOCKS_SUFFIX, INDEX_SUFFIX, ColumnarRecorder, RecordingStore, read_recording
+
+
+def recording_files(directory) -> list:
+    return sorted(glob.glob(os.path.join(str(directory), "*.rec")))
+
+
+def test_values_are_recorded_with_their_types(tmp_path):
+    recorder = ColumnarRecorder(str(tmp_path), chunk_size=3)
+    recorder.set_paths(["A", "B"])
+    recorder.start()
+    values = [
+        ("A", 1.5, 1.0), ("B", 7, 2.0), ("C", True, 3.0),
+        ("A", np.float64(2.5), 4.0), ("B", "text", 5.0), ("C", [1, 2], 6.0),
+        ("A", 2**64, 7.0),
+    ]
+    for vss_name, value, timestamp in values:
+        recorder.record(vss_name, value, timestamp)
+    recorder.stop()
+
+    files = recording_files(tmp_path)
+    assert len(files) == 1
+    recorded = list(read_recording(files[0]))
+    assert recorded == [(vss_name, timestamp, value) for vss_name, value, timestamp in values[:6]] + [
+        ("A", 7.0, 2**64)]
+    assert [type(value) for _, _, value in recorded] == [float, int, bool, float, str, list, int]
+
+    with open(files[0] + INDEX_SUFFIX, encoding="utf-8") as index_file:
+        index = json.load(index_file)
+    assert [(chunk["count"], chunk["start"], chunk["end"]) for chunk in index["chunks"]] == [
+        (3, 1.0, 3.0), (3, 4.0, 6.0), (1, 7.0, 7.0)]
+    assert recorder.get_statistics()["written"] == 7
+
+
+def test_chunks_outside_of_time_range_are_skipped(tmp_path):
+    recorder = ColumnarRecorder(str(tmp_path), chunk_size=2)
+    recorder.start()
+    for timestamp in range(6):
+        recorder.record("A", timestamp, float(timestamp))
+    recorder.stop()
+    recorded = read_recording(recording_files(tmp_path)[0], start_time=1.5, end_time=3.0)
+    assert [value for _, _, value in recorded] == [2, 3]
+
+
+def test_recording_file_is_rotated(tmp_path):
+    recorder = ColumnarRecorder(str(tmp_path), chunk_size=10, max_file_size=200)
+    recorder.start()
+    for timestamp in range(40):
+        recorder.record("A", timestamp, float(timestamp))
+    recorder.stop()
+    files = recording_files(tmp_path)
+    assert len(files) == 4
+    assert recorder.get_statistics()["files"] == 4
+    # every file has its own path dictionary
+    assert [value for file in files for _, _, value in read_recording(file)] == list(range(40))
+
+
+def test_values_are_dropped_instead_of_blocking(tmp_path):
+    recorder = ColumnarRecorder(str(tmp_path), max_buffered=2)
+    for timestamp in range(3):
+        recorder.record("A", timestamp, float(timestamp))
+    statistics = recorder.get_statistics()
+    assert statistics["buffered"] == 2
+    assert statistics["dropped"] == 1
+
+
+def test_chunk_size_must_be_positive(tmp_path):
+    with pytest.raises(ValueError):
+        ColumnarRecorder(str(tmp_path), chunk_size=0)
+
+
+def test_logging_client_records_values(tmp_path):
+    client = LoggingClientWrapper()
+    client.set_data_types({"A": "float"})
+    client.set_recorder(ColumnarRecorder(str(tmp_path)))
+    client.start()
+    assert client.update_datapoint("A", 1.0)
+    assert client.update_datapoint("A", 2.0, 1700000000.5)
+    client.stop()
+    recorded = list(read_recording(recording_files(tmp_path)[0]))
+    assert [(vss_name, value) for vss_name, _, value in recorded] == [("A", 1.0), ("A", 2.0)]
+    # the observation time is recorded if given
+    assert recorded[1][1] == 1700000000.5
+    assert client.get_statistics()["written"] == 2
+
+
+def test_store_queries_values_of_path_in_time_range(tmp_path):
+    recorder = ColumnarRecorder(str(tmp_path), chunk_size=10, max_file_size=400)
+    recorder.start()
+    for timestamp in range(100):
+        recorder.record("A", timestamp, float(timestamp))
+        if timestamp % 3 == 0:
+            recorder.record("B", f"b{timestamp}", float(timestamp))
+    recorder.stop()
+    assert len(recording_files(tmp_path)) > 1
+
+    with RecordingStore(str(tmp_path)) as store:
+        assert list(store.query("A", 42.0, 47.0)) == [(float(t), t) for t in range(42, 48)]
+        assert list(store.query("B", 40.0, 50.0)) == [(float(t), f"b{t}") for t in (42, 45, 48)]
+        assert len(list(store.query("A"))) == 100
+        assert list(store.query("C")) == []
+        assert store.last_value("A") == (99.0, 99)
+        assert store.last_value("B", before=50.5) == (48.0, "b48")
+        assert store.last_value("A", before=-1.0) is None
+
+
+def test_store_block_index_is_sorted_when_file_is_complete(tmp_path):
+    recorder = ColumnarRecorder(str(tmp_path), chunk_size=4)
+    recorder.start()
+    for timestamp in range(8):
+        recorder.record("B" if timestamp % 2 else "A", timestamp, float(timestamp))
+    recorder.stop()
+
+    file_name = recording_files(tmp_path)[0]
+    with open(file_name + INDEX_SUFFIX, encoding="utf-8") as index_file:
+        index = json.load(index_file)
+    assert index["sealed"]
+    assert index["paths"] == ["A", "B"]
+    blocks = np.fromfile(file_name + BLOCKS_SUFFIX, dtype=[
+        ("path", "<u4"), ("count", "<u4"), ("offset", "<u8"), ("start", "<f8"), ("end", "<f8")])
+    assert [(block["path"], block["count"], block["start"], block["end"]) for block in blocks] == [
+        (0, 2, 0.0, 2.0), (0, 2, 4.0, 6.0), (1, 2, 1.0, 3.0), (1, 2, 5.0, 7.0)]
+
+
+def test_store_queries_recording_file_being_written(tmp_path):
+    recorder = ColumnarRecorder(str(tmp_path), chunk_size=5)
+    recorder.start()
+    for timestamp in range(5):
+        recorder.record("A", timestamp, float(timestamp))
+    for _ in range(100):
+        if recorder.get_statistics()["written"] == 5:
+            break
+        time.sleep(0.01)
+    with RecordingStore(str(tmp_path)) as store:
+        assert store.last_value("A") == (4.0, 4)
+    recorder.stop()
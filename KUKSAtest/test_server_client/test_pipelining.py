@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import json
+import queue
+import unittest.mock as mock
+
+from typing import Any, Dict, List
+
+import pytest  # type: ignore
+
+from dbcfeederlib import serverclientwrapper
+from dbcfeederlib.serverclientwrapper import ServerClientWrapper
+
+
+class FakeBackend:
+    """Collects the requests put into the send queue and answers them on demand, like the websocket backend."""
+
+    def __init__(self):
+        self.subprotocol = None
+        self.sendMsgQueue: queue.Queue = queue.Queue()
+        self.recvMsgQueues: Dict[str, queue.Queue] = {}
+
+    def take_requests(self) -> List[Dict[str, Any]]:
+        requests = []
+        while not self.sendMsgQueue.empty():
+            requests.append(json.loads(self.sendMsgQueue.get_nowait()))
+        return requests
+
+    def respond(self, request: Dict[str, Any], error: Any = None):
+        response = {"action": "set", "requestId": request["requestId"], "ts": "2023-01-01T00:00:00.0Z"}
+        if error is not None:
+            response["error"] = error
+        self.recvMsgQueues.pop(request["requestId"]).put(json.dumps(response))
+
+
+@pytest.fixture
+def backend():
+    with mock.patch("dbcfeederlib.serverclientwrapper.KuksaClientThread") as thread_class:
+        backend = FakeBackend()
+        thread_class.return_value.backend = backend
+        yield backend
+
+
+def start_client(max_in_flight: int) -> ServerClientWrapper:
+    client = ServerClientWrapper()
+    client.set_data_types({"A": "uint8", "B": "boolean", "C": "float[]"})
+    client.set_max_in_flight(max_in_flight)
+    client.start()
+    return client
+
+
+def test_requests_are_sent_without_waiting_for_responses(backend: FakeBackend):
+    client = start_client(4)
+    assert client.update_datapoint("A", 300)
+    assert client.update_datapoint("B", 0)
+    assert client.update_datapoint("C", [1, 2.5])
+    requests = backend.take_requests()
+    assert [(request["path"], request["value"]) for request in requests] == [
+        ("A", "255"), ("B", "false"), ("C", ["1.0", "2.5"])]
+    assert len({request["requestId"] for request in requests}) == 3
+    assert client.get_statistics()["in_flight"] == 3
+
+    # responses are matched by request ID, regardless of their order
+    backend.respond(requests[2])
+    backend.respond(requests[0], error={"number": 400, "reason": "Bad Request"})
+    backend.respond(requests[1])
+    client.stop()
+    statistics = client.get_statistics()
+    assert statistics["requests"] == 2
+    assert statistics["failed_values"] == 1
+    assert statistics["in_flight"] == 0
+    assert statistics["max_in_flight"] == 3
+
+
+def test_sending_blocks_while_window_is_full(backend: FakeBackend):
+    client = start_client(2)
+    client.update_datapoint("A", 1)
+    client.update_datapoint("A", 2)
+    assert not client._window.acquire(timeout=0.01)
+    first_request = backend.take_requests()[0]
+    backend.respond(first_request)
+    assert client._window.acquire(timeout=1)
+    client._window.release()
+    with mock.patch.object(serverclientwrapper, "_RESPONSE_TIMEOUT", 0):
+        client.stop()
+
+
+def test_unanswered_requests_time_out(backend: FakeBackend):
+    client = start_client(2)
+    with mock.patch.object(serverclientwrapper, "_RESPONSE_TIMEOUT", 0.05):
+        client.update_datapoint("A", 1)
+        client.stop()
+    assert client.get_statistics()["failed_values"] == 1
+    assert backend.recvMsgQueues == {}
+
+
+def test_values_are_sent_synchronously_by_default():
+    with mock.patch("dbcfeederlib.serverclientwrapper.KuksaClientThread") as thread_class:
+        kuksa = thread_class.return_value
+        kuksa.setValue.return_value = json.dumps({"action": "set", "requestId": "1"})
+        client = start_client(1)
+        assert client.update_datapoint("B", 1)
+        kuksa.setValue.assert_called_once_with("B", "true")
+        client.stop()
+    assert client.get_statistics()["requests"] == 1
+
+
+def test_synchronous_update_waits_for_response():
+    with mock.patch("dbcfeederlib.serverclientwrapper.KuksaClientThread") as thread_class:
+        kuksa = thread_class.return_value
+        kuksa.backend = FakeBackend()
+        kuksa.setValue.return_value = json.dumps({"action": "set", "requestId": "1", "error": "Bad Request"})
+        client = start_client(4)
+        assert not client.update_datapoint_sync("A", 1)
+        kuksa.setValue.assert_called_once_with("A", "1")
+        assert kuksa.backend.take_requests() == []
+        client.stop()
+    assert client.get_statistics()["failed_values"] == 1
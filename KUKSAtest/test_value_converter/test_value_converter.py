@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import pytest  # type: ignore
+
+from dbcfeederlib.valueconverter import create_converter, create_text_converter
+
+
+@pytest.mark.parametrize("datatype, value, expected", [
+    ("int8", 200, 127),
+    ("int8", -200.0, -128),
+    ("uint8", -1, 0),
+    ("uint16", 12.6, 13),
+    ("UInt32", "17", 17),
+    ("int64", True, 1),
+    ("float", 3, 3.0),
+    ("double", "2.5", 2.5),
+    ("boolean", 0, False),
+    ("boolean", "false", False),
+    ("boolean", "true", True),
+    ("string", 42, "42"),
+    ("string", "text", "text"),
+    ("uint8[]", [1, 300], "[1, 255]"),
+    ("string[]", ["a", 1], '["a", "1"]'),
+    ("uint8[]", "[1, 2]", "[1, 2]"),
+    ("timestamp", 12, 12),
+])
+def test_values_are_converted(datatype: str, value, expected):
+    converted = create_converter(datatype)(value)
+    assert converted == expected
+    assert type(converted) is type(expected)
+
+
+@pytest.mark.parametrize("datatype, value", [
+    ("int8", "fast"),
+    ("uint8", None),
+    ("float", "fast"),
+    ("int32", float("inf")),
+])
+def test_invalid_values_are_rejected(datatype: str, value):
+    with pytest.raises((ValueError, TypeError, OverflowError)):
+        create_converter(datatype)(value)
+
+
+def test_values_are_formatted_as_text():
+    assert create_text_converter("boolean")(1) == "true"
+    assert create_text_converter("boolean")("False") == "false"
+    assert create_text_converter("uint8")(300.0) == "255"
+    assert create_text_converter("float")(1) == "1.0"
+    assert create_text_converter("string")("text") == "text"
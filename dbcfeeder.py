@@ -35,16 +35,20 @@ import threading
 import time
 
 from signal import SIGINT, SIGTERM, signal
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set, Union
 
 from cantools.database import Message
 from kuksa_client.grpc import EntryUpdate  # type: ignore
 
 from dbcfeederlib.canclient import CANClient
 from dbcfeederlib.canreader import CanReader
+from dbcfeederlib import asyncfeeder
 from dbcfeederlib import dbc2vssmapper
 from dbcfeederlib import dbcreader
 from dbcfeederlib import j1939reader
+from dbcfeederlib import observationqueue
+from dbcfeederlib import outagespool
+from dbcfeederlib import recorder
 from dbcfeederlib import databrokerclientwrapper
 from dbcfeederlib import serverclientwrapper
 from dbcfeederlib import loggingclientwrapper
@@ -59,16 +63,30 @@ CONFIG_SECTION_CAN = "can"
 CONFIG_SECTION_ELMCAN = "elmcan"
 CONFIG_SECTION_GENERAL = "general"
 
+CONFIG_OPTION_ASYNCIO = "asyncio"
+CONFIG_OPTION_BATCH_DELAY = "batch_delay"
+CONFIG_OPTION_BATCH_SIZE = "batch_size"
 CONFIG_OPTION_CAN_DUMP_FILE = "candumpfile"
+CONFIG_OPTION_COMPILED_PIPELINES = "compiled_pipelines"
 CONFIG_OPTION_DBC_DEFAULT_FILE = "dbc_default_file"
 CONFIG_OPTION_IP = "ip"
 CONFIG_OPTION_J1939 = "j1939"
 CONFIG_OPTION_MAPPING = "mapping"
+CONFIG_OPTION_MAX_IN_FLIGHT = "max_in_flight"
 CONFIG_OPTION_PORT = "port"
+CONFIG_OPTION_QUEUE_MODE = "queue_mode"
+CONFIG_OPTION_QUEUE_OVERFLOW_POLICY = "queue_overflow_policy"
+CONFIG_OPTION_QUEUE_SIZE = "queue_size"
+CONFIG_OPTION_RECORD_DIR = "record_dir"
+CONFIG_OPTION_RECORD_MAX_FILE_SIZE = "record_max_file_size"
 CONFIG_OPTION_ROOT_CA_PATH = "root_ca_path"
+CONFIG_OPTION_SPOOL_FILE = "spool_file"
+CONFIG_OPTION_SPOOL_MAX_SIZE = "spool_max_size"
+CONFIG_OPTION_SPOOL_REPLAY_RATE = "spool_replay_rate"
 CONFIG_OPTION_TLS_ENABLED = "tls"
 CONFIG_OPTION_TLS_SERVER_NAME = "tls_server_name"
 CONFIG_OPTION_TOKEN = "token"
+CONFIG_OPTION_TYPE_CACHE_FILE = "type_cache_file"
 
 
 class ServerType(str, enum.Enum):
@@ -77,6 +95,10 @@ class ServerType(str, enum.Enum):
     KUKSA_DATABROKER = 'kuksa_databroker'
     OFFLINE_LOGGING = 'offline_logging'
 
+
+# Time (in seconds) between sending two chunks of spooled values after reconnecting
+_SPOOL_REPLAY_INTERVAL = 0.1
+
 class Feeder:
     """
     The feeder is responsible for setting up a queue.
@@ -88,19 +110,35 @@ class Feeder:
     """
 
     def __init__(self, kuksa_client: clientwrapper.ClientWrapper,
-                 elmcan_config: Dict[str, Any], dbc2vss: bool = True, vss2dbc: bool = True):
+                 elmcan_config: Dict[str, Any], dbc2vss: bool = True, vss2dbc: bool = True,
+                 queue_size: int = observationqueue.DEFAULT_QUEUE_SIZE,
+                 queue_overflow_policy: observationqueue.OverflowPolicy = observationqueue.OverflowPolicy.COALESCE,
+                 queue_mode: observationqueue.QueueMode = observationqueue.QueueMode.FIFO,
+                 spool: Optional[outagespool.OutageSpool] = None,
+                 spool_replay_rate: int = outagespool.DEFAULT_SPOOL_REPLAY_RATE):
         self._running: bool = False
         self._reader: Optional[CanReader] = None
         self._mapper: Optional[dbc2vssmapper.Mapper] = None
         self._registered: bool = False
-        self._dbc2vss_queue: queue.Queue[dbc2vssmapper.VSSObservation] = queue.Queue()
+        self._dbc2vss_queue = observationqueue.create_observation_queue(
+            queue_mode, queue_size, queue_overflow_policy, self._observation_dropped, self._dispatch_observation)
         self._kuksa_client = kuksa_client
         self._elmcan_config = elmcan_config
         self._disconnect_time = 0.0
+        self._messages_sent = 0
+        self._last_sent_log_entry = 0
         self._dbc2vss_enabled = dbc2vss
         self._vss2dbc_enabled = vss2dbc
         self._canclient: Optional[CANClient] = None
         self._transmit: bool = False
+        # values received while the server is not available
+        self._spool = spool
+        self._spool_replay_chunk = max(1, int(spool_replay_rate * _SPOOL_REPLAY_INTERVAL))
+        self._next_spool_replay = 0.0
+        # time of the last value sent per VSS Data Entry, so that spooled values do not replace newer values
+        self._sent_times: Dict[str, float] = {}
+        self._sent_times_lock = threading.Lock()
+        self._kuksa_client.set_failure_callback(self._value_failed)
 
     def start(
         self,
@@ -111,7 +149,8 @@ class Feeder:
         dbc_default_file: Optional[str],
         candumpfile: Optional[str],
         use_j1939: bool = False,
-        use_strict_parsing: bool = False
+        use_strict_parsing: bool = False,
+        use_compiled_pipelines: bool = False
     ):
 
         self._running = True
@@ -120,8 +159,10 @@ class Feeder:
             dbc_file_names=dbc_file_names,
             use_strict_parsing=use_strict_parsing,
             expect_extended_frame_ids=use_j1939,
-            can_signal_default_values_file=dbc_default_file)
+            can_signal_default_values_file=dbc_default_file,
+            use_compiled_pipelines=use_compiled_pipelines)
 
+        self._kuksa_client.set_data_types(self._mapper.get_vss_data_types())
         self._kuksa_client.start()
         threads = []
 
@@ -195,6 +236,8 @@ class Feeder:
         self._kuksa_client.stop()
         if self._canclient:
             self._canclient.stop()
+        if self._spool is not None:
+            self._spool.close()
         self._transmit = False
 
     def is_running(self) -> bool:
@@ -210,19 +253,157 @@ class Feeder:
         if self._mapper is None:
             log.error("_register_datapoints called before feeder has been started")
             return False
-        all_registered = True
-        for vss_name in self._mapper.get_vss_names():
-            log.debug("Checking if signal %s is registered", vss_name)
-            resp = self._kuksa_client.is_signal_defined(vss_name)
-            if not resp:
-                all_registered = False
-        return all_registered
+        return self._kuksa_client.are_signals_defined(self._mapper.get_vss_names())
+
+    def _observation_dropped(self, vss_observation: dbc2vssmapper.VSSObservation):
+        # The reader does not queue unchanged values for "on_change" mappings,
+        # so make sure that the next value is queued again
+        if self._mapper is not None:
+            vss_mapping = self._mapper.get_dbc2vss_mapping(vss_observation.dbc_name, vss_observation.vss_name)
+            if vss_mapping is not None:
+                vss_mapping.last_queued_value = None
+
+    def _value_not_sent(self, vss_observation: dbc2vssmapper.VSSObservation):
+        # The value has neither been sent nor spooled, so make sure that the next value
+        # is sent even if it is unchanged
+        if self._mapper is not None:
+            vss_mapping = self._mapper.get_dbc2vss_mapping(vss_observation.dbc_name, vss_observation.vss_name)
+            if vss_mapping is not None:
+                vss_mapping.reset_change_state()
+
+    def _value_failed(self, vss_name: str, value: Any, timestamp: Optional[float]):
+        # Invoked by the client for values that it has accepted but could not send
+        log.debug("Failed to send value %s for %s", value, vss_name)
+        if self._spool is not None and timestamp is not None:
+            with self._sent_times_lock:
+                if self._sent_times.get(vss_name, 0.0) > timestamp:
+                    # a newer value has been sent in the meantime
+                    return
+                # the value has not been sent, so it must not prevent replaying spooled values
+                self._sent_times.pop(vss_name, None)
+                if self._spool.put(vss_name, value, timestamp):
+                    return
+        if self._mapper is not None:
+            self._mapper.reset_change_state(vss_name)
+
+    def _dispatch_observation(self, vss_observation: dbc2vssmapper.VSSObservation):
+        # Invoked in the thread of the CAN reader if observations are processed inline,
+        # the receiver thread then only takes care of (re-)registering the datapoints
+        if self._registered:
+            self._process_observation(vss_observation)
+        elif self._spool is not None:
+            self._spool_observation(vss_observation)
+        else:
+            log.debug("Datapoints not registered, ignoring value for VSS %s", vss_observation.vss_name)
+            self._observation_dropped(vss_observation)
+
+    def _spool_observation(self, vss_observation: dbc2vssmapper.VSSObservation):
+        value = self._transform_observation(vss_observation)
+        if value is not None:
+            self._spool_value(vss_observation, value)
+
+    def _spool_value(self, vss_observation: dbc2vssmapper.VSSObservation, value: Any):
+        if not self._spool.put(vss_observation.vss_name, value, vss_observation.time):  # type: ignore[union-attr]
+            # the spool is full
+            self._value_not_sent(vss_observation)
+
+    def _spool_queued_observations(self, timeout: float):
+        # Move the observations received within timeout seconds to the spool
+        deadline = time.monotonic() + timeout
+        remaining = timeout
+        while remaining > 0:
+            try:
+                self._spool_observation(self._dbc2vss_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+            remaining = deadline - time.monotonic()
+
+    def _replay_spool(self):
+        # Send the next chunk of spooled values if it is due, the newest values first
+        now = time.monotonic()
+        if now < self._next_spool_replay:
+            return
+        self._next_spool_replay = now + _SPOOL_REPLAY_INTERVAL
+        for target, value, timestamp in self._spool.take(self._spool_replay_chunk):  # type: ignore[union-attr]
+            # The value is only taken out of the spool once the server has handled it. The lock makes sure
+            # that a newer value, which may be sent by the CAN reader's thread in the meantime, is sent last.
+            with self._sent_times_lock:
+                if timestamp <= self._sent_times.get(target, 0.0):
+                    log.debug("Skipping spooled value for %s, a newer value has been sent already", target)
+                    continue
+                success = self._kuksa_client.update_datapoint_sync(target, value, timestamp)
+                if success:
+                    self._sent_times[target] = timestamp
+            if success:
+                log.debug("Succeeded sending spooled DataPoint(%s, %s, %f)", target, value, timestamp)
+            elif not self._kuksa_client.is_connected():
+                # keep the value for the next attempt
+                self._spool.put(target, value, timestamp)  # type: ignore[union-attr]
+            else:
+                log.warning("Failed to send spooled value %s for %s", value, target)
+        if len(self._spool) == 0:  # type: ignore[arg-type]
+            log.info("All spooled values sent: %s", self._spool.get_statistics())  # type: ignore[union-attr]
+
+    def _transform_observation(self, vss_observation: dbc2vssmapper.VSSObservation) -> Optional[Any]:
+        # Returns the value to send for the observation or None if there is none
+        log.info("[_run_receiver] VSS Observation: %s", vss_observation)
+        vss_mapping = self._mapper.get_dbc2vss_mapping(vss_observation.dbc_name, vss_observation.vss_name)
+        log.info("[_run_receiver] Found mapping for %s to %s: %s",
+                 vss_observation.dbc_name, vss_observation.vss_name, vss_mapping)
+        if vss_observation.transformed:
+            value = vss_observation.vss_value
+        else:
+            value = vss_mapping.transform_value(vss_observation.raw_value)
+        if value is None:
+            log.warning(
+                "Value ignored for dbc %s to VSS %s, from raw value %s of type %s",
+                vss_observation.dbc_name, vss_observation.vss_name, value, type(value)
+            )
+        elif not vss_mapping.change_condition_fulfilled(value):
+            log.debug("Value condition not fulfilled for VSS %s, value %s", vss_observation.vss_name, value)
+        else:
+            return value
+        return None
+
+    def _process_observation(self, vss_observation: dbc2vssmapper.VSSObservation):
+        value = self._transform_observation(vss_observation)
+        if value is not None:
+            # update current value in KUKSA.val
+            target = vss_observation.vss_name
+            if self._spool is None:
+                success = self._kuksa_client.update_datapoint(target, value, vss_observation.time)
+                if not success:
+                    self._value_not_sent(vss_observation)
+            else:
+                # Sent while holding the lock, so that a spooled value being replayed is not sent after it
+                with self._sent_times_lock:
+                    success = self._kuksa_client.update_datapoint(target, value, vss_observation.time)
+                    if success:
+                        # a spooled value for the same target is outdated now
+                        self._sent_times[target] = vss_observation.time
+                        self._spool.discard(target)
+                if not success:
+                    # keep the value until the server is available again
+                    self._spool_value(vss_observation, value)
+            if success:
+                log.debug("Succeeded sending DataPoint(%s, %s, %f)", target, value, vss_observation.time)
+                print("Updated: Datapoint(%s, %s)", target, value)
+                # Give status message after 1, 2, 4, 8, 16, 32, 64, .... messages have been sent
+                self._messages_sent += 1
+                if self._messages_sent >= (2 * self._last_sent_log_entry):
+                    log.info("Update datapoint requests sent to kuksa.val so far: %d", self._messages_sent)
+                    log.info("Observation queue: %s", self._dbc2vss_queue.get_statistics())
+                    client_statistics = self._kuksa_client.get_statistics()
+                    if client_statistics:
+                        log.info("Client: %s", client_statistics)
+                    if self._spool is not None:
+                        log.info("Outage spool: %s", self._spool.get_statistics())
+                    if self._reader is not None:
+                        log.info("CAN frame processing: %s", self._reader.get_processing_statistics())
+                    self._last_sent_log_entry = self._messages_sent
 
     def _run_receiver(self):
         processing_started = False
-        messages_sent = 0
-        last_sent_log_entry = 0
-        queue_max_size = 0
         while self._running is True:
             if self._kuksa_client.is_connected():
                 self._disconnect_time = 0.0
@@ -230,7 +411,10 @@ class Feeder:
                 # As we actually cannot register
                 self._registered = False
                 sleep_time = 0.2
-                time.sleep(sleep_time)
+                if self._spool is not None:
+                    self._spool_queued_observations(sleep_time)
+                else:
+                    time.sleep(sleep_time)
                 self._disconnect_time += sleep_time
                 if self._disconnect_time > 5:
                     log.info("Server/Databroker still not connected!")
@@ -246,39 +430,13 @@ class Feeder:
                 if not processing_started:
                     processing_started = True
                     log.info("Starting to process CAN signals")
-                queue_size = self._dbc2vss_queue.qsize()
-                if queue_size > queue_max_size:
-                    queue_max_size = queue_size
-                vss_observation = self._dbc2vss_queue.get(timeout=1)
-                log.info("[_run_receiver] VSS Observation: %s", vss_observation)
-                vss_mapping = self._mapper.get_dbc2vss_mapping(vss_observation.dbc_name, vss_observation.vss_name)
-                log.info("[_run_receiver] Found mapping for %s to %s: %s",
-                         vss_observation.dbc_name, vss_observation.vss_name, vss_mapping)
-                value = vss_mapping.transform_value(vss_observation.raw_value)
-                if value is None:
-                    log.warning(
-                        "Value ignored for dbc %s to VSS %s, from raw value %s of type %s",
-                        vss_observation.dbc_name, vss_observation.vss_name, value, type(value)
-                    )
-                elif not vss_mapping.change_condition_fulfilled(value):
-                    log.debug("Value condition not fulfilled for VSS %s, value %s", vss_observation.vss_name, value)
-                else:
-                    # update current value in KUKSA.val
-                    target = vss_observation.vss_name
-
-                    success = self._kuksa_client.update_datapoint(target, value)
-                    if success:
-                        log.debug("Succeeded sending DataPoint(%s, %s, %f)", target, value, vss_observation.time)
-                        print("Updated: Datapoint(%s, %s)", target, value)
-                        # Give status message after 1, 2, 4, 8, 16, 32, 64, .... messages have been sent
-                        messages_sent += 1
-                        if messages_sent >= (2 * last_sent_log_entry):
-                            log.info(
-                                "Update datapoint requests sent to kuksa.val so far: %d, "
-                                "maximum number of queued CAN messages so far: %d",
-                                messages_sent, queue_max_size
-                            )
-                            last_sent_log_entry = messages_sent
+                timeout = 1.0
+                if self._spool is not None and len(self._spool) > 0:
+                    self._replay_spool()
+                    timeout = _SPOOL_REPLAY_INTERVAL
+                # always times out if observations are processed inline
+                vss_observation = self._dbc2vss_queue.get(timeout=timeout)
+                self._process_observation(vss_observation)
             except queue.Empty:
                 pass
             except Exception:
@@ -315,23 +473,16 @@ class Feeder:
             messages_to_send: Set[Message] = set()
             for signal_name in dbc_signal_names:
                 messages_to_send.update(self._mapper.get_messages_for_signal(signal_name))
-                log.info("Found %d messages for signal %s",
-                         len(messages_to_send), signal_name
-                         )
+                log.debug("Found %d messages for signal %s",
+                          len(messages_to_send), signal_name
+                          )
 
             for message_definition in messages_to_send:
+                data = self._mapper.encode_frame(message_definition.frame_id)
                 log.debug(
-                    "sending CAN message %s with frame ID %#x",
-                    message_definition.name, message_definition.frame_id
-                )
-                sig_dict = self._mapper.get_value_dict(message_definition.frame_id)
-                log.info(
-                    "Sending CAN message %s with frame ID %#x, signals: %s",
-                    message_definition.name, message_definition.frame_id, sig_dict
+                    "Sending CAN message %s with frame ID %#x, data: %s",
+                    message_definition.name, message_definition.frame_id, data.hex()
                 )
-                data = message_definition.encode(sig_dict)
-                log.info("Type CAN data prepare to send: %s", type(data))
-                log.info("Encoded CAN data: %s", data.hex())
                 self._canclient.send(arbitration_id=message_definition.frame_id, data=data)
 
     async def _run_subscribe(self):
@@ -437,6 +588,66 @@ def _get_kuksa_val_client(command_line_parser: argparse.Namespace,
     else:
         log.info("Path to token information not given")
 
+    if command_line_parser.batch_size:
+        batch_size = command_line_parser.batch_size
+    elif os.environ.get("BATCH_SIZE"):
+        batch_size = int(os.environ.get("BATCH_SIZE"))  # type: ignore[arg-type]
+    else:
+        batch_size = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_BATCH_SIZE,
+                                   fallback=databrokerclientwrapper.DEFAULT_BATCH_SIZE)
+    if command_line_parser.batch_delay:
+        batch_delay = command_line_parser.batch_delay
+    elif os.environ.get("BATCH_DELAY"):
+        batch_delay = int(os.environ.get("BATCH_DELAY"))  # type: ignore[arg-type]
+    else:
+        batch_delay = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_BATCH_DELAY,
+                                    fallback=databrokerclientwrapper.DEFAULT_BATCH_DELAY_MS)
+    if command_line_parser.max_in_flight:
+        max_in_flight = command_line_parser.max_in_flight
+    elif os.environ.get("MAX_IN_FLIGHT"):
+        max_in_flight = int(os.environ.get("MAX_IN_FLIGHT"))  # type: ignore[arg-type]
+    else:
+        max_in_flight = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_MAX_IN_FLIGHT,
+                                      fallback=databrokerclientwrapper.DEFAULT_MAX_IN_FLIGHT)
+    if command_line_parser.type_cache_file:
+        type_cache_file = command_line_parser.type_cache_file
+    elif os.environ.get("TYPE_CACHE_FILE"):
+        type_cache_file = os.environ.get("TYPE_CACHE_FILE")
+    else:
+        type_cache_file = config.get(CONFIG_SECTION_GENERAL, CONFIG_OPTION_TYPE_CACHE_FILE, fallback=None)
+    if isinstance(client, databrokerclientwrapper.DatabrokerClientWrapper):
+        client.set_batching(batch_size, batch_delay)
+        client.set_max_in_flight(max_in_flight)
+        if type_cache_file:
+            client.set_type_cache_file(type_cache_file)
+    else:
+        if batch_size > 1:
+            log.warning("Batching is only supported for KUKSA.val Databroker, ignoring batch size %d", batch_size)
+        if isinstance(client, serverclientwrapper.ServerClientWrapper):
+            client.set_max_in_flight(max_in_flight)
+        elif max_in_flight > 1:
+            log.warning("Asynchronous requests are not supported by the %s client, "
+                        "ignoring maximum number of requests in flight %d", type(client).__name__, max_in_flight)
+
+    if command_line_parser.record_dir:
+        record_dir = command_line_parser.record_dir
+    elif os.environ.get("RECORD_DIR"):
+        record_dir = os.environ.get("RECORD_DIR")
+    else:
+        record_dir = config.get(CONFIG_SECTION_GENERAL, CONFIG_OPTION_RECORD_DIR, fallback=None)
+    if command_line_parser.record_max_file_size:
+        record_max_file_size = command_line_parser.record_max_file_size
+    elif os.environ.get("RECORD_MAX_FILE_SIZE"):
+        record_max_file_size = int(os.environ.get("RECORD_MAX_FILE_SIZE"))  # type: ignore[arg-type]
+    else:
+        record_max_file_size = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_RECORD_MAX_FILE_SIZE,
+                                             fallback=recorder.DEFAULT_MAX_FILE_SIZE)
+    if isinstance(client, loggingclientwrapper.LoggingClientWrapper):
+        if record_dir:
+            client.set_recorder(recorder.ColumnarRecorder(record_dir, max_file_size=record_max_file_size))
+    elif record_dir:
+        log.warning("Recording is only supported for offline logging, ignoring record directory %s", record_dir)
+
     return client
 
 
@@ -462,6 +673,35 @@ def _get_command_line_args_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument("--canport", metavar="DEVICE", help="The name of the device representing the CAN bus")
     parser.add_argument("--use-j1939", action="store_true", help="Use j1939 messages on the CAN bus")
+    parser.add_argument(
+        "--queue-mode",
+        help="Which CAN signal values to send: fifo sends all values in the order they have been received, "
+             "latest only sends the latest value received for each VSS data entry, "
+             "inline sends all values directly from the thread reading from the CAN bus",
+        choices=[mode.value for mode in observationqueue.QueueMode]
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        metavar="SIZE",
+        help="The maximum number of CAN signal values waiting to be processed",
+    )
+    parser.add_argument(
+        "--queue-overflow-policy",
+        help="What to do with CAN signal values received while the maximum number of values is waiting",
+        choices=[policy.value for policy in observationqueue.OverflowPolicy]
+    )
+    parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        help="Process CAN frames and VSS Data Entry updates on a single asyncio event loop "
+             "(requires KUKSA.val Databroker and python-can)",
+    )
+    parser.add_argument(
+        "--compile-pipelines",
+        action="store_true",
+        help="Generate a function per CAN frame that decodes and transforms the mapped signals in one step",
+    )
 
     parser.add_argument(
         "--use-socketcan",
@@ -488,6 +728,58 @@ def _get_command_line_args_parser() -> argparse.ArgumentParser:
         help="The type of KUKSA.val server to write/read VSS signal to/from",
         choices=[server_type.value for server_type in ServerType]
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        metavar="COUNT",
+        help="The maximum number of VSS Data Entries to send to KUKSA.val Databroker in one request",
+    )
+    parser.add_argument(
+        "--batch-delay",
+        type=int,
+        metavar="MILLISECONDS",
+        help="The maximum time to wait for a batch of VSS Data Entry values to fill up before sending it",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        metavar="COUNT",
+        help="The maximum number of requests sent to the KUKSA.val server that may wait for a response",
+    )
+    parser.add_argument(
+        "--type-cache-file",
+        metavar="FILE",
+        help="A file to keep the data types of the VSS Data Entries registered in KUKSA.val Databroker in",
+    )
+    parser.add_argument(
+        "--record-dir",
+        metavar="DIRECTORY",
+        help="A directory to record the VSS Data Entry values in when using offline logging",
+    )
+    parser.add_argument(
+        "--record-max-file-size",
+        type=int,
+        metavar="BYTES",
+        help="The size after which a new recording file is started",
+    )
+    parser.add_argument(
+        "--spool-file",
+        metavar="FILE",
+        help="A file to keep CAN signal values in while the KUKSA.val server is not available, "
+             "they are sent once the server is available again",
+    )
+    parser.add_argument(
+        "--spool-max-size",
+        type=int,
+        metavar="BYTES",
+        help="The maximum size of the spool file",
+    )
+    parser.add_argument(
+        "--spool-replay-rate",
+        type=int,
+        metavar="COUNT",
+        help="The maximum number of spooled values to send per second once the KUKSA.val server is available again",
+    )
     parser.add_argument(
         "--lax-dbc-parsing",
         dest="strict",
@@ -591,6 +883,84 @@ def main(argv):
     else:
         use_j1939 = config.getboolean(CONFIG_SECTION_CAN, CONFIG_OPTION_J1939, fallback=False)
 
+    if args.queue_mode:
+        queue_mode_name = args.queue_mode
+    elif os.environ.get("QUEUE_MODE"):
+        queue_mode_name = os.environ.get("QUEUE_MODE")
+    else:
+        queue_mode_name = config.get(CONFIG_SECTION_GENERAL, CONFIG_OPTION_QUEUE_MODE,
+                                     fallback=observationqueue.QueueMode.FIFO.value)
+    try:
+        queue_mode = observationqueue.QueueMode(queue_mode_name)
+    except ValueError:
+        parser.error(f"Unknown queue mode: {queue_mode_name}")
+
+    if args.queue_size:
+        queue_size = args.queue_size
+    elif os.environ.get("QUEUE_SIZE"):
+        queue_size = int(os.environ.get("QUEUE_SIZE"))  # type: ignore[arg-type]
+    else:
+        queue_size = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_QUEUE_SIZE,
+                                   fallback=observationqueue.DEFAULT_QUEUE_SIZE)
+    if queue_size <= 0:
+        parser.error("Queue size must be greater than 0")
+
+    if args.queue_overflow_policy:
+        queue_overflow_policy_name = args.queue_overflow_policy
+    elif os.environ.get("QUEUE_OVERFLOW_POLICY"):
+        queue_overflow_policy_name = os.environ.get("QUEUE_OVERFLOW_POLICY")
+    else:
+        queue_overflow_policy_name = config.get(CONFIG_SECTION_GENERAL, CONFIG_OPTION_QUEUE_OVERFLOW_POLICY,
+                                                fallback=observationqueue.OverflowPolicy.COALESCE.value)
+    try:
+        queue_overflow_policy = observationqueue.OverflowPolicy(queue_overflow_policy_name)
+    except ValueError:
+        parser.error(f"Unknown queue overflow policy: {queue_overflow_policy_name}")
+
+    if args.compile_pipelines:
+        use_compiled_pipelines = True
+    elif os.environ.get("COMPILE_PIPELINES"):
+        use_compiled_pipelines = True
+    else:
+        use_compiled_pipelines = config.getboolean(CONFIG_SECTION_CAN, CONFIG_OPTION_COMPILED_PIPELINES,
+                                                   fallback=False)
+
+    if args.asyncio:
+        use_asyncio = True
+    elif os.environ.get("USE_ASYNCIO"):
+        use_asyncio = True
+    else:
+        use_asyncio = config.getboolean(CONFIG_SECTION_GENERAL, CONFIG_OPTION_ASYNCIO, fallback=False)
+    if use_asyncio and use_j1939:
+        parser.error("Cannot use J1939 and asyncio at the same time!")
+
+    if args.spool_file:
+        spool_file = args.spool_file
+    elif os.environ.get("SPOOL_FILE"):
+        spool_file = os.environ.get("SPOOL_FILE")
+    else:
+        spool_file = config.get(CONFIG_SECTION_GENERAL, CONFIG_OPTION_SPOOL_FILE, fallback=None)
+    if args.spool_max_size:
+        spool_max_size = args.spool_max_size
+    elif os.environ.get("SPOOL_MAX_SIZE"):
+        spool_max_size = int(os.environ.get("SPOOL_MAX_SIZE"))  # type: ignore[arg-type]
+    else:
+        spool_max_size = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_SPOOL_MAX_SIZE,
+                                       fallback=outagespool.DEFAULT_SPOOL_MAX_SIZE)
+    if spool_max_size <= 0:
+        parser.error("Spool size must be greater than 0")
+    if args.spool_replay_rate:
+        spool_replay_rate = args.spool_replay_rate
+    elif os.environ.get("SPOOL_REPLAY_RATE"):
+        spool_replay_rate = int(os.environ.get("SPOOL_REPLAY_RATE"))  # type: ignore[arg-type]
+    else:
+        spool_replay_rate = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_SPOOL_REPLAY_RATE,
+                                          fallback=outagespool.DEFAULT_SPOOL_REPLAY_RATE)
+    if spool_replay_rate <= 0:
+        parser.error("Spool replay rate must be greater than 0")
+    if use_asyncio and spool_file:
+        parser.error("Cannot use a spool file and asyncio at the same time!")
+
     candumpfile = None
     if not args.use_socketcan:
         if args.dumpfile:
@@ -610,6 +980,8 @@ def main(argv):
         if not config.has_section(CONFIG_SECTION_ELMCAN):
             parser.error("Cannot use elmcan without configuration in [elmcan] section!")
         elmcan_config = config[CONFIG_SECTION_ELMCAN]
+        if use_asyncio:
+            parser.error("Cannot use elmcan and asyncio at the same time!")
     
     log.info("Config variable and value: %s", config.items(CONFIG_SECTION_GENERAL))
     log.info("Command line arguments: %s", args)
@@ -619,6 +991,12 @@ def main(argv):
     log.info("Using DBC default file: %s", dbc_default)
     log.info("Using CAN dump file: %s", candumpfile)
     log.info("Using J1939: %s", use_j1939)
+    log.info("Using compiled pipelines: %s", use_compiled_pipelines)
+    log.info("Using asyncio: %s", use_asyncio)
+    log.info("Using queue mode %s", queue_mode.value)
+    log.info("Using queue size %d with overflow policy %s", queue_size, queue_overflow_policy.value)
+    log.info("Using spool file %s with maximum size %d, replaying %d values per second",
+             spool_file, spool_max_size, spool_replay_rate)
     log.info("Using DBC2VAL: %s", use_dbc2val)
     log.info("Using VAL2DBC: %s", use_val2dbc)
     log.info("Using ELM CAN configuration: %s", elmcan_config)
@@ -626,7 +1004,16 @@ def main(argv):
     log.info("Using strict DBC parsing: %s", args.strict)
 
     kuksa_val_client = _get_kuksa_val_client(args, config)
-    feeder = Feeder(kuksa_val_client, elmcan_config, dbc2vss=use_dbc2val, vss2dbc=use_val2dbc)
+    feeder: Union[Feeder, asyncfeeder.AsyncFeeder]
+    if use_asyncio:
+        if not isinstance(kuksa_val_client, databrokerclientwrapper.DatabrokerClientWrapper):
+            parser.error("Using asyncio requires KUKSA.val Databroker as server type!")
+        feeder = asyncfeeder.AsyncFeeder(kuksa_val_client, dbc2vss=use_dbc2val, vss2dbc=use_val2dbc)
+    else:
+        spool = outagespool.OutageSpool(spool_file, spool_max_size) if spool_file else None
+        feeder = Feeder(kuksa_val_client, elmcan_config, dbc2vss=use_dbc2val, vss2dbc=use_val2dbc,
+                        queue_size=queue_size, queue_overflow_policy=queue_overflow_policy,
+                        queue_mode=queue_mode, spool=spool, spool_replay_rate=spool_replay_rate)
 
     def signal_handler(signal_received, *_):
         log.info("Received signal %s, stopping...", signal_received)
@@ -642,6 +1029,19 @@ def main(argv):
     signal(SIGTERM, signal_handler)
 
     log.info("Starting CAN feeder")
+    if isinstance(feeder, asyncfeeder.AsyncFeeder):
+        asyncio.run(feeder.run(
+            canport=canport,
+            can_fd=args.canfd,
+            dbc_file_names=dbcfile.split(','),
+            mappingfile=mappingfile,
+            dbc_default_file=dbc_default,
+            candumpfile=candumpfile,
+            use_strict_parsing=args.strict,
+            use_compiled_pipelines=use_compiled_pipelines
+        ))
+        return 0
+
     feeder.start(
         canport=canport,
         dbc_file_names=dbcfile.split(','),
@@ -650,6 +1050,7 @@ def main(argv):
         candumpfile=candumpfile,
         use_j1939=use_j1939,
         use_strict_parsing=args.strict,
+        use_compiled_pipelines=use_compiled_pipelines,
         can_fd=args.canfd
     )
 
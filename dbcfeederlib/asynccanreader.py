@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+import asyncio
+import logging
+import threading
+
+from queue import Queue
+from typing import Optional
+
+import can  # type: ignore
+
+from dbcfeederlib import canreader
+from dbcfeederlib import dbc2vssmapper
+
+log = logging.getLogger(__name__)
+
+# Maximum number of CAN messages processed per wake-up of the event loop,
+# so that a busy CAN bus does not starve the loop's other tasks
+_MAX_MESSAGES_PER_WAKEUP = 64
+
+
+class AsyncCanReader(canreader.CanReader):
+    """
+    Reads CAN messages in an asyncio event loop.
+
+    The reader must be started from within the event loop. If the CAN bus provides
+    a file descriptor (like SocketCAN does), the descriptor is registered with the loop
+    and received messages are processed in the loop's thread as soon as they are available.
+    Otherwise (e.g. when replaying a CAN dump file using a virtual bus) a thread waits for
+    messages and hands them over to the loop.
+    """
+    def __init__(self, rxqueue: Queue, mapper: dbc2vssmapper.Mapper, can_port: str,
+                 can_fd: bool, dump_file: Optional[str] = None):
+        super().__init__(rxqueue, mapper, can_port, dump_file, can_fd=can_fd)
+        self._bus: Optional[can.BusABC] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fileno: Optional[int] = None
+
+    def _on_readable(self):
+        for _ in range(_MAX_MESSAGES_PER_WAKEUP):
+            try:
+                msg = self._bus.recv(timeout=0)
+            except can.CanError:
+                log.error("Error while receiving from CAN bus", exc_info=True)
+                return
+            if msg is None:
+                return
+            self._process_can_message(msg.arbitration_id, msg.data)
+
+    def _rx_worker(self):
+        log.info("Starting to receive CAN messages fom bus")
+        while self.is_running():
+            try:
+                msg = self._bus.recv(timeout=1)
+            except can.CanError:
+                if self.is_running():
+                    log.error("Error while receiving from CAN bus", exc_info=True)
+                continue
+            if msg is not None:
+                try:
+                    self._loop.call_soon_threadsafe(self._process_can_message, msg.arbitration_id, msg.data)
+                except RuntimeError:
+                    # the event loop has been closed
+                    break
+        log.info("Stopped receiving CAN messages from bus")
+
+    def _start_can_bus_listener(self):
+        self._loop = asyncio.get_running_loop()
+        self._bus = can.Bus(**self._can_kwargs)
+        try:
+            self._fileno = self._bus.fileno()
+        except NotImplementedError:
+            self._fileno = None
+        if self._fileno is not None and self._fileno >= 0:
+            self._loop.add_reader(self._fileno, self._on_readable)
+            log.info("Receiving CAN messages in event loop")
+        else:
+            self._fileno = None
+            rx_thread = threading.Thread(target=self._rx_worker, daemon=True)
+            rx_thread.start()
+            log.info("CAN bus does not provide a file descriptor, started CAN bus listener thread %s",
+                     rx_thread.name)
+
+    def _stop_can_bus_listener(self):
+        if self._fileno is not None:
+            self._loop.remove_reader(self._fileno)
+            self._fileno = None
+        if self._bus is not None:
+            self._bus.shutdown()
@@ -0,0 +1,317 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+"""
+Feeder variant running entirely on a single asyncio event loop.
+"""
+
+import asyncio
+import logging
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import can  # type: ignore
+
+import kuksa_client.grpc  # type: ignore[import]
+from kuksa_client.grpc import Datapoint
+from kuksa_client.grpc import DataEntry
+from kuksa_client.grpc import EntryUpdate
+from kuksa_client.grpc import Field
+from kuksa_client.grpc import Metadata
+from kuksa_client.grpc import SubscribeEntry
+from kuksa_client.grpc import View
+from kuksa_client.grpc.aio import VSSClient  # type: ignore[import]
+
+from dbcfeederlib import asynccanreader
+from dbcfeederlib import dbc2vssmapper
+from dbcfeederlib import observationqueue
+from dbcfeederlib import valueconverter
+from dbcfeederlib.databrokerclientwrapper import DatabrokerClientWrapper, vss_datatype
+
+log = logging.getLogger(__name__)
+
+# Time (in seconds) to wait before subscribing again after the subscription has been interrupted
+_RESUBSCRIBE_DELAY = 1.0
+
+
+class AsyncFeeder:
+    """
+    Feeds CAN signals to KUKSA.val Databroker and actuator targets from KUKSA.val Databroker
+    to CAN, using a single asyncio event loop for all of it.
+
+    CAN frames are received by an AsyncCanReader and transformed in the event loop.
+    VSS Data Entry values are written using the asynchronous VSSClient, keeping up to the
+    client wrapper's maximum number of requests in flight. While requests are in flight, the
+    values that are transformed in the meantime are collected and sent with the next request.
+    A value collected for a VSS Data Entry replaces a value for the same entry that has not
+    been sent yet. Values of an entry with a request in flight are only sent once that request
+    has completed, so the values of each entry are written in order.
+    """
+
+    def __init__(self, kuksa_client: DatabrokerClientWrapper, dbc2vss: bool = True, vss2dbc: bool = True):
+        self._kuksa_client = kuksa_client
+        self._dbc2vss_enabled = dbc2vss
+        self._vss2dbc_enabled = vss2dbc
+        self._running = False
+        self._mapper: Optional[dbc2vssmapper.Mapper] = None
+        self._reader: Optional[asynccanreader.AsyncCanReader] = None
+        self._canbus: Optional[can.BusABC] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._rpc_kwargs = kuksa_client.get_rpc_kwargs()
+        # converter and metadata used for the values of each VSS Data Entry
+        self._templates: Dict[str, Tuple[valueconverter.Converter, Metadata]] = {}
+        # VSS Data Entry values waiting to be sent
+        self._pending_values: Dict[str, Any] = {}
+        self._values_pending: Optional[asyncio.Event] = None
+        self._max_in_flight = kuksa_client.get_max_in_flight()
+        self._requests_in_flight = 0
+        # VSS Data Entries with a value in a request in flight
+        self._entries_in_flight: Set[str] = set()
+        self._dispatcher = observationqueue.InlineDispatcher(self._process_observation)
+        self._requests_sent = 0
+        self._values_sent = 0
+        self._values_failed = 0
+        self._last_sent_log_entry = 0
+
+    async def run(
+        self,
+        canport: str,
+        can_fd: bool,
+        dbc_file_names: List[str],
+        mappingfile: str,
+        dbc_default_file: Optional[str],
+        candumpfile: Optional[str],
+        use_strict_parsing: bool = False,
+        use_compiled_pipelines: bool = False
+    ):
+        """
+        Run the feeder until it is stopped.
+        """
+        self._running = True
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._values_pending = asyncio.Event()
+        self._mapper = dbc2vssmapper.Mapper(
+            mapping_definitions_file=mappingfile,
+            dbc_file_names=dbc_file_names,
+            use_strict_parsing=use_strict_parsing,
+            expect_extended_frame_ids=False,
+            can_signal_default_values_file=dbc_default_file,
+            use_compiled_pipelines=use_compiled_pipelines)
+
+        tasks: List[asyncio.Task] = []
+        async with self._kuksa_client.create_async_client() as client:
+            if not await self._register_datapoints(client):
+                log.error("Not all datapoints registered, exiting!")
+                self._running = False
+                return
+
+            if not self._dbc2vss_enabled:
+                log.info("Mapping of CAN signals to VSS Data Entries is disabled.")
+            elif not self._mapper.has_dbc2vss_mapping():
+                log.info("No mappings from CAN signals to VSS Data Entries defined.")
+            else:
+                log.info("Setting up reception of CAN signals")
+                self._reader = asynccanreader.AsyncCanReader(
+                    self._dispatcher, self._mapper, canport, can_fd, candumpfile)
+                tasks.append(asyncio.create_task(self._run_writer(client), name="writer"))
+                self._reader.start()
+
+            if not self._vss2dbc_enabled:
+                log.info("Mapping of VSS Data Entries to CAN signals is disabled.")
+            elif not self._mapper.has_vss2dbc_mapping():
+                log.info("No mappings from VSS Data Entries to CAN signals defined.")
+            else:
+                log.info("Processing VSS Data Entry changes, writing to CAN device %s", canport)
+                self._canbus = can.Bus(interface="socketcan", channel=canport, fd=can_fd)
+                tasks.append(asyncio.create_task(self._run_subscriber(client), name="subscriber"))
+            for task in tasks:
+                task.add_done_callback(self._task_done)
+
+            await self._stopped.wait()
+
+            if self._reader is not None:
+                self._reader.stop()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self._canbus is not None:
+                self._canbus.shutdown()
+        log.info("Feeder stopped, values sent: %d, values failed: %d", self._values_sent, self._values_failed)
+
+    def stop(self):
+        """
+        Stop the feeder. May be invoked from any thread.
+        """
+        log.info("Shutting down...")
+        self._running = False
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    def is_running(self) -> bool:
+        return self._running
+
+    def _task_done(self, task: asyncio.Task):
+        # The tasks only end when being cancelled, anything else is unexpected
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Unexpected error in %s task, stopping feeder", task.get_name(), exc_info=task.exception())
+            self.stop()
+
+    async def _register_datapoints(self, client: VSSClient) -> bool:
+        """
+        Check that all data points are registered and remember their data types.
+        Waits for the databroker to become available.
+        """
+        vss_names = self._mapper.get_vss_names()
+        log.info("Check that %d datapoints are registered", len(vss_names))
+        try:
+            metadata = await client.get_metadata(vss_names, wait_for_ready=True, **self._rpc_kwargs)
+        except kuksa_client.grpc.VSSClientError:
+            log.error("Error checking registration of datapoints", exc_info=True)
+            return False
+        for vss_name, entry_metadata in metadata.items():
+            data_type = entry_metadata.data_type
+            self._templates[vss_name] = (
+                valueconverter.create_converter(vss_datatype(data_type)), Metadata(data_type=data_type))
+        return all(vss_name in self._templates for vss_name in vss_names)
+
+    def _process_observation(self, vss_observation: dbc2vssmapper.VSSObservation):
+        # Invoked by the CAN reader in the event loop's thread
+        vss_mapping = self._mapper.get_dbc2vss_mapping(vss_observation.dbc_name, vss_observation.vss_name)
+        if vss_observation.transformed:
+            value = vss_observation.vss_value
+        else:
+            value = vss_mapping.transform_value(vss_observation.raw_value)
+        if value is None:
+            log.warning(
+                "Value ignored for dbc %s to VSS %s, from raw value %s of type %s",
+                vss_observation.dbc_name, vss_observation.vss_name, vss_observation.raw_value,
+                type(vss_observation.raw_value)
+            )
+        elif not vss_mapping.change_condition_fulfilled(value):
+            log.debug("Value condition not fulfilled for VSS %s, value %s", vss_observation.vss_name, value)
+        else:
+            self._pending_values[vss_observation.vss_name] = value
+            self._values_pending.set()
+
+    async def _run_writer(self, client: VSSClient):
+        log.info("Starting to process CAN signals")
+        requests: Set[asyncio.Task] = set()
+        try:
+            while True:
+                await self._values_pending.wait()
+                self._values_pending.clear()
+                if self._requests_in_flight >= self._max_in_flight:
+                    # sending is resumed once a request has completed
+                    continue
+                values = {name: value for name, value in self._pending_values.items()
+                          if name not in self._entries_in_flight}
+                for name in values:
+                    del self._pending_values[name]
+                updates = self._create_updates(values)
+                if not updates:
+                    continue
+                names = [update.entry.path for update in updates]
+                self._entries_in_flight.update(names)
+                self._requests_in_flight += 1
+                request = asyncio.create_task(self._send_updates(client, updates, names))
+                requests.add(request)
+                request.add_done_callback(requests.discard)
+        finally:
+            for request in requests:
+                request.cancel()
+
+    def _create_updates(self, values: Dict[str, Any]) -> List[EntryUpdate]:
+        updates = []
+        for name, value in values.items():
+            convert, metadata = self._templates[name]
+            try:
+                updates.append(EntryUpdate(DataEntry(
+                    name, value=Datapoint(value=convert(value)), metadata=metadata), (Field.VALUE,)))
+            except (ValueError, TypeError, OverflowError):
+                log.error("Cannot convert value %s for %s to %s", value, name, metadata.data_type.name)
+                self._values_failed += 1
+        return updates
+
+    async def _send_updates(self, client: VSSClient, updates: List[EntryUpdate], names: List[str]):
+        try:
+            # wait for the databroker instead of failing while it is not available
+            await client.set(updates=updates, wait_for_ready=True, **self._rpc_kwargs)
+        except kuksa_client.grpc.VSSClientError:
+            log.error("Error sending %d values to databroker", len(updates), exc_info=True)
+            self._values_failed += len(updates)
+            return
+        finally:
+            self._requests_in_flight -= 1
+            self._entries_in_flight.difference_update(names)
+            if self._pending_values:
+                self._values_pending.set()
+
+        self._requests_sent += 1
+        self._values_sent += len(updates)
+        # Give status message after 1, 2, 4, 8, 16, 32, 64, .... requests have been sent
+        if self._requests_sent >= (2 * self._last_sent_log_entry):
+            log.info("Update requests sent to databroker so far: %d (%d values)",
+                     self._requests_sent, self._values_sent)
+            log.info("Observation processing: %s", self._dispatcher.get_statistics())
+            if self._reader is not None:
+                log.info("CAN frame processing: %s", self._reader.get_processing_statistics())
+            self._last_sent_log_entry = self._requests_sent
+
+    async def _run_subscriber(self, client: VSSClient):
+        entries = [SubscribeEntry(name, View.FIELDS, [Field.ACTUATOR_TARGET])
+                   for name in self._mapper.get_vss2dbc_entries()]
+        while True:
+            log.info("Subscribing to entries: %s", entries)
+            try:
+                async for updates in client.subscribe(entries=entries, wait_for_ready=True, **self._rpc_kwargs):
+                    self._vss_update(updates)
+                log.info("Subscription has been ended by data broker")
+            except kuksa_client.grpc.VSSClientError:
+                log.warning("Subscription has been interrupted", exc_info=True)
+            log.info("Subscribing again once connected to data broker")
+            await asyncio.sleep(_RESUBSCRIBE_DELAY)
+
+    def _vss_update(self, updates: List[EntryUpdate]):
+        log.debug("Processing %d VSS Data Entry updates", len(updates))
+        dbc_signal_names: Set[str] = set()
+        for update in updates:
+            if update.entry.actuator_target is not None:
+                log.debug(
+                    "Target value for %s is now: %s of type %s",
+                    update.entry.path, update.entry.actuator_target, type(update.entry.actuator_target.value)
+                )
+                dbc_signal_names.update(
+                    self._mapper.handle_update(update.entry.path, update.entry.actuator_target.value))
+
+        messages_to_send = set()
+        for signal_name in dbc_signal_names:
+            messages_to_send.update(self._mapper.get_messages_for_signal(signal_name))
+
+        for message_definition in messages_to_send:
+            data = self._mapper.encode_frame(message_definition.frame_id)
+            log.debug("Sending CAN message %s with frame ID %#x, data: %s",
+                      message_definition.name, message_definition.frame_id, data.hex())
+            try:
+                self._canbus.send(can.Message(arbitration_id=message_definition.frame_id, data=data,
+                                              is_extended_id=message_definition.is_extended_frame))
+            except can.CanError:
+                log.error("Failed to send message via CAN bus")
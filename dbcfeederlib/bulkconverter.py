@@ -0,0 +1,217 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+"""
+Conversion of recorded CAN traffic to VSS Data Entry values, as fast as the files can be processed.
+
+The dump files are split into tasks, one per file or, for candump log files, one per chunk of
+the file, which are converted by a pool of processes. Each task decodes and transforms the mapped
+signals of the CAN frames it contains. The results of all tasks are merged by the frames' recorded
+timestamps and the interval and on_change conditions of the mappings are evaluated on the merged
+values in the order of their timestamps, like the feeder does for values received from the bus.
+"""
+
+import heapq
+import io
+import logging
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+import can  # type: ignore
+
+from dbcfeederlib.canreader import CanReader
+from dbcfeederlib.dbc2vssmapper import Mapper, VSSMapping
+from dbcfeederlib.outputwriter import OutputWriter
+
+log = logging.getLogger(__name__)
+
+# Size (in bytes) of the chunks candump log files are split into
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+
+# suffix of the text format written by candump -l, which can be split at line boundaries
+_CANDUMP_SUFFIX = ".log"
+
+# A file name with the range of bytes to convert, None for the whole file
+ConversionTask = Tuple[str, Optional[int], Optional[int]]
+# A transformed value: recorded timestamp, DBC signal name, VSS name, VSS value (None if the transformation failed)
+ConvertedValue = Tuple[float, str, str, Any]
+
+
+class _DumpDecoder(CanReader):
+    """
+    Decodes and transforms the mapped signals of recorded CAN frames, without evaluating
+    the mappings' interval and on_change conditions.
+    """
+
+    def __init__(self, mapper: Mapper):
+        super().__init__(None, mapper, "dump")  # type: ignore[arg-type]
+        # Last payload per CAN frame ID along with the transformed values of its mapped signals
+        self._transformed: Dict[int, Tuple[bytes, List[Tuple[VSSMapping, Any, Any]]]] = {}
+
+    def _start_can_bus_listener(self):
+        pass
+
+    def _stop_can_bus_listener(self):
+        pass
+
+    def _transform_frame(self, frame_id: int, payload: bytes) -> List[Tuple[VSSMapping, Any, Any]]:
+        cached = self._transformed.get(frame_id)
+        if cached is not None and cached[0] == payload:
+            return cached[1]
+        frame = self._mapper.get_frame_dispatch(frame_id)
+        results: List[Tuple[VSSMapping, Any, Any]] = []
+        if frame is not None:
+            try:
+                if frame.pipeline is not None:
+                    results = frame.pipeline(payload)
+                else:
+                    for dispatch, raw_value in self._decode_frame(frame, payload):
+                        results.extend((vss_mapping, raw_value, vss_mapping.transform_value(raw_value))
+                                       for vss_mapping in dispatch.mappings)
+            except Exception:
+                log.warning("Error processing CAN message with frame ID: %#x", frame_id, exc_info=True)
+        self._transformed[frame_id] = (payload, results)
+        return results
+
+    def convert(self, messages) -> List[ConvertedValue]:
+        """Convert CAN messages to VSS values, ordered by their timestamps."""
+        values: List[ConvertedValue] = []
+        for msg in messages:
+            if msg.is_error_frame or msg.is_remote_frame:
+                continue
+            for vss_mapping, _, vss_value in self._transform_frame(msg.arbitration_id, bytes(msg.data)):
+                values.append((msg.timestamp, vss_mapping.dbc_name, vss_mapping.vss_name, vss_value))
+        values.sort(key=itemgetter(0))
+        return values
+
+
+# The decoder of a worker process, created by _init_worker
+_worker_decoder: Optional[_DumpDecoder] = None
+
+
+def _init_worker(mapper_kwargs: Dict[str, Any]):
+    global _worker_decoder
+    _worker_decoder = _DumpDecoder(Mapper(**mapper_kwargs))
+
+
+def _read_messages(task: ConversionTask):
+    file_name, start, end = task
+    if start is None or end is None:
+        return can.LogReader(file_name)
+    with open(file_name, "rb") as file:
+        # A chunk contains the lines that start within its range of bytes
+        if start > 0:
+            file.seek(start - 1)
+            file.readline()
+        data = file.read(max(end - file.tell(), 0))
+        if data and not data.endswith(b"\n"):
+            data += file.readline()
+    return can.CanutilsLogReader(io.StringIO(data.decode("utf-8", errors="replace")))
+
+
+def _convert(decoder: _DumpDecoder, task: ConversionTask) -> List[ConvertedValue]:
+    with _read_messages(task) as messages:
+        return decoder.convert(messages)
+
+
+def _convert_task(task: ConversionTask) -> List[ConvertedValue]:
+    return _convert(_worker_decoder, task)  # type: ignore[arg-type]
+
+
+class BulkConverter:
+    """
+    Converts dump files of recorded CAN traffic (any format supported by python-can's LogReader)
+    to VSS Data Entry values written to an OutputWriter.
+
+    All dump files are treated as one recording, i.e. the values of all files are merged by
+    their timestamps. Note that timestamps in ASC files are relative to the start of the
+    recording, so these should not be converted along with files using absolute timestamps.
+    """
+
+    def __init__(self, mapping_file: str, dbc_file_names: List[str], use_strict_parsing: bool = False,
+                 use_compiled_pipelines: bool = False, jobs: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be greater than 0")
+        self._mapper_kwargs: Dict[str, Any] = {
+            "mapping_definitions_file": mapping_file,
+            "dbc_file_names": dbc_file_names,
+            "use_strict_parsing": use_strict_parsing,
+            "use_compiled_pipelines": use_compiled_pipelines
+        }
+        self._jobs = jobs if jobs is not None else (os.cpu_count() or 1)
+        self._chunk_size = chunk_size
+
+    def _create_tasks(self, dump_files: List[str]) -> List[ConversionTask]:
+        tasks: List[ConversionTask] = []
+        for file_name in dump_files:
+            if file_name.lower().endswith(_CANDUMP_SUFFIX):
+                size = os.path.getsize(file_name)
+                for start in range(0, max(size, 1), self._chunk_size):
+                    tasks.append((file_name, start, min(start + self._chunk_size, size)))
+            else:
+                tasks.append((file_name, None, None))
+        return tasks
+
+    def _convert_tasks(self, tasks: List[ConversionTask]) -> List[List[ConvertedValue]]:
+        if self._jobs <= 1 or len(tasks) <= 1:
+            decoder = _DumpDecoder(Mapper(**self._mapper_kwargs))
+            return [_convert(decoder, task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=min(self._jobs, len(tasks)), initializer=_init_worker,
+                                 initargs=(self._mapper_kwargs,)) as executor:
+            return list(executor.map(_convert_task, tasks))
+
+    def convert(self, dump_files: List[str], output: OutputWriter) -> Dict[str, Any]:
+        """
+        Convert the given dump files and write the resulting values to the (started) output.
+
+        Returns statistics about the conversion:
+
+        * tasks: the number of files and chunks of files that have been converted
+        * values: the number of transformed values
+        * written: the number of values that fulfilled the mappings' conditions and have been written
+        """
+        tasks = self._create_tasks(dump_files)
+        log.info("Converting %d dump files in %d tasks using %d processes", len(dump_files), len(tasks),
+                 min(self._jobs, len(tasks)))
+        results = self._convert_tasks(tasks)
+
+        # The conditions are evaluated in the order of the timestamps with a mapper of its own,
+        # since the tasks do not know about the values of the tasks preceding them
+        mapper = Mapper(**self._mapper_kwargs)
+        values = 0
+        written = 0
+        for timestamp, dbc_name, vss_name, vss_value in heapq.merge(*results, key=itemgetter(0)):
+            values += 1
+            vss_mapping = mapper.get_dbc2vss_mapping(dbc_name, vss_name)
+            if vss_mapping is None or not vss_mapping.time_condition_fulfilled(timestamp):
+                continue
+            if vss_value is None:
+                log.debug("Value ignored for dbc %s to VSS %s at %f", dbc_name, vss_name, timestamp)
+                continue
+            if vss_mapping.change_condition_fulfilled(vss_value):
+                output.write(vss_name, vss_value, timestamp)
+                written += 1
+        statistics = {"tasks": len(tasks), "values": values, "written": written}
+        log.info("Converted dump files: %s", statistics)
+        return statistics
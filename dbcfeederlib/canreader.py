@@ -18,16 +18,19 @@ import time
 
 from abc import ABC, abstractmethod
 
-import cantools.database  # type: ignore
-
 from cantools.typechecking import SignalMappingType
 from dbcfeederlib.canplayer import CANplayer
-from dbcfeederlib.dbc2vssmapper import Mapper, VSSObservation
-from typing import Any, Dict, Optional
+from dbcfeederlib.dbc2vssmapper import FrameDispatch, Mapper, SignalDispatch, VSSObservation
+from dbcfeederlib.framepipeline import PipelineResult
+from typing import Any, Dict, List, Optional, Tuple
 from queue import Queue
 
 log = logging.getLogger(__name__)
 
+# Margin (in seconds) subtracted from a frame's next due time to make up for
+# rounding differences to the mappings' own interval calculation
+_DUE_TIME_TOLERANCE = 0.000001
+
 
 class CanReader(ABC):
     """
@@ -43,6 +46,15 @@ class CanReader(ABC):
         self._mapper = mapper
         self._running = False
         self._can_player: Optional[CANplayer] = None
+        # Last payload received per CAN frame ID along with the (range checked) values of its mapped signals,
+        # for frames with a compiled pipeline along with the pipeline's result
+        self._payload_cache: Dict[int, Tuple[bytes, List[Tuple[Any, ...]]]] = {}
+        self._payload_cache_hits = 0
+        self._payload_cache_misses = 0
+        self._suppressed_observations = 0
+        # Earliest point in time per CAN frame ID at which any of the frame's interval conditions may be fulfilled
+        self._next_due_times: Dict[int, float] = {}
+        self._gated_frames = 0
 
         can_filters = mapper.can_frame_id_whitelist()
         log.info("Using CAN frame ID whitelist=%s", can_filters)
@@ -60,6 +72,26 @@ class CanReader(ABC):
     def is_running(self) -> bool:
         return self._running
 
+    def get_processing_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about the processing of received CAN frames:
+
+        * gated_frames: frames dropped before decoding because no mapping's interval condition was due
+        * payload_cache_hits/payload_cache_misses: frames whose payload did/did not equal the previously
+          received payload
+        * payload_cache_hit_rate: ratio of payload cache hits to decoded or cached frames
+        * suppressed_observations: observations not queued because they would not have changed
+          the value of an "on_change" VSS data entry
+        """
+        received = self._payload_cache_hits + self._payload_cache_misses
+        return {
+            "gated_frames": self._gated_frames,
+            "payload_cache_hits": self._payload_cache_hits,
+            "payload_cache_misses": self._payload_cache_misses,
+            "payload_cache_hit_rate": self._payload_cache_hits / received if received > 0 else 0.0,
+            "suppressed_observations": self._suppressed_observations
+        }
+
     @abstractmethod
     def _start_can_bus_listener(self):
         """
@@ -93,71 +125,142 @@ class CanReader(ABC):
         self._running = False
         log.info("Stopping CAN bus listener on %s", self._can_kwargs["channel"])
         self._stop_can_bus_listener()
+        log.info("CAN frame processing statistics: %s", self.get_processing_statistics())
 
     def _process_can_message(self, frame_id: int, data: Any):
         try:
-            message_def = self._mapper.get_message_by_frame_id(frame_id)
-            log.info("Processing CAN message with frame ID: %#x", frame_id)
-            if message_def is not None:
-                decode = message_def.decode(bytes(data), allow_truncated=True, decode_containers=True)
-                if log.isEnabledFor(logging.DEBUG):
-                    log.info("[CANReader._process_can_messages] Decoded message: %s", str(decode))
+            frame = self._mapper.get_frame_dispatch(frame_id)
+            if frame is not None:
                 rx_time = time.time()
+                if rx_time < self._next_due_times.get(frame_id, 0.0):
+                    # none of the frame's mappings would accept a value yet
+                    self._gated_frames += 1
+                    return
+                log.debug("Processing CAN message with frame ID: %#x", frame_id)
+                payload = bytes(data)
+
+                # Periodic CAN frames mostly repeat their payload, so there is no need to decode it again
+                cached = self._payload_cache.get(frame_id)
+                if cached is not None and cached[0] == payload:
+                    self._payload_cache_hits += 1
+                    values = cached[1]
+                else:
+                    self._payload_cache_misses += 1
+                    if frame.pipeline is not None:
+                        values = frame.pipeline(payload)
+                    else:
+                        values = self._decode_frame(frame, payload)
+                    self._payload_cache[frame_id] = (payload, values)
 
-                if isinstance(decode, dict):
-                    # handle normal frame
-                    self._handle_decoded_frame(message_def, decode, rx_time)
+                if frame.pipeline is not None:
+                    self._queue_transformed_observations(values, rx_time)
                 else:
-                    # handle container frame
-                    for tmp in decode:
-                        if isinstance(tmp[1], bytes):
-                            continue
-                        self._handle_decoded_frame(tmp[0], tmp[1], rx_time)
+                    self._queue_observations(values, rx_time)
+                if frame.interval_mappings:
+                    self._next_due_times[frame_id] = frame.next_due_time() - _DUE_TIME_TOLERANCE
 
         except Exception:
             log.warning("Error processing CAN message with frame ID: %#x", frame_id, exc_info=True)
 
-    def _handle_decoded_frame(self, message_def: cantools.database.Message, decoded: SignalMappingType, rx_time: float):
-        
-        log.info("Handling decoded frame for message: %s", message_def.name)
-        for signal_name, raw_value in decoded.items():  # type: ignore
-            signal: cantools.database.Signal = message_def.get_signal_by_name(signal_name)
-            # LOGS WHEN DEVELOPMENT PHASE
-            log.info(
-                "Received CAN message: CAN ID=%#x, Signal Index=%s, Signal Name=%s, Raw Value=%s",
-                message_def.frame_id, signal.start, signal_name, raw_value
+    def _decode_frame(self, frame: FrameDispatch, payload: bytes) -> List[Tuple[SignalDispatch, Any]]:
+        """
+        Decode the mapped signals of a CAN frame.
+        Returns the signals' dispatch information along with their in-range values.
+        """
+        decode = frame.decoder.decode(payload)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Decoded message: %s", str(decode))
+
+        signal_values: List[Tuple[SignalDispatch, Any]] = []
+        if isinstance(decode, dict):
+            # handle normal frame
+            self._handle_decoded_frame(frame, decode, signal_values)
+        else:
+            # handle container frame
+            for tmp in decode:
+                if isinstance(tmp[1], bytes):
+                    continue
+                self._handle_decoded_frame(frame, tmp[1], signal_values)
+        return signal_values
+
+    def _handle_decoded_frame(self, frame: FrameDispatch, decoded: SignalMappingType,
+                              signal_values: List[Tuple[SignalDispatch, Any]]):
+
+        for signal_name, dispatch in frame.signals.items():
+            if signal_name not in decoded:
+                continue
+            raw_value = decoded[signal_name]  # type: ignore
+            log.debug(
+                "Received CAN signal: CAN ID=%#x, Signal Name=%s, Raw Value=%s",
+                frame.message.frame_id, signal_name, raw_value
             )
 
             if isinstance(raw_value, (int, float)):
                 # filter out signals with values out of defined range
                 # which is usually because the signal's value is unavailable
                 # (represented as e.g. "all bits set")
-                if signal.minimum is not None and raw_value < signal.minimum:
+                if dispatch.minimum is not None and raw_value < dispatch.minimum:
                     log.debug(
                         "discarding out-of-range value [signal: %s, min: %s, value: %s]",
-                        signal_name, signal.minimum, raw_value
+                        signal_name, dispatch.minimum, raw_value
                     )
                     continue
-                if signal.maximum is not None and raw_value > signal.maximum:
+                if dispatch.maximum is not None and raw_value > dispatch.maximum:
                     log.debug(
                         "discarding out-of-range value [signal: %s, max: %s, value: %s]",
-                        signal_name, signal.maximum, raw_value
+                        signal_name, dispatch.maximum, raw_value
                     )
                     continue
-            log.info("DBC to VSS mapping for signal %s: %s", signal_name, self._mapper.get_dbc2vss_mappings(signal_name))
-            for signal_mapping in self._mapper.get_dbc2vss_mappings(signal_name):
+            signal_values.append((dispatch, raw_value))
+
+    def _queue_observations(self, signal_values: List[Tuple[SignalDispatch, Any]], rx_time: float):
 
-                if signal_mapping.time_condition_fulfilled(rx_time):
+        for dispatch, raw_value in signal_values:
+            signal_name = dispatch.signal.name
+            for signal_mapping in dispatch.mappings:
+
+                if not signal_mapping.time_condition_fulfilled(rx_time):
                     log.debug(
-                        "Queueing %s, triggered by %s, raw value %s",
+                        "Ignoring %s, triggered by %s, raw value %s",
+                        signal_mapping.vss_name, signal_name, raw_value
+                    )
+                elif signal_mapping.on_change and signal_mapping.last_queued_value == raw_value:
+                    # The same raw value always results in the same VSS value which would be
+                    # discarded by the receiver because it has not changed
+                    self._suppressed_observations += 1
+                    log.debug(
+                        "Ignoring unchanged %s, triggered by %s, raw value %s",
                         signal_mapping.vss_name, signal_name, raw_value
                     )
-                    self._queue.put(VSSObservation(
-                        signal_name, signal_mapping.vss_name, raw_value, rx_time))
-                    log.info("Put VSS observation: %s", VSSObservation(
-                        signal_name, signal_mapping.vss_name, raw_value, rx_time))
                 else:
                     log.debug(
-                        "Ignoring %s, triggered by %s, raw value %s",
+                        "Queueing %s, triggered by %s, raw value %s",
                         signal_mapping.vss_name, signal_name, raw_value
-                    )
\ No newline at end of file
+                    )
+                    signal_mapping.last_queued_value = raw_value
+                    self._queue.put(VSSObservation(
+                        signal_name, signal_mapping.vss_name, raw_value, rx_time))
+
+    def _queue_transformed_observations(self, results: PipelineResult, rx_time: float):
+
+        for signal_mapping, raw_value, vss_value in results:
+            if not signal_mapping.time_condition_fulfilled(rx_time):
+                log.debug(
+                    "Ignoring %s, triggered by %s, raw value %s",
+                    signal_mapping.vss_name, signal_mapping.dbc_name, raw_value
+                )
+            elif signal_mapping.on_change and signal_mapping.last_queued_value == raw_value:
+                self._suppressed_observations += 1
+                log.debug(
+                    "Ignoring unchanged %s, triggered by %s, raw value %s",
+                    signal_mapping.vss_name, signal_mapping.dbc_name, raw_value
+                )
+            else:
+                log.debug(
+                    "Queueing %s, triggered by %s, raw value %s, VSS value %s",
+                    signal_mapping.vss_name, signal_mapping.dbc_name, raw_value, vss_value
+                )
+                signal_mapping.last_queued_value = raw_value
+                self._queue.put(VSSObservation(
+                    signal_mapping.dbc_name, signal_mapping.vss_name, raw_value, rx_time,
+                    vss_value=vss_value, transformed=True))
@@ -14,7 +14,7 @@
 #################################################################################
 
 import logging
-from typing import Any, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from abc import ABC, abstractmethod
 
@@ -38,6 +38,10 @@ class ClientWrapper(ABC):
         self._registered = False
         self._root_ca_path: Optional[str] = None
         self._tls_server_name: Optional[str] = None
+        # VSS data types of the VSS Data Entries as defined in the mapping
+        self._data_types: Dict[str, str] = {}
+        # invoked for values that have been accepted by update_datapoint but could not be sent
+        self._failure_callback: Optional[Callable[[str, Any, Optional[float]], None]] = None
         self._do_init()
 
     def _do_init(self):
@@ -83,6 +87,53 @@ class ClientWrapper(ABC):
         self._token_path = token_path
         log.info("Using token from: %s", self._token_path)
 
+    def set_data_types(self, data_types: Dict[str, str]):
+        """
+        Set the VSS data types (e.g. "uint8") of the VSS Data Entries values are sent for,
+        as defined in the mapping. Used to convert values before sending them.
+        """
+        self._data_types = dict(data_types)
+
+    def set_failure_callback(self, callback: Callable[[str, Any, Optional[float]], None]):
+        """
+        Set the function to invoke with the VSS Data Entry, the value and its timestamp for each value
+        for which update_datapoint has returned True but which could not be sent to the server later on,
+        e.g. because it has been sent in a batch. The function may be invoked by any thread.
+        """
+        self._failure_callback = callback
+
+    def _report_failed_values(self, values: Dict[str, Tuple[Any, Optional[float]]]):
+        # Report values accepted by update_datapoint which could not be sent
+        if self._failure_callback is not None:
+            for name, (value, timestamp) in values.items():
+                self._failure_callback(name, value, timestamp)
+
+    def are_signals_defined(self, vss_names: Iterable[str]) -> bool:
+        """
+        Check if all given signals are registered.
+        This default implementation checks the signals one by one.
+        """
+        all_registered = True
+        for vss_name in vss_names:
+            if not self.is_signal_defined(vss_name):
+                all_registered = False
+        return all_registered
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get client specific statistics about the values sent to the server.
+        This default implementation returns no statistics.
+        """
+        return {}
+
+    def update_datapoint_sync(self, name: str, value: Any, timestamp: Optional[float] = None) -> bool:
+        """
+        Update datapoint and wait until the server has handled the update, bypassing any
+        batching or pipelining of the client. Returns True if the server has accepted the value.
+        This default implementation is the same as update_datapoint.
+        """
+        return self.update_datapoint(name, value, timestamp)
+
     # Abstract methods to implement
     @abstractmethod
     def start(self):
@@ -97,8 +148,11 @@ class ClientWrapper(ABC):
         pass
 
     @abstractmethod
-    def update_datapoint(self, name: str, value: Any) -> bool:
-        pass
+    def update_datapoint(self, name: str, value: Any, timestamp: Optional[float] = None) -> bool:
+        """
+        Update datapoint. The timestamp is the time (in seconds since the epoch) the value
+        has been observed at, clients that keep the time of the values use the current time if None.
+        """
 
     @abstractmethod
     def stop(self):
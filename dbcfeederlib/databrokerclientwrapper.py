@@ -13,11 +13,17 @@
 # SPDX-License-Identifier: Apache-2.0
 #################################################################################
 
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import os
 import contextlib
+import functools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import grpc.aio
@@ -29,13 +35,29 @@ from kuksa_client.grpc import DataType
 from kuksa_client.grpc import EntryUpdate
 from kuksa_client.grpc import Field
 from kuksa_client.grpc import Metadata
+from kuksa_client.grpc import MetadataField
 from kuksa_client.grpc.aio import VSSClient  # type: ignore[import]
 from kuksa_client.grpc import SubscribeEntry
 from kuksa_client.grpc import View
 from dbcfeederlib import clientwrapper
+from dbcfeederlib import valueconverter
 
 log = logging.getLogger(__name__)
 
+DEFAULT_BATCH_SIZE = 1
+DEFAULT_BATCH_DELAY_MS = 10
+DEFAULT_MAX_IN_FLIGHT = 1
+
+# Time (in seconds) to wait before subscribing again after a subscription has been interrupted
+_RESUBSCRIBE_DELAY = 1.0
+
+_VALUE_FIELDS = (Field.VALUE,)
+
+
+def vss_datatype(data_type: DataType) -> str:
+    """Get the name of the VSS data type (e.g. "uint8[]") corresponding to a databroker data type."""
+    return data_type.name.lower().replace("_array", "[]")
+
 
 class DatabrokerClientWrapper(clientwrapper.ClientWrapper):
     """
@@ -52,10 +74,43 @@ class DatabrokerClientWrapper(clientwrapper.ClientWrapper):
         super().__init__(ip, port, token_path, tls)
         self._grpc_client = None
         self._name_to_type: Dict[str, DataType] = {}
+        # converter and metadata used for the values of a VSS Data Entry, created when first needed
+        self._templates: Dict[str, Tuple[valueconverter.Converter, Metadata]] = {}
         self._rpc_kwargs: Dict[str, str] = {}
         self._connected = False
+        # set while the channel to the databroker is connected, shared by all requests and subscriptions
+        self._channel_ready = threading.Event()
         self._exit_stack = contextlib.ExitStack()
         self._token = ""
+        self._batch_size = DEFAULT_BATCH_SIZE
+        self._batch_delay = DEFAULT_BATCH_DELAY_MS / 1000
+        # values and their timestamps waiting to be sent in the next batch, guarded by the condition
+        self._batch_condition = threading.Condition()
+        self._pending_values: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._batch_deadline = 0.0
+        self._batching = False
+        self._flusher: Optional[threading.Thread] = None
+        self._max_in_flight = DEFAULT_MAX_IN_FLIGHT
+        # Requests are sent by single threaded lanes, the values of a VSS Data Entry are always sent
+        # by the same lane so that they cannot overtake each other
+        self._lanes: List[ThreadPoolExecutor] = []
+        self._window = threading.BoundedSemaphore(DEFAULT_MAX_IN_FLIGHT)
+        self._in_flight = 0
+        self._max_in_flight_seen = 0
+        self._failed_per_path: Dict[str, int] = {}
+        # Data type names of VSS Data Entries per broker identity, optionally persisted in a file
+        self._type_cache_file: Optional[str] = None
+        self._type_cache: Optional[Dict[str, Dict[str, str]]] = None
+        self._broker_identity = ""
+        # set once the data types have been checked, later checks (after reconnecting) request all of them
+        self._types_checked = False
+        self._requests_sent = 0
+        self._values_sent = 0
+        self._values_failed = 0
+        self._values_coalesced = 0
+        self._max_batch_size = 0
+        self._total_rtt = 0.0
+        self._max_rtt = 0.0
 
     def _do_init(self):
         """
@@ -68,15 +123,43 @@ class DatabrokerClientWrapper(clientwrapper.ClientWrapper):
             )
             self._rpc_kwargs = {'metadata': grpc_metadata}
 
-    def start(self):
+    def set_batching(self, max_values: int, max_delay_ms: int):
         """
-        Start connection to databroker and authorize
+        Send values in batches of up to max_values VSS Data Entries, each batch being sent
+        at most max_delay_ms milliseconds after its first value has been added.
+        A value replaces a value for the same VSS Data Entry waiting in the batch.
+        Values of a batch that cannot be sent are reported to the failure callback.
+        A batch size of 1 disables batching.
         """
+        if max_values < 1:
+            raise ValueError("Batch size must be at least 1")
+        self._batch_size = max_values
+        self._batch_delay = max_delay_ms / 1000
+        log.info("Using batch size %d with maximum delay of %d ms", max_values, max_delay_ms)
 
-        log.info(f"Connecting to Data Broker using {self._ip}:{self._port}")
+    def set_type_cache_file(self, path: str):
+        """
+        Set the file to persist the data types of VSS Data Entries in,
+        so that they do not need to be requested from the databroker again.
+        """
+        self._type_cache_file = path
+        log.info("Using data type cache file: %s", path)
+
+    def set_max_in_flight(self, max_requests: int):
+        """
+        Send values asynchronously, keeping up to max_requests set requests in flight.
+        Sending a value blocks while max_requests requests are in flight.
+        Values that cannot be sent are reported to the failure callback.
+        A maximum of 1 sends values synchronously.
+        """
+        if max_requests < 1:
+            raise ValueError("Maximum number of requests in flight must be at least 1")
+        self._max_in_flight = max_requests
+        self._window = threading.BoundedSemaphore(max_requests)
+        log.info("Using up to %d requests in flight", max_requests)
 
+    def _read_token(self):
         # For now will just throw a FileNotFoundError if file cannot be found
-        # token = ""
         if self._token_path != "":
             log.info(f"Token path specified is {self._token_path}")
             with open(self._token_path, "r") as file:
@@ -85,23 +168,31 @@ class DatabrokerClientWrapper(clientwrapper.ClientWrapper):
         else:
             log.info("No token path specified. KUKSA.val Databroker must run without authentication!")
 
+    def _get_root_path(self) -> Optional[Path]:
+        # If there is a path VSSClient will request a secure connection
+        if self._tls and self._root_ca_path:
+            return Path(self._root_ca_path)
+        return None
+
+    def start(self):
+        """
+        Start connection to databroker and authorize
+        """
+
+        log.info(f"Connecting to Data Broker using {self._ip}:{self._port}")
+        self._read_token()
+
         # We do not connect directly when we create VSSClient
         # Instead we provide token first when we do authorize
         # The alternative approach would be to provide token in constructor
         # with/without ensure_startup_connection and not actively call "authorize"
         # The only practical difference is how progress and errors (if any) are reported!
 
-        # If there is a path VSSClient will request a secure connection
-        if self._tls and self._root_ca_path:
-            root_path = Path(self._root_ca_path)
-        else:
-            root_path = None
-
         self._grpc_client = self._exit_stack.enter_context(kuksa_client.grpc.VSSClient(
                  host=self._ip,
                  port=self._port,
                  ensure_startup_connection=False,
-                 root_certificates=root_path,
+                 root_certificates=self._get_root_path(),
                  tls_server_name=self._tls_server_name
             ))
         
@@ -111,6 +202,15 @@ class DatabrokerClientWrapper(clientwrapper.ClientWrapper):
                 try_to_connect=False,
             )
 
+        if self._max_in_flight > 1:
+            self._lanes = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"databroker-lane-{index}")
+                           for index in range(self._max_in_flight)]
+
+        if self._batch_size > 1:
+            self._batching = True
+            self._flusher = threading.Thread(target=self._run_flusher, name="databroker-flusher", daemon=True)
+            self._flusher.start()
+
     def on_broker_connectivity_change(self, connectivity):
         log.info("Connectivity to data broker changed to: %s", connectivity)
         if connectivity in {grpc.ChannelConnectivity.READY, grpc.ChannelConnectivity.IDLE}:
@@ -119,6 +219,7 @@ class DatabrokerClientWrapper(clientwrapper.ClientWrapper):
             if not self._connected:
                 log.info("Connected to data broker")
                 self._connected = True
+                self._channel_ready.set()
         else:
             if self._connected:
                 log.info("Disconnected from data broker")
@@ -126,6 +227,7 @@ class DatabrokerClientWrapper(clientwrapper.ClientWrapper):
                 if connectivity == grpc.ChannelConnectivity.CONNECTING:
                     log.info("Trying to connect to data broker")
             self._connected = False
+            self._channel_ready.clear()
 
     def is_connected(self) -> bool:
         log.info("Check if connected to data broker")
@@ -146,7 +248,7 @@ class DatabrokerClientWrapper(clientwrapper.ClientWrapper):
             log.debug("Checking if signal %s is registered", vss_name)
             metadata = self._grpc_client.get_metadata((vss_name,), **self._rpc_kwargs)
             if len(metadata) == 1:
-                self._name_to_type[vss_name] = metadata[vss_name].data_type
+                self._set_data_type(vss_name, metadata[vss_name].data_type)
                 log.info(
                     "%s is already registered with type %s",
                     vss_name,
@@ -162,7 +264,140 @@ class DatabrokerClientWrapper(clientwrapper.ClientWrapper):
                 log.error("Error checking registration of %s", vss_name, exc_info=True)
         return False
 
-    def update_datapoint(self, name: str, value: Any) -> bool:
+    def _load_type_cache(self) -> Dict[str, Dict[str, str]]:
+        if self._type_cache is None:
+            self._type_cache = {}
+            if self._type_cache_file is not None and os.path.exists(self._type_cache_file):
+                try:
+                    with open(self._type_cache_file, "r", encoding="utf-8") as file:
+                        self._type_cache = json.load(file)
+                except (OSError, ValueError):
+                    log.warning("Ignoring unreadable data type cache file %s", self._type_cache_file, exc_info=True)
+        return self._type_cache
+
+    def _save_type_cache(self):
+        if self._type_cache_file is None or self._type_cache is None:
+            return
+        temp_file = self._type_cache_file + ".tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as file:
+                json.dump(self._type_cache, file, indent=2, sort_keys=True)
+            os.replace(temp_file, self._type_cache_file)
+        except OSError:
+            log.warning("Failed to write data type cache file %s", self._type_cache_file, exc_info=True)
+
+    def _get_broker_identity(self) -> str:
+        server_info = self._grpc_client.get_server_info(**self._rpc_kwargs)
+        if server_info is None:
+            return f"{self._ip}:{self._port}"
+        return f"{self._ip}:{self._port}/{server_info.name}/{server_info.version}"
+
+    def _request_data_types(self, vss_names: List[str]) -> Dict[str, str]:
+        # Get the data type names of the given signals in a single request, raises VSSClientError
+        metadata = self._grpc_client.get_metadata(vss_names, MetadataField.DATA_TYPE, **self._rpc_kwargs)
+        return {name: entry_metadata.data_type.name for name, entry_metadata in metadata.items()}
+
+    def are_signals_defined(self, vss_names: Iterable[str]) -> bool:
+        """
+        Check if all given signals are registered, using a single request for the signals
+        whose data types are not known yet for the databroker instance. When checking again,
+        i.e. after reconnecting, the data types of all signals are requested, since the databroker
+        may have been restarted with changed VSS Data Entries; only changed data types are updated.
+        Returns True if all signals are registered.
+        """
+        if self._grpc_client is None:
+            log.warning("are_signals_defined called before client has been started")
+            return False
+        vss_names = list(vss_names)
+        try:
+            self._broker_identity = self._get_broker_identity()
+            with self._batch_condition:
+                known_types = self._load_type_cache().setdefault(self._broker_identity, {})
+                if self._types_checked:
+                    requested_names = vss_names
+                else:
+                    requested_names = [name for name in vss_names if name not in known_types]
+            if requested_names:
+                log.info("Requesting data types of %d of %d signals from %s",
+                         len(requested_names), len(vss_names), self._broker_identity)
+                data_types = self._request_data_types(requested_names)
+                with self._batch_condition:
+                    for name, type_name in data_types.items():
+                        if name in known_types and known_types[name] != type_name:
+                            log.warning("Data type of %s has changed from %s to %s",
+                                        name, known_types[name], type_name)
+                        known_types[name] = type_name
+                    self._save_type_cache()
+            else:
+                log.info("Using known data types of %d signals from %s", len(vss_names), self._broker_identity)
+        except kuksa_client.grpc.VSSClientError as client_error:
+            missing_names = [entry_error.get("path") for entry_error in client_error.errors if "path" in entry_error]
+            if missing_names:
+                log.error("Signals not registered: %s", ", ".join(missing_names))
+                self._forget_types(missing_names)
+            else:
+                log.error("Error checking registration of signals", exc_info=True)
+            return False
+        self._types_checked = True
+
+        all_registered = True
+        for name in vss_names:
+            if name not in known_types:
+                log.error("Signal %s is not registered", name)
+                all_registered = False
+            elif self._name_to_type.get(name) != DataType[known_types[name]]:
+                self._set_data_type(name, DataType[known_types[name]])
+        return all_registered
+
+    def _set_data_type(self, vss_name: str, data_type: DataType):
+        self._name_to_type[vss_name] = data_type
+        self._templates.pop(vss_name, None)
+        mapped_type = self._data_types.get(vss_name)
+        if mapped_type is not None and mapped_type.lower() != vss_datatype(data_type):
+            log.warning("Data type %s of %s in mapping differs from data type %s in databroker, using the latter",
+                        mapped_type, vss_name, vss_datatype(data_type))
+
+    def _get_template(self, vss_name: str) -> Optional[Tuple[valueconverter.Converter, Metadata]]:
+        template = self._templates.get(vss_name)
+        if template is None:
+            data_type = self._name_to_type.get(vss_name)
+            if data_type is None:
+                # forgotten after the databroker has rejected a value
+                data_type = self._refresh_data_type(vss_name)
+                if data_type is None:
+                    return None
+            # Specifying data_type removes the need for the client to query data_type from the server before
+            # issuing every set() call.
+            template = (valueconverter.create_converter(vss_datatype(data_type)), Metadata(data_type=data_type))
+            self._templates[vss_name] = template
+        return template
+
+    def _refresh_data_type(self, vss_name: str) -> Optional[DataType]:
+        try:
+            type_name = self._request_data_types([vss_name]).get(vss_name)
+        except kuksa_client.grpc.VSSClientError:
+            log.error("Failed to get data type of %s", vss_name, exc_info=True)
+            return None
+        if type_name is None:
+            log.error("Signal %s is not registered", vss_name)
+            return None
+        with self._batch_condition:
+            self._load_type_cache().setdefault(self._broker_identity, {})[vss_name] = type_name
+            self._save_type_cache()
+        self._set_data_type(vss_name, DataType[type_name])
+        return DataType[type_name]
+
+    def _forget_types(self, vss_names: Iterable[str]):
+        # Make sure that the data types of the given signals are requested again before sending their values
+        with self._batch_condition:
+            known_types = self._load_type_cache().get(self._broker_identity, {})
+            for name in vss_names:
+                known_types.pop(name, None)
+                self._name_to_type.pop(name, None)
+                self._templates.pop(name, None)
+            self._save_type_cache()
+
+    def update_datapoint(self, name: str, value: Any, timestamp: Optional[float] = None) -> bool:
         """
         Update datapoint.
         Supported format for value is still a bit unclear/undefined.
@@ -173,38 +408,194 @@ class DatabrokerClientWrapper(clientwrapper.ClientWrapper):
         if self._grpc_client is None:
             log.warning("update_datapoint called before client has been started")
             return False
-        try:
+        if self._batching:
+            with self._batch_condition:
+                if not self._pending_values:
+                    self._batch_deadline = time.monotonic() + self._batch_delay
+                    self._batch_condition.notify()
+                elif name in self._pending_values:
+                    self._values_coalesced += 1
+                self._pending_values[name] = (value, timestamp)
+                if len(self._pending_values) >= self._batch_size:
+                    self._batch_condition.notify()
+            return True
 
-            updates = (EntryUpdate(DataEntry(
-                name,
-                value=Datapoint(value=value),
-                # Specifying data_type removes the need for the client to query data_type from the server before
-                # issuing every set() call.
-                metadata=Metadata(data_type=self._name_to_type[name]),
-            ), (Field.VALUE,)),)
+        if self._lanes:
+            self._submit_values({name: (value, timestamp)})
+            return True
 
-            self._grpc_client.set(updates=updates, **self._rpc_kwargs)
+        if not self._send_values({name: value}):
             log.debug("%s => %s", name, value)
+            return True
+        return False
 
-        except kuksa_client.grpc.VSSClientError:
-            log.error(f"Error sending {value} to databroker", exc_info=True)
+    def update_datapoint_sync(self, name: str, value: Any, timestamp: Optional[float] = None) -> bool:
+        if self._grpc_client is None:
+            log.warning("update_datapoint_sync called before client has been started")
             return False
+        return not self._send_values({name: value})
 
-        return True
+    def _request_completed(self, values: Dict[str, Tuple[Any, Optional[float]]], future):
+        if future.exception() is not None:
+            log.error("Failed to send values to databroker", exc_info=future.exception())
+            failed_names = list(values)
+        else:
+            failed_names = future.result()
+        with self._batch_condition:
+            self._in_flight -= 1
+        self._window.release()
+        self._report_failed_values({name: values[name] for name in failed_names})
+
+    def _submit_values(self, values: Dict[str, Tuple[Any, Optional[float]]]):
+        # Hand the values over to the lanes, waiting while the window of requests in flight is full
+        lane_values: Dict[int, Dict[str, Tuple[Any, Optional[float]]]] = {}
+        for name, value in values.items():
+            lane_values.setdefault(hash(name) % len(self._lanes), {})[name] = value
+        for lane, values_to_send in lane_values.items():
+            self._window.acquire()
+            with self._batch_condition:
+                self._in_flight += 1
+                self._max_in_flight_seen = max(self._max_in_flight_seen, self._in_flight)
+            future = self._lanes[lane].submit(
+                self._send_values, {name: value for name, (value, _) in values_to_send.items()})
+            future.add_done_callback(functools.partial(self._request_completed, values_to_send))
+
+    def _send_values(self, values: Dict[str, Any]) -> List[str]:
+        # Returns the VSS Data Entries whose values could not be sent
+        updates = []
+        unconvertible_names = []
+        for name, value in values.items():
+            template = self._get_template(name)
+            if template is None:
+                unconvertible_names.append(name)
+                continue
+            convert, metadata = template
+            try:
+                updates.append(EntryUpdate(DataEntry(name, value=Datapoint(value=convert(value)), metadata=metadata),
+                                           _VALUE_FIELDS))
+            except (ValueError, TypeError, OverflowError):
+                log.error("Cannot convert value %s for %s to %s", value, name, metadata.data_type.name)
+                unconvertible_names.append(name)
+        if unconvertible_names:
+            with self._batch_condition:
+                self._values_failed += len(unconvertible_names)
+                for name in unconvertible_names:
+                    self._failed_per_path[name] = self._failed_per_path.get(name, 0) + 1
+            if not updates:
+                return unconvertible_names
+
+        start = time.perf_counter()
+        try:
+            self._grpc_client.set(updates=updates, **self._rpc_kwargs)
+        except kuksa_client.grpc.VSSClientError as client_error:
+            # the errors name the entries that have been rejected, otherwise the whole request has failed
+            failed_names = [entry_error["path"] for entry_error in client_error.errors
+                            if entry_error.get("path") in values]
+            if not failed_names:
+                failed_names = [update.entry.path for update in updates]
+            for name in failed_names:
+                log.error("Error sending %s to databroker for %s: %s", values[name], name, client_error.to_dict())
+            with self._batch_condition:
+                self._values_failed += len(failed_names)
+                for name in failed_names:
+                    self._failed_per_path[name] = self._failed_per_path.get(name, 0) + 1
+            if client_error.errors:
+                # the data type may have changed
+                self._forget_types(failed_names)
+            return unconvertible_names + failed_names
+        rtt = time.perf_counter() - start
+
+        with self._batch_condition:
+            self._requests_sent += 1
+            self._values_sent += len(updates)
+            self._max_batch_size = max(self._max_batch_size, len(updates))
+            self._total_rtt += rtt
+            self._max_rtt = max(self._max_rtt, rtt)
+        return unconvertible_names
+
+    def _take_batch(self) -> Tuple[Dict[str, Any], bool]:
+        # Wait until the pending values are to be sent, return them and whether batching is still active
+        with self._batch_condition:
+            while self._batching and not self._pending_values:
+                self._batch_condition.wait()
+            while self._batching and len(self._pending_values) < self._batch_size:
+                remaining = self._batch_deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._batch_condition.wait(remaining)
+            values, self._pending_values = self._pending_values, {}
+            return values, self._batching
+
+    def _run_flusher(self):
+        log.info("Starting to send batches of values to databroker")
+        batching = True
+        while batching:
+            values, batching = self._take_batch()
+            if values and self._lanes:
+                self._submit_values(values)
+            elif values:
+                failed_names = self._send_values({name: value for name, (value, _) in values.items()})
+                self._report_failed_values({name: values[name] for name in failed_names})
+        log.info("Stopped sending batches of values to databroker")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about the set requests sent to the databroker:
+
+        * requests: the number of successful set requests
+        * values: the number of values sent by successful requests
+        * failed_values: the number of values rejected by the databroker or sent by failed requests
+        * failed_per_path: the number of failed values per VSS Data Entry
+        * coalesced_values: the number of values replaced by a newer value before being sent
+        * mean_batch_size/max_batch_size: the mean/maximum number of values per request
+        * mean_rtt/max_rtt: the mean/maximum time (in seconds) until a request has been answered
+        * in_flight/max_in_flight: the current/maximum number of requests submitted but not completed yet
+        """
+        with self._batch_condition:
+            return {
+                "requests": self._requests_sent,
+                "values": self._values_sent,
+                "failed_values": self._values_failed,
+                "failed_per_path": dict(self._failed_per_path),
+                "coalesced_values": self._values_coalesced,
+                "mean_batch_size": self._values_sent / self._requests_sent if self._requests_sent > 0 else 0.0,
+                "max_batch_size": self._max_batch_size,
+                "mean_rtt": self._total_rtt / self._requests_sent if self._requests_sent > 0 else 0.0,
+                "max_rtt": self._max_rtt,
+                "in_flight": self._in_flight,
+                "max_in_flight": self._max_in_flight_seen
+            }
 
     def stop(self):
         log.info("Stopping databroker client")
+        if self._flusher is not None:
+            # send the values still waiting before closing the connection
+            with self._batch_condition:
+                self._batching = False
+                self._batch_condition.notify()
+            self._flusher.join()
+            self._flusher = None
+        # wait for the requests in flight
+        for lane in self._lanes:
+            lane.shutdown(wait=True)
+        self._lanes = []
         if self._grpc_client is None:
             log.warning("stop called before client has been started")
         else:
             self._exit_stack.close()
             self._grpc_client = None
+            self._connected = False
+            self._channel_ready.clear()
 
     def supports_subscription(self) -> bool:
         return True
 
     async def subscribe(self, vss_names: List[str], callback):
-        """Create a subscription and invoke the callback when data received."""
+        """
+        Create a subscription and invoke the callback when data received.
+        The subscription uses the channel of the client started by start() and is renewed
+        whenever it has been interrupted, e.g. because the connection to the databroker was lost.
+        """
         log.info("Create a subscription and invoke the callback when data received")
         entries: List[SubscribeEntry] = []
         for name in vss_names:
@@ -213,14 +604,62 @@ class DatabrokerClientWrapper(clientwrapper.ClientWrapper):
             log.info("Subscribe ACTUATOR entry: %s", subscribe_entry)
             entries.append(subscribe_entry)
         log.info("Subscribing to entries: %s", entries)
-        # If there is a path VSSClient will request a secure connection
-        if self._tls and self._root_ca_path:
-            root_path: Optional[Path] = Path(self._root_ca_path)
-        else:
-            root_path = None
-
-        async with VSSClient(self._ip, self._port, token=self._token,
-                             root_certificates=root_path, tls_server_name=self._tls_server_name) as client:
-            async for updates in client.subscribe(entries=entries):
+        updates_queue: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+        subscription_thread = threading.Thread(
+            target=self._run_subscription,
+            args=(entries, asyncio.get_running_loop(), updates_queue, stopped),
+            name="databroker-subscription",
+            daemon=True)
+        subscription_thread.start()
+        try:
+            while True:
+                updates = await updates_queue.get()
                 log.debug(f"Received update of length {len(updates)}")
-                await callback(updates)
\ No newline at end of file
+                await callback(updates)
+        finally:
+            stopped.set()
+
+    def _run_subscription(self, entries: List[SubscribeEntry], loop: asyncio.AbstractEventLoop,
+                          updates_queue: asyncio.Queue, stopped: threading.Event):
+        # Receives the updates of the (blocking) subscription stream and hands them over to the event loop
+        while not stopped.is_set():
+            grpc_client = self._grpc_client
+            if grpc_client is None:
+                break
+            if not self._channel_ready.wait(timeout=1):
+                continue
+            try:
+                for updates in grpc_client.subscribe(entries=entries, wait_for_ready=True, **self._rpc_kwargs):
+                    if stopped.is_set():
+                        return
+                    loop.call_soon_threadsafe(updates_queue.put_nowait, updates)
+                log.info("Subscription has been ended by data broker")
+            except kuksa_client.grpc.VSSClientError:
+                if stopped.is_set() or self._grpc_client is None:
+                    break
+                log.warning("Subscription has been interrupted", exc_info=True)
+            except (ValueError, RuntimeError):
+                # the channel or the event loop has been closed
+                break
+            log.info("Subscribing again once connected to data broker")
+            stopped.wait(_RESUBSCRIBE_DELAY)
+        log.info("Stopped receiving updates of subscribed entries")
+
+    def get_rpc_kwargs(self) -> Dict[str, Any]:
+        """Get the keyword arguments to pass to every request sent to the databroker."""
+        return dict(self._rpc_kwargs)
+
+    def get_max_in_flight(self) -> int:
+        """Get the maximum number of set requests to keep in flight."""
+        return self._max_in_flight
+
+    def create_async_client(self) -> VSSClient:
+        """
+        Create an asynchronous client using the connection settings of this wrapper.
+        The client connects to the databroker when being entered as an asynchronous context manager.
+        """
+        log.info("Creating asynchronous client for Data Broker at %s:%s", self._ip, self._port)
+        self._read_token()
+        return VSSClient(self._ip, self._port, token=self._token, ensure_startup_connection=False,
+                         root_certificates=self._get_root_path(), tls_server_name=self._tls_server_name)
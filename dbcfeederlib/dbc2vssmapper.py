@@ -27,15 +27,19 @@ VSS signal values as defined in a mapping.
 import json
 import logging
 import sys
+import threading
 import cantools
 
-from dataclasses import dataclass
-from typing import Any, Dict, List, Set, Optional, KeysView
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Set, Optional, KeysView, Tuple
+
+import numpy as np
 
 from can.typechecking import CanFilter
-from py_expression_eval import Parser  # type: ignore[import]
 
+from dbcfeederlib import framepipeline, transformcompiler
 from dbcfeederlib.dbcparser import DBCParser
+from dbcfeederlib.framedecoder import FrameDecoder
 
 log = logging.getLogger(__name__)
 
@@ -45,13 +49,16 @@ class VSSObservation:
     """
     A VSSObservation is a container for a single observation/data for a single VSS signal.
     The data contained is the raw data as received on CAN, it has not yet been transformed
-    into VSS representation.
+    into VSS representation unless it has been processed by a compiled frame pipeline.
     """
 
     dbc_name: str
     vss_name: str
     raw_value: Any
     time: float
+    # The VSS value if the raw value has already been transformed
+    vss_value: Any = None
+    transformed: bool = False
 
 
 class VSSMapping:
@@ -67,8 +74,6 @@ class VSSMapping:
     [Kuksa Feeders documentation](https://github.com/eclipse/kuksa.val.feeders/blob/main/dbc2val/mapping/mapping.md)
     """
 
-    parser: Parser = Parser()
-
     def __init__(self, vss_name: str, dbc_name: str, transform: dict, interval_ms: int,
                  on_change: bool, datatype: str, description: str):
         self.vss_name = vss_name
@@ -83,6 +88,41 @@ class VSSMapping:
         # For value comparison (on_changes) we store last value used for comparison
         self.last_vss_value: Any = None
         self.last_dbc_value: Any = None
+        # For skipping observations that cannot fulfill the on_change condition we store
+        # the last raw value that has been queued for transformation
+        self.last_queued_value: Any = None
+        # Transformations are compiled only once, Mapper has already verified that they are valid
+        self._mapping: Optional[Callable[[Any], Any]] = None
+        self._math: Optional[Callable[[Any], Any]] = None
+        self._batch_transform: Optional[transformcompiler.BatchTransform] = None
+        if transform is not None:
+            if "mapping" in transform:
+                self._mapping = transformcompiler.compile_mapping(transform["mapping"])
+                self._batch_transform = transformcompiler.compile_mapping_batch(transform["mapping"])
+            elif "math" in transform:
+                self._math = transformcompiler.compile_math(transform["math"])
+                self._batch_transform = transformcompiler.compile_math_batch(transform["math"])
+
+    @property
+    def compiled_transform(self) -> Optional[Tuple[str, Callable[[Any], Any]]]:
+        """
+        The kind of the transformation ("mapping" or "math") along with the compiled function
+        transforming a raw value, None if no transformation is defined.
+        The function of a math transformation may raise an exception, which transform_value() logs.
+        """
+        if self._mapping is not None:
+            return "mapping", self._mapping
+        if self._math is not None:
+            return "math", self._math
+        return None
+
+    def reset_change_state(self):
+        """
+        Forget the last values used for evaluating the on_change condition, e.g. because the last
+        value has not reached the server, so that the next value is sent even if it is unchanged.
+        """
+        self.last_vss_value = None
+        self.last_queued_value = None
 
     def time_condition_fulfilled(self, time: float) -> bool:
         """
@@ -133,6 +173,48 @@ class VSSMapping:
             self.last_vss_value = vss_value
         return fulfilled
 
+    def change_conditions_fulfilled(self, vss_values: np.ndarray) -> np.ndarray:
+        """
+        Checks the change condition for a sequence of VSS values at once.
+        Returns a boolean array which marks the values for which change_condition_fulfilled()
+        would have returned True if it had been called for each value in order.
+        """
+        values = np.asarray(vss_values, dtype=object)
+        valid = np.not_equal(values, None)
+        fulfilled = np.zeros(len(values), dtype=bool)
+        candidates = values[valid]
+        if len(candidates) == 0:
+            return fulfilled
+
+        if self.on_change:
+            previous = np.empty(len(candidates), dtype=object)
+            previous[0] = self.last_vss_value
+            previous[1:] = candidates[:-1]
+            # the first value is always sent
+            changed = np.not_equal(previous, candidates).astype(bool)
+            if self.last_vss_value is None:
+                changed[0] = True
+        else:
+            changed = np.ones(len(candidates), dtype=bool)
+
+        fulfilled[valid] = changed
+        if changed.any():
+            self.last_vss_value = candidates[changed][-1]
+        return fulfilled
+
+    def accepts_raw_choice_values(self) -> bool:
+        """
+        Checks if transforming the numeric value of a NamedSignalValue yields the same VSS value
+        as transforming the NamedSignalValue itself.
+        This is the case for numeric VSS data entries without transformation and for
+        mappings that do not map any strings, i.e. names of signal values.
+        """
+        if self.transform is None:
+            return self.datatype != "string"
+        if "mapping" in self.transform:
+            return not any(isinstance(item["from"], str) for item in self.transform["mapping"])
+        return False
+
     def transform_value(self, value: Any) -> Any:
         """
         Transforms the given "raw" DBC value to the wanted VSS value.
@@ -162,19 +244,11 @@ class VSSMapping:
                 log.info("Using raw value %s of type %s for %s", vss_value, type(vss_value), self.vss_name)
 
         else:
-            if "mapping" in self.transform:
-                tmp = self.transform["mapping"]
-                # Assumed to be a list
-                for item in tmp:
-                    from_val = item["from"]
-                    if from_val == value:
-                        new_val = item["to"]
-                        vss_value = new_val
-                        break
-            elif "math" in self.transform:
-                tmp = self.transform["math"]
+            if self._mapping is not None:
+                vss_value = self._mapping(value)
+            elif self._math is not None:
                 try:
-                    vss_value = VSSMapping.parser.parse(tmp).evaluate({"x": value})
+                    vss_value = self._math(value)
                 except Exception:
                     # It is assumed that you may consider it ok that transformation fails sometimes,
                     # so giving warning instead of error
@@ -197,6 +271,160 @@ class VSSMapping:
             log.debug("Transformed value %s for %s", vss_value, self.vss_name)
         return vss_value
 
+    def transform_values(self, values: np.ndarray) -> np.ndarray:
+        """
+        Transforms a one-dimensional array of "raw" DBC values to the wanted VSS values at once.
+        Each element of the returned array (of dtype object) is the same as what transform_value()
+        returns for the corresponding raw value, i.e. None indicates that the value shall be ignored.
+        """
+        values = np.asarray(values)
+        if self._batch_transform is not None:
+            vss_values, failed = self._batch_transform(values)
+            if failed.any():
+                log.warning(
+                    "Transformation failed for %d values for VSS signal %s, signals ignored!",
+                    np.count_nonzero(failed), self.vss_name
+                )
+        elif values.dtype.kind in "biuf":
+            vss_values = values.astype(object)
+        else:
+            use_name = self.datatype == "string"
+
+            def implicit_transform(value: Any) -> Any:
+                if isinstance(value, cantools.database.can.signal.NamedSignalValue):
+                    return value.name if use_name else value.value
+                return value
+
+            vss_values, _ = transformcompiler.apply_batch(implicit_transform, values)
+
+        ignored = np.count_nonzero(np.equal(vss_values, None))
+        if ignored > 0:
+            log.info(
+                "No mapping to VSS %s found for %d raw values, returning None to indicate that they shall be ignored!",
+                self.vss_name, ignored
+            )
+        return vss_values
+
+
+@dataclass
+class SignalDispatch:
+    """
+    Everything needed for forwarding the (decoded) value of a CAN signal
+    to the VSS data entries that the signal is mapped to.
+    """
+
+    signal: cantools.database.Signal
+    minimum: Optional[float]
+    maximum: Optional[float]
+    mappings: List[VSSMapping]
+    # decode values defined in the signal's choices to plain integers instead of NamedSignalValues
+    raw_choices: bool = field(init=False)
+
+    def __post_init__(self):
+        # Named signal values are exempt from range checks, so the numeric values of all
+        # choices must be within range to be treated like other numeric values
+        choices = self.signal.choices
+        self.raw_choices = (bool(choices) and not self.signal.is_float
+                            and all(mapping.accepts_raw_choice_values() for mapping in self.mappings)
+                            and all((self.minimum is None or value >= self.minimum)
+                                    and (self.maximum is None or value <= self.maximum) for value in choices))
+
+
+@dataclass
+class FrameDispatch:
+    """
+    The CAN message definition for a given CAN frame ID along with the dispatch information
+    of those of its signals that are mapped to VSS data entries.
+    For container messages the mapped signals of all contained messages are included.
+    """
+
+    message: cantools.database.Message
+    signals: Dict[str, SignalDispatch]
+    # decodes the mapped signals only
+    decoder: FrameDecoder = field(init=False)
+    # all mappings of the frame's signals if all of them have an interval condition, empty otherwise
+    interval_mappings: List[VSSMapping] = field(init=False)
+    # decodes and transforms the mapped signals in one step, only set if compiled pipelines are used
+    pipeline: Optional[framepipeline.FramePipeline] = field(default=None, init=False)
+
+    def __post_init__(self):
+        self.decoder = FrameDecoder(
+            self.message, self.signals.keys(),
+            [name for name, dispatch in self.signals.items() if dispatch.raw_choices])
+        mappings = [mapping for dispatch in self.signals.values() for mapping in dispatch.mappings]
+        if mappings and all(mapping.interval_ms > 0 for mapping in mappings):
+            self.interval_mappings = mappings
+        else:
+            self.interval_mappings = []
+
+    def next_due_time(self) -> float:
+        """
+        Get the earliest point in time at which the interval condition of any of the
+        frame's mappings can be fulfilled. Unit seconds.
+        Returns 0.0 if the frame is always due.
+        """
+        if not self.interval_mappings:
+            return 0.0
+        return min(mapping.last_time + mapping.interval_ms / 1000.0 for mapping in self.interval_mappings)
+
+
+@dataclass
+class FrameEncoder:
+    """
+    The CAN message definition for a given CAN frame ID along with the current values of all of
+    its signals, used for encoding the frame when the target value of a VSS data entry mapped to
+    one of its signals has changed.
+    """
+
+    message: cantools.database.Message
+    # default value per CAN signal, signals without default value are missing
+    defaults: Dict[str, Any]
+    # vss2dbc mappings per CAN signal of the frame
+    mappings: Dict[str, List[VSSMapping]]
+    # current value per CAN signal
+    values: Dict[str, Any] = field(init=False)
+    # the encoded current values, None if a value has changed since the frame has been encoded
+    data: Optional[bytes] = field(default=None, init=False)
+
+    def __post_init__(self):
+        self.values = dict(self.defaults)
+
+    def update_signal(self, signal_name: str):
+        """
+        Update the current value of a CAN signal from the last values of the signal's mappings.
+        The last value of the mappings that is not None is used, or the default value if there is none.
+        """
+        value = self.defaults.get(signal_name)
+        for mapping in self.mappings.get(signal_name, []):
+            if mapping.last_dbc_value is not None:
+                value = mapping.last_dbc_value
+        if value is None:
+            if self.values.pop(signal_name, None) is not None:
+                self.data = None
+        elif signal_name not in self.values or self.values[signal_name] != value:
+            self.values[signal_name] = value
+            self.data = None
+
+    def encode(self) -> bytes:
+        """
+        Encode the current values of the frame's signals, reusing the payload encoded before
+        if none of them has changed.
+        """
+        if self.data is None:
+            self.data = self.message.encode(self.values)
+        return self.data
+
+
+class _CurrentThreadErrorsOnly(logging.Filter):
+    """Filters out records below ERROR level logged by the thread that created the filter."""
+
+    def __init__(self):
+        super().__init__()
+        self._thread = threading.get_ident()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.ERROR or record.thread != self._thread
+
 
 class Mapper(DBCParser):
     """
@@ -215,7 +443,8 @@ class Mapper(DBCParser):
                  expect_extended_frame_ids: bool = False,
                  use_strict_parsing: bool = False,
                  can_signal_default_values_file: Optional[str] = None,
-                 fail_on_duplicate_signal_definitions: bool = False):
+                 fail_on_duplicate_signal_definitions: bool = False,
+                 use_compiled_pipelines: bool = False):
 
         super().__init__(dbc_file_names, use_strict_parsing, expect_extended_frame_ids)
 
@@ -254,8 +483,81 @@ class Mapper(DBCParser):
         self._can_filters: List[CanFilter] = []
 
         self._fail_on_duplicate_signal_definitions = fail_on_duplicate_signal_definitions
+        self._use_compiled_pipelines = use_compiled_pipelines
         self._traverse_vss_node("", jsonmapping)
 
+        # Key is the (masked) CAN frame ID, only contains frames with signals mapped to VSS
+        self._frame_dispatch: Dict[int, FrameDispatch] = self._build_frame_dispatch_table()
+        # Key is the CAN frame ID, only contains frames with signals that VSS data entries are mapped to
+        self._frame_encoders: Dict[int, FrameEncoder] = self._build_frame_encoders()
+
+    def _build_frame_dispatch_table(self) -> Dict[int, FrameDispatch]:
+        """
+        Determine for every CAN frame containing mapped signals, which signals need
+        to be forwarded to which VSS data entries.
+        """
+        table: Dict[int, FrameDispatch] = {}
+        for frame_id in self._mapped_can_frame_ids:
+            message_def = self.get_message_by_frame_id(frame_id)
+            signals: Dict[str, SignalDispatch] = {}
+            for inner_msg in [message_def, *(message_def.contained_messages or [])]:
+                for signal in inner_msg.signals:
+                    if signal.name in self._dbc2vss_mapping and signal.name not in signals:
+                        signals[signal.name] = SignalDispatch(
+                            signal, signal.minimum, signal.maximum, self._dbc2vss_mapping[signal.name])
+            frame = FrameDispatch(message_def, signals)
+            if self._use_compiled_pipelines:
+                self._compile_frame_pipeline(frame)
+            table[frame_id & self._frame_id_mask] = frame
+            log.debug("Dispatching signals %s of CAN frame with ID %#x", list(signals.keys()), frame_id)
+        return table
+
+    def _compile_frame_pipeline(self, frame: FrameDispatch):
+        """
+        Generate the function for decoding and transforming the mapped signals of a CAN frame
+        and verify that it produces the same result as decoding the frame using cantools.
+        The frame is processed generically if no pipeline can be generated or if verification fails.
+        """
+        pipeline = framepipeline.compile_frame_pipeline(frame.message, frame.signals.values())
+        if pipeline is None:
+            log.info("Not using compiled pipeline for multiplexed/container CAN message %s", frame.message.name)
+            return
+
+        # Sample payloads are likely to contain values that have no mapping or
+        # that cannot be transformed, there is no need to log about that
+        log_filter = _CurrentThreadErrorsOnly()
+        log.addFilter(log_filter)
+        try:
+            verified = framepipeline.verify_frame_pipeline(pipeline, frame.message, frame.signals.values())
+        finally:
+            log.removeFilter(log_filter)
+
+        if verified:
+            frame.pipeline = pipeline
+        else:
+            log.warning(
+                "Compiled pipeline for CAN message %s does not produce the same values as cantools, not using it",
+                frame.message.name
+            )
+
+    def _build_frame_encoders(self) -> Dict[int, FrameEncoder]:
+        # Missing default values are reported here, once per CAN signal and frame
+        encoders: Dict[int, FrameEncoder] = {}
+        for frame_id, mappings in self._vss2dbc_can_id_mapping.items():
+            signal_mappings: Dict[str, List[VSSMapping]] = {}
+            for mapping in mappings:
+                signal_mappings.setdefault(mapping.dbc_name, []).append(mapping)
+            encoders[frame_id] = FrameEncoder(
+                self.get_message_by_frame_id(frame_id), self.get_default_values(frame_id), signal_mappings)
+        return encoders
+
+    def get_frame_dispatch(self, frame_id: int) -> Optional[FrameDispatch]:
+        """
+        Get the dispatch information for a CAN frame received from the bus.
+        Returns None if the frame does not contain any signals mapped to VSS data entries.
+        """
+        return self._frame_dispatch.get(frame_id & self._frame_id_mask)
+
     def can_frame_id_whitelist(self) -> List[CanFilter]:
         """
         Get all frame IDs of CAN messages that contain signals for which a mapping to VSS exists.
@@ -273,7 +575,10 @@ class Mapper(DBCParser):
         """
         vss_signal = self.get_dbc2vss_mapping(vss_observation.dbc_name, vss_observation.vss_name)
         if vss_signal:
-            value = vss_signal.transform_value(vss_observation.raw_value)
+            if vss_observation.transformed:
+                value = vss_observation.vss_value
+            else:
+                value = vss_signal.transform_value(vss_observation.raw_value)
             log.debug(
                 "Transformed CAN signal [name: %s, value %s] to VSS data entry [name: %s, value: %s]",
                 vss_observation.dbc_name, vss_observation.raw_value, vss_observation.vss_name, value
@@ -313,6 +618,11 @@ class Mapper(DBCParser):
                         item, expanded_name
                     )
                     sys.exit(-1)
+            try:
+                transformcompiler.compile_mapping(tmp)
+            except ValueError as error:
+                log.error("Invalid mapping definition for %s: %s", expanded_name, error)
+                sys.exit(-1)
             has_mapping = True
 
         if "math" in transform:
@@ -322,6 +632,11 @@ class Mapper(DBCParser):
             if not isinstance(transform["math"], str):
                 log.error("Math transformation definition for %s must be a str", expanded_name)
                 sys.exit(-1)
+            try:
+                transformcompiler.compile_math(transform["math"])
+            except ValueError as error:
+                log.error("Invalid math transformation definition for %s: %s", expanded_name, error)
+                sys.exit(-1)
         elif not has_mapping:
             log.error("Unsupported transformation definition for %s", expanded_name)
             sys.exit(-1)
@@ -509,6 +824,14 @@ class Mapper(DBCParser):
         log.info("VSS names in dbc2vss mappings: %s", vss_names.union(self._vss2dbc_mapping.keys()))
         return vss_names.union(self._vss2dbc_mapping.keys())
 
+    def get_vss_data_types(self) -> Dict[str, str]:
+        """Get the VSS data types of the VSS Data Entries in dbc2vss mappings, by path"""
+        data_types: Dict[str, str] = {}
+        for entry in self._dbc2vss_mapping.values():
+            for vss_mapping in entry:
+                data_types[vss_mapping.vss_name] = vss_mapping.datatype
+        return data_types
+
     def has_dbc2vss_mapping(self) -> bool:
         return bool(self._dbc2vss_mapping)
 
@@ -516,6 +839,13 @@ class Mapper(DBCParser):
         log.info("Has VSS --> DBC mapping")
         return bool(self._vss2dbc_mapping)
 
+    def reset_change_state(self, vss_name: str):
+        """Reset the on_change state of all mappings of CAN signals to the given VSS Data Entry."""
+        for entry in self._dbc2vss_mapping.values():
+            for vss_mapping in entry:
+                if vss_mapping.vss_name == vss_name:
+                    vss_mapping.reset_change_state()
+
     def get_dbc2vss_mappings(self, dbc_name: str) -> List[VSSMapping]:
         if dbc_name in self._dbc2vss_mapping:
             return self._dbc2vss_mapping[dbc_name]
@@ -529,13 +859,17 @@ class Mapper(DBCParser):
         """
         dbc_ids = set()
         # Theoretically there might me multiple DBC-signals served by this VSS-signal
-        log.info("[handle_update] Handling update for VSS signals: %s", vss_name)
+        log.debug("[handle_update] Handling update for VSS signals: %s", vss_name)
         for dbc_mapping in self._vss2dbc_mapping[vss_name]:
 
             dbc_value = dbc_mapping.transform_value(value)
             dbc_mapping.last_dbc_value = dbc_value
             dbc_ids.add(dbc_mapping.dbc_name)
-        log.info("[handle_update] VSS %s mapped to DBC signals: %s", vss_name, dbc_ids)
+            for msg_def in self.get_messages_for_signal(dbc_mapping.dbc_name):
+                encoder = self._frame_encoders.get(msg_def.frame_id)
+                if encoder is not None:
+                    encoder.update_signal(dbc_mapping.dbc_name)
+        log.debug("[handle_update] VSS %s mapped to DBC signals: %s", vss_name, dbc_ids)
         return dbc_ids
 
     def get_default_values(self, can_id) -> Dict[str, Any]:
@@ -551,12 +885,15 @@ class Mapper(DBCParser):
     def get_value_dict(self, can_id):
 
         log.debug("Using stored information to create CAN message with frame ID %#x", can_id)
-        res = self.get_default_values(can_id)
-        for can_mapping in self._vss2dbc_can_id_mapping[can_id]:
-            log.debug("Using CAN signal %s with value %s", can_mapping.dbc_name, can_mapping.last_dbc_value)
-            if can_mapping.last_dbc_value is not None:
-                res[can_mapping.dbc_name] = can_mapping.last_dbc_value
-        return res
+        return dict(self._frame_encoders[can_id].values)
+
+    def encode_frame(self, can_id: int) -> bytes:
+        """
+        Encode the current values of the signals of the CAN message with the given frame ID,
+        i.e. the last values of the VSS data entries mapped to them or their default values.
+        Raises KeyError if no VSS data entry is mapped to any signal of the message.
+        """
+        return self._frame_encoders[can_id].encode()
 
     def __contains__(self, key):
         return key in self._dbc2vss_mapping
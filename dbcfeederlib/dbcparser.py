@@ -146,7 +146,6 @@ class DBCParser:
         Get the CAN message definition for a given CAN frame ID.
         Raises KeyError if no message definition for the given frame ID exists.
         """
-        log.info("CAN message in DBC: %s", self._db.get_message_by_frame_id(frame_id))
         return self._db.get_message_by_frame_id(frame_id)
 
     def get_signals_by_frame_id(self, frame_id: int) -> List[cantools.database.Signal]:
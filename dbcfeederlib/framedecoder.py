@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+"""
+Decoding of selected signals of a CAN frame.
+"""
+
+import logging
+import struct
+
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+import cantools.database  # type: ignore
+
+from cantools.typechecking import DecodeResultType
+
+log = logging.getLogger(__name__)
+
+
+class SignalLayout(NamedTuple):
+    """The precomputed position and conversion of a signal within a CAN frame's payload."""
+
+    name: str
+    little_endian: bool
+    # little endian: position of the LSB, big endian: position of the MSB in network bit order
+    start: int
+    # number of payload bits required for the signal to be complete
+    end: int
+    mask: int
+    # the value of the sign bit for signed integer signals, 0 otherwise
+    sign_bit: int
+    # the struct format for IEEE floating point signals
+    float_format: Optional[str]
+    float_size: int
+    choices: Optional[Dict[int, Any]]
+    # use the raw integer instead of the named signal value for values defined in choices
+    raw_choices: bool
+    scale: float
+    offset: float
+
+
+def create_signal_layout(signal: cantools.database.Signal, raw_choices: bool = False) -> SignalLayout:
+    little_endian = signal.byte_order == "little_endian"
+    if little_endian:
+        start = signal.start
+    else:
+        # convert the sawtooth bit number of the MSB to network bit order
+        start = 8 * (signal.start // 8) + (7 - (signal.start % 8))
+    float_format = None
+    if signal.is_float:
+        float_format = ">f" if signal.length == 32 else ">d"
+    return SignalLayout(
+        name=signal.name,
+        little_endian=little_endian,
+        start=start,
+        end=start + signal.length,
+        mask=(1 << signal.length) - 1,
+        sign_bit=(1 << (signal.length - 1)) if signal.is_signed and not signal.is_float else 0,
+        float_format=float_format,
+        float_size=signal.length // 8,
+        choices=signal.choices,
+        raw_choices=raw_choices,
+        scale=signal.scale,
+        offset=signal.offset)
+
+
+class FrameDecoder:
+    """
+    Decodes the given signals of a CAN message.
+
+    Signals are extracted from the payload based on their bit position, length, byte order
+    and sign as defined in the message definition. Only the selected signals are decoded,
+    all other signals of the message are skipped. The result is the same as what
+    cantools' Message.decode(data, allow_truncated=True) returns for these signals.
+
+    For the signals given in raw_choice_signals, values defined in the signal's choices are
+    returned as plain integers instead of as cantools' NamedSignalValue.
+
+    Multiplexed and container messages are decoded using cantools.
+    """
+
+    def __init__(self, message: cantools.database.Message, signal_names: Iterable[str],
+                 raw_choice_signals: Iterable[str] = ()):
+        self._message = message
+        self._length: int = message.length
+        self._layouts: List[SignalLayout] = []
+        self._use_cantools: bool = message.is_container or message.is_multiplexed()
+        if self._use_cantools:
+            log.debug("Using cantools for decoding multiplexed/container message %s", message.name)
+            return
+        names = set(signal_names)
+        raw_choice_names = set(raw_choice_signals)
+        for signal in message.signals:
+            if signal.name in names:
+                self._layouts.append(create_signal_layout(signal, signal.name in raw_choice_names))
+        self._has_little_endian = any(layout.little_endian for layout in self._layouts)
+        self._has_big_endian = any(not layout.little_endian for layout in self._layouts)
+
+    def decode(self, data: bytes) -> DecodeResultType:
+        """
+        Decode the selected signals from a CAN frame's payload.
+
+        Signals not completely contained in a truncated payload are omitted.
+        """
+        if self._use_cantools:
+            return self._message.decode(data, allow_truncated=True, decode_containers=True)
+
+        data = data[:self._length]
+        bit_count = len(data) * 8
+        little = int.from_bytes(data, "little") if self._has_little_endian else 0
+        big = int.from_bytes(data, "big") if self._has_big_endian else 0
+        decoded: Dict[str, Any] = {}
+        for layout in self._layouts:
+            if layout.end > bit_count:
+                continue
+            if layout.little_endian:
+                raw = (little >> layout.start) & layout.mask
+            else:
+                raw = (big >> (bit_count - layout.end)) & layout.mask
+            if layout.float_format is not None:
+                raw = struct.unpack(layout.float_format, raw.to_bytes(layout.float_size, "big"))[0]
+            elif layout.sign_bit and raw & layout.sign_bit:
+                raw -= layout.sign_bit << 1
+            if layout.choices is not None and raw in layout.choices:
+                decoded[layout.name] = raw if layout.raw_choices else layout.choices[raw]
+            else:
+                decoded[layout.name] = layout.scale * raw + layout.offset
+        return decoded
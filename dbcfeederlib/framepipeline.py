@@ -0,0 +1,260 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+"""
+Generation of functions that decode and transform the mapped signals of
+a CAN frame in a single step.
+
+For every mapped CAN frame a Python function is generated which extracts the
+mapped signals from the payload, applies the DBC scaling, filters out-of-range
+values and applies the signals' VSS transformations. All properties of the
+signals and mappings are known in advance, so the generated function only
+contains the steps required for the particular frame.
+"""
+
+import logging
+import math
+import random
+import struct
+
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import cantools.database  # type: ignore
+
+from cantools.database.can.signal import NamedSignalValue  # type: ignore[import]
+
+from dbcfeederlib.framedecoder import create_signal_layout
+
+if TYPE_CHECKING:
+    from dbcfeederlib.dbc2vssmapper import SignalDispatch, VSSMapping
+
+log = logging.getLogger(__name__)
+
+# The result of processing a CAN frame's payload: for every mapped signal with a valid value
+# and every VSS data entry the signal is mapped to, the mapping, the raw value and the VSS value
+PipelineResult = List[Tuple["VSSMapping", Any, Any]]
+FramePipeline = Callable[[bytes], PipelineResult]
+
+
+class _SourceWriter:
+    """Collects the lines of generated source code."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.indent = 1
+
+    def write(self, line: str):
+        self.lines.append("    " * self.indent + line)
+
+
+def _write_transform(source: _SourceWriter, namespace: Dict[str, Any], name: str,
+                     mapping: "VSSMapping", has_choices: bool):
+    """Write the code for transforming "value" to the VSS value of the given mapping."""
+    mapping_name = f"mapping_{name}"
+    namespace[mapping_name] = mapping
+    compiled_transform = mapping.compiled_transform
+    if compiled_transform is None:
+        if not has_choices:
+            source.write(f"append(({mapping_name}, value, value))")
+        elif mapping.datatype == "string":
+            source.write(f"append(({mapping_name}, value, value.name if isinstance(value, NamedSignalValue) "
+                         "else value))")
+        else:
+            source.write(f"append(({mapping_name}, value, value.value if isinstance(value, NamedSignalValue) "
+                         "else value))")
+        return
+    kind, transform = compiled_transform
+    namespace[f"transform_{name}"] = transform
+    if kind == "mapping":
+        source.write(f"append(({mapping_name}, value, transform_{name}(value)))")
+    else:
+        source.write("try:")
+        source.write(f"    vss_value = transform_{name}(value)")
+        source.write("except Exception:")
+        # let the mapping log the failure and ignore the value
+        source.write(f"    vss_value = {mapping_name}.transform_value(value)")
+        source.write(f"append(({mapping_name}, value, vss_value))")
+
+
+def compile_frame_pipeline(message: cantools.database.Message,
+                           signals: Iterable["SignalDispatch"]) -> Optional[FramePipeline]:
+    """
+    Generate a function that decodes the given mapped signals of a CAN message and
+    transforms their values to the values of the VSS data entries they are mapped to.
+
+    The function takes a CAN frame's payload and returns the mapping, the raw value and
+    the VSS value for every mapping of the signals that have a valid value in the payload.
+    The result is the same as decoding the payload using cantools, discarding values
+    outside of the signal's range and transforming the remaining values using
+    VSSMapping.transform_value().
+
+    Returns None for multiplexed and container messages.
+    """
+    if message.is_container or message.is_multiplexed():
+        return None
+
+    dispatch_by_name = {dispatch.signal.name: dispatch for dispatch in signals}
+    namespace: Dict[str, Any] = {"NamedSignalValue": NamedSignalValue, "from_bytes": int.from_bytes}
+    source = _SourceWriter()
+    source.write(f"data = data[:{message.length}]")
+    source.write("bit_count = len(data) * 8")
+    source.write("result = []")
+    source.write("append = result.append")
+    layouts = [create_signal_layout(signal, dispatch_by_name[signal.name].raw_choices)
+               for signal in message.signals if signal.name in dispatch_by_name]
+    if any(layout.little_endian for layout in layouts):
+        source.write("little = from_bytes(data, \"little\")")
+    if any(not layout.little_endian for layout in layouts):
+        source.write("big = from_bytes(data, \"big\")")
+
+    for index, layout in enumerate(layouts):
+        dispatch = dispatch_by_name[layout.name]
+        source.write(f"# {layout.name}")
+        source.write(f"if bit_count >= {layout.end}:")
+        source.indent += 1
+        if layout.little_endian:
+            source.write(f"raw = (little >> {layout.start}) & {layout.mask:#x}")
+        else:
+            source.write(f"raw = (big >> (bit_count - {layout.end})) & {layout.mask:#x}")
+        if layout.float_format is not None:
+            namespace[f"unpack_{index}"] = struct.Struct(layout.float_format).unpack
+            source.write(f"raw = unpack_{index}(raw.to_bytes({layout.float_size}, \"big\"))[0]")
+        elif layout.sign_bit:
+            source.write(f"if raw & {layout.sign_bit:#x}:")
+            source.write(f"    raw -= {layout.sign_bit << 1:#x}")
+
+        namespace[f"scale_{index}"] = layout.scale
+        namespace[f"offset_{index}"] = layout.offset
+        is_identity = (layout.float_format is None and type(layout.scale) is int and layout.scale == 1
+                       and type(layout.offset) is int and layout.offset == 0)
+        scaled = "raw" if is_identity else f"scale_{index} * raw + offset_{index}"
+        has_choices = layout.choices is not None and not layout.raw_choices
+        if layout.raw_choices and is_identity:
+            source.write("value = raw")
+        elif layout.raw_choices:
+            namespace[f"choices_{index}"] = layout.choices
+            source.write(f"value = raw if raw in choices_{index} else {scaled}")
+        elif has_choices:
+            namespace[f"choices_{index}"] = layout.choices
+            source.write(f"value = choices_{index}.get(raw)")
+            source.write("if value is None:")
+            source.write(f"    value = {scaled}")
+        else:
+            source.write(f"value = {scaled}")
+
+        # filter out signals with values out of defined range
+        conditions = []
+        if dispatch.minimum is not None:
+            namespace[f"minimum_{index}"] = dispatch.minimum
+            conditions.append(f"not value < minimum_{index}")
+        if dispatch.maximum is not None:
+            namespace[f"maximum_{index}"] = dispatch.maximum
+            conditions.append(f"not value > maximum_{index}")
+        if conditions:
+            condition = " and ".join(conditions)
+            if has_choices:
+                condition = f"not isinstance(value, (int, float)) or ({condition})"
+            source.write(f"if {condition}:")
+            source.indent += 1
+
+        for mapping_index, mapping in enumerate(dispatch.mappings):
+            _write_transform(source, namespace, f"{index}_{mapping_index}", mapping, has_choices)
+        source.indent = 1
+
+    source.write("return result")
+    function_name = f"process_{message.name}"
+    code = f"def {function_name}(data):\n" + "\n".join(source.lines) + "\n"
+    log.debug("Generated pipeline for CAN message %s:\n%s", message.name, code)
+    exec(compile(code, f"<pipeline {message.name}>", "exec"), namespace)  # pylint: disable=exec-used
+    return namespace[function_name]
+
+
+def reference_pipeline(message: cantools.database.Message, signals: Iterable["SignalDispatch"],
+                       data: bytes) -> PipelineResult:
+    """
+    Decode and transform the given mapped signals of a CAN message using cantools
+    and VSSMapping.transform_value().
+
+    For signals with raw choices the numeric value of a NamedSignalValue is returned as raw value,
+    the VSS value is still determined by transforming the NamedSignalValue.
+    """
+    decoded = message.decode(data, allow_truncated=True, decode_containers=True)
+    result: PipelineResult = []
+    for dispatch in signals:
+        if dispatch.signal.name not in decoded:
+            continue
+        value = decoded[dispatch.signal.name]
+        if isinstance(value, (int, float)):
+            if dispatch.minimum is not None and value < dispatch.minimum:
+                continue
+            if dispatch.maximum is not None and value > dispatch.maximum:
+                continue
+        raw_value = value.value if dispatch.raw_choices and isinstance(value, NamedSignalValue) else value
+        for mapping in dispatch.mappings:
+            result.append((mapping, raw_value, mapping.transform_value(value)))
+    return result
+
+
+def _same(first: Any, second: Any) -> bool:
+    if type(first) is not type(second):
+        return False
+    if isinstance(first, float) and math.isnan(first):
+        return math.isnan(second)
+    return first == second
+
+
+def sample_payloads(message: cantools.database.Message) -> List[bytes]:
+    """
+    Get payloads for verifying a pipeline: all bits cleared, all bits set,
+    alternating bits, some random payloads and a truncated payload.
+    """
+    length = message.length
+    generator = random.Random(message.frame_id)
+    payloads = [bytes(length), bytes([0xff] * length), bytes([0x55] * length), bytes([0xaa] * length)]
+    payloads.extend(bytes(generator.getrandbits(8) for _ in range(length)) for _ in range(8))
+    payloads.append(payloads[-1][:length // 2])
+    return payloads
+
+
+def verify_frame_pipeline(pipeline: FramePipeline, message: cantools.database.Message,
+                          signals: Iterable["SignalDispatch"]) -> bool:
+    """
+    Check if a generated pipeline creates the same result as the reference
+    implementation for a set of sample payloads.
+    """
+    signals = list(signals)
+    for data in sample_payloads(message):
+        try:
+            expected = reference_pipeline(message, signals, data)
+            actual = pipeline(data)
+        except Exception:
+            log.debug("Failed to verify pipeline for CAN message %s", message.name, exc_info=True)
+            return False
+        if len(expected) != len(actual):
+            return False
+        for (expected_mapping, expected_raw, expected_vss), (mapping, raw, vss) in zip(expected, actual):
+            if (expected_mapping is not mapping or not _same(expected_raw, raw)
+                    or not _same(expected_vss, vss)):
+                log.debug(
+                    "Pipeline for CAN message %s differs for %s: expected (%s, %s), got (%s, %s)",
+                    message.name, mapping.vss_name, expected_raw, expected_vss, raw, vss
+                )
+                return False
+    return True
@@ -14,8 +14,10 @@
 #################################################################################
 
 import logging
-from typing import Any, List, Optional
+import time
+from typing import Any, Dict, List, Optional
 from .clientwrapper import ClientWrapper
+from .recorder import ColumnarRecorder
 
 log = logging.getLogger(__name__)
 
@@ -27,16 +29,34 @@ class LoggingClientWrapper(ClientWrapper):
         self._registered = True  
         self._subscription_callback = None
         self._subscribed_signals = []
+        self._recorder: Optional[ColumnarRecorder] = None
 
     def _do_init(self):
         log.info("[Initializing] Logging Client Wrapper")
 
+    def set_recorder(self, recorder: ColumnarRecorder):
+        """
+        Record the values in files using the given recorder instead of logging them.
+        """
+        self._recorder = recorder
+
     def start(self):
         log.info("[Starting] Logging Client Wrapper")
+        if self._recorder is not None:
+            self._recorder.set_paths(list(self._data_types))
+            self._recorder.start()
         return True
 
     def stop(self):
         log.info("[Stopping] Logging Client Wrapper")
+        if self._recorder is not None:
+            self._recorder.stop()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        if self._recorder is not None:
+            return self._recorder.get_statistics()
+        return {}
+
     def is_connected(self) -> bool:
         return self._connected
 
@@ -44,7 +64,10 @@ class LoggingClientWrapper(ClientWrapper):
         log.debug("[Checking] if signal %s is defined - assuming True for logging", vss_name)
         return True
 
-    def update_datapoint(self, name: str, value: Any) -> bool:
+    def update_datapoint(self, name: str, value: Any, timestamp: Optional[float] = None) -> bool:
+        if self._recorder is not None:
+            self._recorder.record(name, value, time.time() if timestamp is None else timestamp)
+            return True
         log.info("[Updating] VSS DataPoint - Signal: %s, Value: %s (%s)", name, value, type(value).__name__)
         return True
 
@@ -0,0 +1,311 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+"""
+Queues for passing VSS observations from the CAN reader to the feeder.
+"""
+
+import collections
+import enum
+import logging
+import queue
+import time
+
+from typing import Any, Callable, Dict, List, Optional
+
+from dbcfeederlib.dbc2vssmapper import VSSObservation
+
+log = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 10000
+
+
+class QueueMode(str, enum.Enum):
+    """Defines which observations are passed on to the feeder."""
+
+    # all observations in the order they have been received, see ObservationQueue
+    FIFO = "fifo"
+    # the latest observation per VSS data entry, see LatestValueMailbox
+    LATEST = "latest"
+    # all observations, processed in the thread of the CAN reader, see InlineDispatcher
+    INLINE = "inline"
+
+
+class OverflowPolicy(str, enum.Enum):
+    """Defines what happens when an observation is put into a full queue."""
+
+    # wait until there is room in the queue
+    BLOCK = "block"
+    # discard the observation that has been in the queue the longest
+    DROP_OLDEST = "drop-oldest"
+    # discard the observation that is put into the queue
+    DROP_NEWEST = "drop-newest"
+    # replace a queued observation for the same VSS data entry, drop the oldest observation if there is none
+    COALESCE = "coalesce"
+
+
+class ObservationQueue(queue.Queue):
+    """
+    A queue of VSSObservations with a fixed capacity.
+
+    The observations are kept in a ring buffer that is allocated when the queue is created.
+    The overflow policy determines what happens when an observation is put into the full queue.
+    Except for the BLOCK policy, putting an observation never blocks.
+
+    If given, the on_drop callback is invoked for every observation that has been discarded.
+    It is invoked in the thread that has put the observation into the queue.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_QUEUE_SIZE, policy: OverflowPolicy = OverflowPolicy.COALESCE,
+                 on_drop: Optional[Callable[[VSSObservation], None]] = None):
+        if maxsize <= 0:
+            raise ValueError("Queue size must be greater than 0")
+        self._policy = policy
+        self._on_drop = on_drop
+        super().__init__(maxsize)
+
+    # The following methods are invoked by queue.Queue with its mutex being held
+
+    def _init(self, maxsize: int):
+        self._buffer: List[Optional[VSSObservation]] = [None] * maxsize
+        self._head = 0
+        self._count = 0
+        # the buffer index of the most recently queued observation per VSS data entry
+        self._latest: Dict[str, int] = {}
+        self._high_water_mark = 0
+        self._dropped = 0
+        self._coalesced = 0
+
+    def _qsize(self) -> int:
+        return self._count
+
+    def _put(self, item: VSSObservation):
+        index = (self._head + self._count) % self.maxsize
+        self._buffer[index] = item
+        self._count += 1
+        if self._policy == OverflowPolicy.COALESCE:
+            self._latest[item.vss_name] = index
+        if self._count > self._high_water_mark:
+            self._high_water_mark = self._count
+
+    def _get(self) -> VSSObservation:
+        index = self._head
+        item = self._buffer[index]
+        self._buffer[index] = None
+        self._head = (index + 1) % self.maxsize
+        self._count -= 1
+        if self._latest.get(item.vss_name) == index:  # type: ignore[union-attr]
+            del self._latest[item.vss_name]  # type: ignore[union-attr]
+        return item  # type: ignore[return-value]
+
+    def put(self, item: VSSObservation, block: bool = True, timeout: Optional[float] = None):
+        """
+        Put an observation into the queue, applying the overflow policy if the queue is full.
+        The block and timeout parameters are only considered for the BLOCK policy.
+        """
+        if self._policy == OverflowPolicy.BLOCK:
+            super().put(item, block, timeout)
+            return
+
+        dropped: Optional[VSSObservation] = None
+        with self.not_full:
+            if self._count < self.maxsize:
+                self._put(item)
+                self.unfinished_tasks += 1
+            elif self._policy == OverflowPolicy.DROP_NEWEST:
+                dropped = item
+            elif self._policy == OverflowPolicy.COALESCE and item.vss_name in self._latest:
+                # the queued observation is outdated, the new one takes its place
+                self._buffer[self._latest[item.vss_name]] = item
+                self._coalesced += 1
+            else:
+                dropped = self._get()
+                self._put(item)
+            if dropped is not None:
+                self._dropped += 1
+            self.not_empty.notify()
+
+        if dropped is not None:
+            log.debug("Queue is full, dropped observation for %s", dropped.vss_name)
+            if self._on_drop is not None:
+                self._on_drop(dropped)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about the usage of the queue:
+
+        * size: the number of observations currently in the queue
+        * capacity: the maximum number of observations in the queue
+        * high_water_mark: the maximum number of observations that have been in the queue at the same time
+        * dropped: the number of observations that have been discarded because the queue was full
+        * coalesced: the number of queued observations that have been replaced by a newer one
+        """
+        with self.mutex:
+            return {
+                "size": self._count,
+                "capacity": self.maxsize,
+                "high_water_mark": self._high_water_mark,
+                "dropped": self._dropped,
+                "coalesced": self._coalesced
+            }
+
+
+class LatestValueMailbox(queue.Queue):
+    """
+    A queue that only keeps the latest observation per VSS data entry.
+
+    An observation put into the mailbox replaces an observation for the same VSS data entry
+    which has not been taken yet. Observations are taken in the order in which their VSS
+    data entries have been updated first since they have last been taken. The number of
+    queued observations is therefore limited by the number of mapped VSS data entries
+    and putting an observation never blocks.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+    # The following methods are invoked by queue.Queue with its mutex being held
+
+    def _init(self, maxsize: int):
+        self._pending: collections.OrderedDict[str, VSSObservation] = collections.OrderedDict()
+        self._high_water_mark = 0
+        self._overwritten: Dict[str, int] = {}
+        self._taken = 0
+        self._total_age = 0.0
+        self._max_age = 0.0
+
+    def _qsize(self) -> int:
+        return len(self._pending)
+
+    def _put(self, item: VSSObservation):
+        self._pending[item.vss_name] = item
+        if len(self._pending) > self._high_water_mark:
+            self._high_water_mark = len(self._pending)
+
+    def _get(self) -> VSSObservation:
+        _, item = self._pending.popitem(last=False)
+        age = time.time() - item.time
+        self._taken += 1
+        self._total_age += age
+        if age > self._max_age:
+            self._max_age = age
+        return item
+
+    def put(self, item: VSSObservation, block: bool = True, timeout: Optional[float] = None):
+        """
+        Put an observation into the mailbox, replacing a pending observation for the same VSS data entry.
+        The block and timeout parameters are ignored.
+        """
+        with self.not_full:
+            if item.vss_name in self._pending:
+                self._overwritten[item.vss_name] = self._overwritten.get(item.vss_name, 0) + 1
+            else:
+                self.unfinished_tasks += 1
+            self._put(item)
+            self.not_empty.notify()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about the usage of the mailbox:
+
+        * size: the number of VSS data entries with a pending observation
+        * high_water_mark: the maximum number of VSS data entries that have had a pending observation at the same time
+        * dropped: the number of observations that have been replaced by a newer one
+        * dropped_per_path: the number of replaced observations per VSS data entry
+        * mean_age/max_age: the mean/maximum time (in seconds) between receiving and taking an observation
+        """
+        with self.mutex:
+            return {
+                "size": len(self._pending),
+                "high_water_mark": self._high_water_mark,
+                "dropped": sum(self._overwritten.values()),
+                "dropped_per_path": dict(self._overwritten),
+                "mean_age": self._total_age / self._taken if self._taken > 0 else 0.0,
+                "max_age": self._max_age
+            }
+
+
+class InlineDispatcher(queue.Queue):
+    """
+    A queue that passes every observation on to a handler instead of queueing it.
+
+    The handler is invoked in the thread that puts the observation into the queue, i.e. the
+    CAN reader's thread, which saves handing over each observation to the feeder's thread.
+    Exceptions raised by the handler are logged. The dispatcher is always empty, so taking an
+    observation from it blocks until the timeout expires.
+    """
+
+    def __init__(self, handler: Callable[[VSSObservation], None]):
+        self._handler = handler
+        super().__init__()
+
+    def _init(self, maxsize: int):
+        self._dispatched = 0
+        self._failed = 0
+        self._dispatch_time = 0.0
+
+    def _qsize(self) -> int:
+        return 0
+
+    def put(self, item: VSSObservation, block: bool = True, timeout: Optional[float] = None):
+        """
+        Pass an observation on to the handler.
+        The block and timeout parameters are ignored.
+        """
+        start = time.perf_counter()
+        try:
+            self._handler(item)
+        except Exception:
+            self._failed += 1
+            log.error("Failed to process observation for %s", item.vss_name, exc_info=True)
+        self._dispatched += 1
+        self._dispatch_time += time.perf_counter() - start
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about the dispatched observations:
+
+        * dispatched: the number of observations that have been passed on to the handler
+        * failed: the number of observations for which the handler has raised an exception
+        * mean_dispatch_time: the mean time (in seconds) the handler took for an observation
+        """
+        return {
+            "dispatched": self._dispatched,
+            "failed": self._failed,
+            "mean_dispatch_time": self._dispatch_time / self._dispatched if self._dispatched > 0 else 0.0
+        }
+
+
+def create_observation_queue(mode: QueueMode, maxsize: int = DEFAULT_QUEUE_SIZE,
+                             policy: OverflowPolicy = OverflowPolicy.COALESCE,
+                             on_drop: Optional[Callable[[VSSObservation], None]] = None,
+                             handler: Optional[Callable[[VSSObservation], None]] = None) -> queue.Queue:
+    """
+    Create the queue for passing observations from the CAN reader to the feeder.
+    The maximum size, overflow policy and drop callback only apply to the FIFO mode,
+    the handler is required for (and only used by) the INLINE mode.
+    """
+    if mode == QueueMode.LATEST:
+        return LatestValueMailbox()
+    if mode == QueueMode.INLINE:
+        if handler is None:
+            raise ValueError("Inline dispatching requires a handler")
+        return InlineDispatcher(handler)
+    return ObservationQueue(maxsize, policy, on_drop)
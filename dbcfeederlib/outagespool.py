@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+"""
+File backed spool for VSS Data Entry values that cannot be sent while the server is not available.
+"""
+
+import json
+import logging
+import os
+import threading
+
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+log = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_MAX_SIZE = 1024 * 1024
+DEFAULT_SPOOL_REPLAY_RATE = 100
+
+
+class OutageSpool:
+    """
+    Keeps the latest value per VSS Data Entry in an append-only file.
+
+    Each line of the file contains a JSON array: [path, value, time] for a spooled value
+    or [path] for a value that has been taken or discarded again. A value spooled for a
+    VSS Data Entry replaces the value spooled before for the same entry. Once the file
+    exceeds its maximum size it is rewritten with the pending values only; if it still
+    does not have room for a value of another VSS Data Entry, that value is dropped.
+
+    Values spooled by a previous run are loaded when the spool is created, so they survive
+    a restart of the feeder. The spool is thread safe.
+    """
+
+    def __init__(self, file_name: str, max_size: int = DEFAULT_SPOOL_MAX_SIZE):
+        if max_size <= 0:
+            raise ValueError("Spool size must be greater than 0")
+        self._file_name = file_name
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        # value and time of the pending value per VSS Data Entry
+        self._values: Dict[str, Tuple[Any, float]] = {}
+        self._file: Optional[TextIO] = None
+        self._file_size = 0
+        # the number of records in the file, to tell whether compacting it would gain anything
+        self._records = 0
+        self._spooled = 0
+        self._coalesced = 0
+        self._dropped = 0
+        self._taken = 0
+        self._load()
+        self._compact()
+
+    def _load(self):
+        if not os.path.exists(self._file_name):
+            return
+        with open(self._file_name, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line may be incomplete if the feeder has not been shut down properly
+                    log.warning("Ignoring invalid record in spool file %s", self._file_name)
+                    continue
+                if len(record) == 3:
+                    self._values[record[0]] = (record[1], record[2])
+                else:
+                    self._values.pop(record[0], None)
+        if self._values:
+            log.info("Loaded %d spooled values from %s", len(self._values), self._file_name)
+
+    def _compact(self):
+        # Rewrite the file with the pending values only
+        if self._file is not None:
+            self._file.close()
+        temp_file_name = self._file_name + ".tmp"
+        with open(temp_file_name, "w", encoding="utf-8") as file:
+            for vss_name, (value, timestamp) in self._values.items():
+                file.write(self._record(vss_name, value, timestamp))
+        os.replace(temp_file_name, self._file_name)
+        self._file = open(self._file_name, "a", encoding="utf-8")
+        self._file_size = os.path.getsize(self._file_name)
+        self._records = len(self._values)
+
+    def _append(self, record: str):
+        self._file.write(record)  # type: ignore[union-attr]
+        self._file.flush()  # type: ignore[union-attr]
+        self._file_size += len(record)
+        self._records += 1
+
+    @staticmethod
+    def _record(vss_name: str, value: Any, timestamp: float) -> str:
+        return json.dumps([vss_name, value, timestamp], separators=(",", ":")) + "\n"
+
+    def put(self, vss_name: str, value: Any, timestamp: float) -> bool:
+        """
+        Spool a value, replacing a pending value for the same VSS Data Entry.
+        Returns False if the value has been dropped because the spool is full.
+        """
+        try:
+            record = self._record(vss_name, value, timestamp)
+        except TypeError:
+            log.warning("Cannot spool value %s of type %s for %s", value, type(value), vss_name)
+            return False
+        with self._lock:
+            if self._file is None:
+                return False
+            if self._file_size + len(record) > self._max_size:
+                if self._records > len(self._values):
+                    self._compact()
+                if vss_name not in self._values and self._file_size + len(record) > self._max_size:
+                    self._dropped += 1
+                    log.debug("Spool is full, dropped value for %s", vss_name)
+                    return False
+            if vss_name in self._values:
+                self._coalesced += 1
+            self._values[vss_name] = (value, timestamp)
+            self._spooled += 1
+            self._append(record)
+            return True
+
+    def discard(self, vss_name: str):
+        """
+        Discard the pending value for a VSS Data Entry, e.g. because a newer value has been sent.
+        """
+        with self._lock:
+            if self._file is not None and self._values.pop(vss_name, None) is not None:
+                self._append(json.dumps([vss_name]) + "\n")
+
+    def take(self, count: int) -> List[Tuple[str, Any, float]]:
+        """
+        Take up to count pending values, the most recently received values first.
+        Returns a list of (path, value, time) tuples.
+        """
+        with self._lock:
+            newest = sorted(self._values.items(), key=lambda item: item[1][1], reverse=True)[:count]
+            for vss_name, _ in newest:
+                del self._values[vss_name]
+            if self._file is not None and newest:
+                if self._values:
+                    for vss_name, _ in newest:
+                        self._append(json.dumps([vss_name]) + "\n")
+                else:
+                    self._file.truncate(0)
+                    self._file_size = 0
+                    self._records = 0
+            self._taken += len(newest)
+            return [(vss_name, value, timestamp) for vss_name, (value, timestamp) in newest]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._values)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about the usage of the spool:
+
+        * size: the number of VSS Data Entries with a pending value
+        * file_size: the current size of the spool file in bytes
+        * spooled: the number of values that have been spooled
+        * coalesced: the number of pending values that have been replaced by a newer one
+        * dropped: the number of values that have been dropped because the spool was full
+        * taken: the number of values that have been taken from the spool
+        """
+        with self._lock:
+            return {
+                "size": len(self._values),
+                "file_size": self._file_size,
+                "spooled": self._spooled,
+                "coalesced": self._coalesced,
+                "dropped": self._dropped,
+                "taken": self._taken
+            }
+
+    def close(self):
+        """
+        Close the spool file, keeping the pending values for the next run.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
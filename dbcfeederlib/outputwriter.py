@@ -0,0 +1,283 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+"""
+Buffered writer for VSS Data Entry values written to the console or a (rotating) file.
+"""
+
+import enum
+import gzip
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_SIZE = 10000
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_FILE_SIZE = 0
+DEFAULT_MAX_FILES = 5
+# Values kept in memory while the writer does not keep up, further values are dropped
+DEFAULT_MAX_BUFFERED = 1000000
+
+COMPRESSED_SUFFIX = ".gz"
+
+
+class OutputFormat(str, enum.Enum):
+    """Defines how values are written."""
+
+    # Datapoint(path, value, time) per line
+    TEXT = "text"
+    # a JSON object with path, value and time per line
+    JSONL = "jsonl"
+    # path, value and time per line, with a header line at the start of each file
+    CSV = "csv"
+
+
+_CSV_HEADER = "path,value,time\n"
+_CSV_SPECIAL_CHARACTERS = (",", "\"", "\n", "\r")
+
+
+def _csv_field(text: str) -> str:
+    if any(character in text for character in _CSV_SPECIAL_CHARACTERS):
+        return "\"" + text.replace("\"", "\"\"") + "\""
+    return text
+
+
+def _format_text(vss_name: str, value: Any, timestamp: float) -> str:
+    return f"Datapoint({vss_name}, {value}, {timestamp})\n"
+
+
+def _format_jsonl(vss_name: str, value: Any, timestamp: float) -> str:
+    return json.dumps({"path": vss_name, "value": value, "time": timestamp}, default=str) + "\n"
+
+
+def _format_csv(vss_name: str, value: Any, timestamp: float) -> str:
+    return f"{_csv_field(vss_name)},{_csv_field(str(value))},{timestamp}\n"
+
+
+_FORMATTERS: Dict[OutputFormat, Callable[[str, Any, float], str]] = {
+    OutputFormat.TEXT: _format_text,
+    OutputFormat.JSONL: _format_jsonl,
+    OutputFormat.CSV: _format_csv,
+}
+
+
+class OutputWriter:
+    """
+    Writes VSS Data Entry values to the console or to a file in a writer thread.
+
+    Values are buffered in memory by write(), which never blocks on I/O. Once the maximum number
+    of buffered values has been reached, further values are dropped or, if the writer has been
+    created with block=True, write() waits until the writer thread has taken the buffered values.
+
+    The writer thread formats and writes the buffered values once the buffer size has been reached
+    or the flush interval has expired. If a maximum file size is set, the file is rotated once it
+    exceeds that size: the current file is renamed by appending ".1" (shifting older files to ".2"
+    and so on, keeping at most max_files of them) and optionally compressed with gzip.
+    """
+
+    def __init__(self, file_name: Optional[str] = None, output_format: OutputFormat = OutputFormat.TEXT,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_file_size: int = DEFAULT_MAX_FILE_SIZE, max_files: int = DEFAULT_MAX_FILES,
+                 compress: bool = False, max_buffered: int = DEFAULT_MAX_BUFFERED, block: bool = False):
+        if buffer_size < 1:
+            raise ValueError("Buffer size must be at least 1")
+        if max_file_size < 0:
+            raise ValueError("Maximum file size must not be negative")
+        if max_files < 1:
+            raise ValueError("Number of rotated files must be at least 1")
+        self._file_name = file_name
+        self._output_format = output_format
+        self._format = _FORMATTERS[output_format]
+        # the number of buffered values that triggers writing them
+        self._buffer_size = min(buffer_size, max_buffered)
+        self._flush_interval = flush_interval
+        self._max_file_size = max_file_size
+        self._max_files = max_files
+        self._compress = compress
+        self._max_buffered = max_buffered
+        # whether write() waits for room in the buffer instead of dropping the value
+        self._block = block
+        # values waiting to be written, guarded by the condition
+        self._condition = threading.Condition()
+        self._buffer: List[Tuple[str, Any, float]] = []
+        self._writing = False
+        self._writer: Optional[threading.Thread] = None
+        # The following are only used by the writer thread
+        self._file: Optional[BinaryIO] = None
+        self._file_size = 0
+        self._received = 0
+        self._dropped = 0
+        self._written = 0
+        self._flushes = 0
+        self._rotations = 0
+        self._bytes_written = 0
+        self._total_flush_latency = 0.0
+        self._max_flush_latency = 0.0
+
+    def start(self):
+        """Start the writer thread."""
+        self._writing = True
+        self._writer = threading.Thread(target=self._run_writer, name="output-writer", daemon=True)
+        self._writer.start()
+        log.info("Writing values to %s in %s format", self._file_name or "console", self._output_format.value)
+
+    def stop(self):
+        """Write the buffered values and stop the writer thread."""
+        if self._writer is None:
+            return
+        with self._condition:
+            self._writing = False
+            self._condition.notify_all()
+        self._writer.join()
+        self._writer = None
+        log.info("Stopped writing values: %s", self.get_statistics())
+
+    def write(self, vss_name: str, value: Any, timestamp: float):
+        """Buffer a value to be written."""
+        with self._condition:
+            if self._block:
+                while self._writing and len(self._buffer) >= self._max_buffered:
+                    self._condition.wait()
+            if len(self._buffer) >= self._max_buffered:
+                self._dropped += 1
+                return
+            self._buffer.append((vss_name, value, timestamp))
+            self._received += 1
+            if len(self._buffer) == self._buffer_size:
+                self._condition.notify_all()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about the values written:
+
+        * received: the number of values that have been buffered
+        * dropped: the number of values that have been dropped because too many values were buffered
+        * buffered: the number of values waiting to be written
+        * written: the number of values that have been written
+        * flushes: the number of times buffered values have been written
+        * rotations: the number of times the output file has been rotated
+        * bytes_written: the total number of bytes written
+        * mean_flush_latency/max_flush_latency: the mean/maximum time (in seconds) needed to
+          write and flush the buffered values
+        """
+        with self._condition:
+            return {
+                "received": self._received,
+                "dropped": self._dropped,
+                "buffered": len(self._buffer),
+                "written": self._written,
+                "flushes": self._flushes,
+                "rotations": self._rotations,
+                "bytes_written": self._bytes_written,
+                "mean_flush_latency": self._total_flush_latency / self._flushes if self._flushes > 0 else 0.0,
+                "max_flush_latency": self._max_flush_latency
+            }
+
+    def _take_values(self) -> Tuple[List[Tuple[str, Any, float]], bool]:
+        # Wait until values are to be written, return them and whether writing is still active
+        with self._condition:
+            deadline = time.monotonic() + self._flush_interval
+            while self._writing and len(self._buffer) < self._buffer_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            values, self._buffer = self._buffer, []
+            if self._block:
+                self._condition.notify_all()
+            return values, self._writing
+
+    def _run_writer(self):
+        writing = True
+        while writing:
+            values, writing = self._take_values()
+            if not values:
+                continue
+            try:
+                self._flush(values)
+            except OSError:
+                log.error("Failed to write values to %s", self._file_name, exc_info=True)
+        self._close_file()
+
+    def _flush(self, values: List[Tuple[str, Any, float]]):
+        start = time.perf_counter()
+        data = "".join([self._format(vss_name, value, timestamp) for vss_name, value, timestamp in values])
+        if self._file_name is None:
+            sys.stdout.write(data)
+            sys.stdout.flush()
+            size = len(data.encode("utf-8"))
+        else:
+            if self._file is None:
+                self._open_file()
+            encoded = data.encode("utf-8")
+            self._file.write(encoded)  # type: ignore[union-attr]
+            self._file.flush()  # type: ignore[union-attr]
+            size = len(encoded)
+            self._file_size += size
+        latency = time.perf_counter() - start
+        with self._condition:
+            self._written += len(values)
+            self._flushes += 1
+            self._bytes_written += size
+            self._total_flush_latency += latency
+            self._max_flush_latency = max(self._max_flush_latency, latency)
+        if self._max_file_size > 0 and self._file_size >= self._max_file_size:
+            self._rotate()
+
+    def _open_file(self):
+        self._file = open(self._file_name, "ab")  # type: ignore[arg-type]
+        self._file_size = self._file.tell()
+        if self._output_format == OutputFormat.CSV and self._file_size == 0:
+            header = _CSV_HEADER.encode("utf-8")
+            self._file.write(header)
+            self._file_size += len(header)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotated_file_name(self, number: int) -> str:
+        suffix = COMPRESSED_SUFFIX if self._compress else ""
+        return f"{self._file_name}.{number}{suffix}"
+
+    def _rotate(self):
+        self._close_file()
+        for number in range(self._max_files - 1, 0, -1):
+            if os.path.exists(self._rotated_file_name(number)):
+                os.replace(self._rotated_file_name(number), self._rotated_file_name(number + 1))
+        if self._compress:
+            with open(self._file_name, "rb") as source:  # type: ignore[arg-type]
+                with gzip.open(self._rotated_file_name(1), "wb") as target:
+                    shutil.copyfileobj(source, target)
+            os.remove(self._file_name)  # type: ignore[arg-type]
+        else:
+            os.replace(self._file_name, self._rotated_file_name(1))  # type: ignore[arg-type]
+        with self._condition:
+            self._rotations += 1
+        log.info("Rotated output file %s", self._file_name)
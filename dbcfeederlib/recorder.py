@@ -0,0 +1,523 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+"""
+Recording of VSS Data Entry values in compact columnar files.
+
+A recording file starts with a header containing the path dictionary, followed by chunks:
+
+* file header: magic (8 bytes), header length (uint32), JSON header {"paths": [...], "created": time}
+* chunk header: magic (4 bytes), value count n, start time, end time (float64),
+  length of the JSON list of paths added by the chunk, length of the JSON string table (uint32)
+* the JSON list of [path ID, path] pairs added to the path dictionary by the chunk
+* the columns: path IDs (n * uint16), timestamps (n * float64), value types (n * uint8),
+  values (n * 8 bytes, int64 or float64 depending on the value type)
+* the JSON string table, holding the string values and the JSON encoded values of other types
+
+All numbers are little endian. For every recording file an index file (same name with
+".index.json" appended) lists the paths by their ID and the offset, value count and time range
+of each chunk. A block index file (same name with ".blocks" appended) contains a record per path
+and chunk: path ID, value count (uint32), chunk offset (uint64), time range (float64). Records
+are appended in the order the chunks are written and sorted by path ID and start time once the
+recording file is complete, which is marked by "sealed" in the index file.
+"""
+
+import enum
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple, BinaryIO
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 10000
+DEFAULT_MAX_FILE_SIZE = 64 * 1024 * 1024
+DEFAULT_FLUSH_INTERVAL = 1.0
+# Values kept in memory while the writer does not keep up, further values are dropped
+DEFAULT_MAX_BUFFERED = 1000000
+
+_FILE_MAGIC = b"DBCREC01"
+_CHUNK_MAGIC = b"CHNK"
+_FILE_HEADER = struct.Struct("<8sI")
+_CHUNK_HEADER = struct.Struct("<4sIddII")
+INDEX_SUFFIX = ".index.json"
+BLOCKS_SUFFIX = ".blocks"
+RECORDING_SUFFIX = ".rec"
+_BLOCK = np.dtype([("path", "<u4"), ("count", "<u4"), ("offset", "<u8"), ("start", "<f8"), ("end", "<f8")])
+
+
+class ValueType(enum.IntEnum):
+    """Type of a recorded value, determines how the value column is interpreted."""
+
+    INT = 0
+    FLOAT = 1
+    BOOL = 2
+    STRING = 3
+    JSON = 4
+
+
+class ColumnarRecorder:
+    """
+    Records VSS Data Entry values in chunks written to recording files in a directory.
+
+    Values are buffered in memory by record(), which never blocks on I/O. A writer thread
+    writes the buffered values as a chunk once the chunk size has been reached or the flush
+    interval has expired. A new recording file is started once a file exceeds the maximum size.
+    """
+
+    def __init__(self, directory: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_file_size: int = DEFAULT_MAX_FILE_SIZE, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_buffered: int = DEFAULT_MAX_BUFFERED):
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be at least 1")
+        self._directory = directory
+        self._chunk_size = chunk_size
+        self._max_file_size = max_file_size
+        self._flush_interval = flush_interval
+        self._max_buffered = max_buffered
+        # recorded values waiting to be written, guarded by the condition
+        self._condition = threading.Condition()
+        self._buffer: List[Tuple[str, Any, float]] = []
+        self._recording = False
+        self._writer: Optional[threading.Thread] = None
+        # The following are only used by the writer thread
+        self._known_paths: List[str] = []
+        self._path_ids: Dict[str, int] = {}
+        self._file: Optional[BinaryIO] = None
+        self._blocks_file: Optional[BinaryIO] = None
+        self._file_name = ""
+        self._file_paths: List[str] = []
+        self._file_sequence = 0
+        self._index: List[Dict[str, Any]] = []
+        self._recorded = 0
+        self._dropped = 0
+        self._written = 0
+        self._chunks = 0
+        self._files = 0
+        self._bytes_written = 0
+
+    def set_paths(self, paths: List[str]):
+        """
+        Set the paths to include in the path dictionary of each recording file.
+        Further paths are added by the chunks in which they are recorded first.
+        """
+        self._known_paths = sorted(paths)
+
+    def start(self):
+        """Start the writer thread."""
+        os.makedirs(self._directory, exist_ok=True)
+        self._recording = True
+        self._writer = threading.Thread(target=self._run_writer, name="recorder", daemon=True)
+        self._writer.start()
+        log.info("Recording values to %s", self._directory)
+
+    def stop(self):
+        """Write the buffered values and stop the writer thread."""
+        if self._writer is None:
+            return
+        with self._condition:
+            self._recording = False
+            self._condition.notify()
+        self._writer.join()
+        self._writer = None
+        log.info("Stopped recording values: %s", self.get_statistics())
+
+    def record(self, vss_name: str, value: Any, timestamp: float):
+        """Buffer a value to be recorded."""
+        with self._condition:
+            if len(self._buffer) >= self._max_buffered:
+                self._dropped += 1
+                return
+            self._buffer.append((vss_name, value, timestamp))
+            self._recorded += 1
+            if len(self._buffer) == self._chunk_size:
+                self._condition.notify()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about the recording:
+
+        * recorded: the number of values that have been buffered
+        * dropped: the number of values that have been dropped because too many values were buffered
+        * buffered: the number of values waiting to be written
+        * written: the number of values that have been written
+        * chunks/files: the number of chunks/recording files that have been written
+        * bytes_written: the total size of the chunks that have been written
+        """
+        with self._condition:
+            return {
+                "recorded": self._recorded,
+                "dropped": self._dropped,
+                "buffered": len(self._buffer),
+                "written": self._written,
+                "chunks": self._chunks,
+                "files": self._files,
+                "bytes_written": self._bytes_written
+            }
+
+    def _take_chunk(self) -> Tuple[List[Tuple[str, Any, float]], bool]:
+        # Wait until a chunk is to be written, return its values and whether recording is still active
+        with self._condition:
+            deadline = time.monotonic() + self._flush_interval
+            while self._recording and len(self._buffer) < self._chunk_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            chunk, self._buffer = self._buffer, []
+            return chunk, self._recording
+
+    def _run_writer(self):
+        recording = True
+        while recording:
+            values, recording = self._take_chunk()
+            for start in range(0, len(values), self._chunk_size):
+                try:
+                    self._write_chunk(values[start:start + self._chunk_size])
+                except OSError:
+                    log.error("Failed to write recording file %s", self._file_name, exc_info=True)
+        self._close_file()
+
+    def _open_file(self):
+        self._file_sequence += 1
+        self._file_name = os.path.join(
+            self._directory,
+            f"recording-{time.strftime('%Y%m%d-%H%M%S')}-{self._file_sequence:04d}{RECORDING_SUFFIX}")
+        self._path_ids = {path: path_id for path_id, path in enumerate(self._known_paths)}
+        self._file_paths = list(self._known_paths)
+        self._index = []
+        header = json.dumps({"paths": self._known_paths, "created": time.time()}).encode("utf-8")
+        self._file = open(self._file_name, "wb")
+        self._blocks_file = open(self._file_name + BLOCKS_SUFFIX, "wb")
+        self._file.write(_FILE_HEADER.pack(_FILE_MAGIC, len(header)))
+        self._file.write(header)
+        self._files += 1
+        log.info("Started recording file %s", self._file_name)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._blocks_file.close()  # type: ignore[union-attr]
+            self._blocks_file = None
+            self._seal_blocks()
+
+    def _seal_blocks(self):
+        # Sort the block index by path and time, so that the blocks of a path can be found by binary search
+        blocks_file_name = self._file_name + BLOCKS_SUFFIX
+        blocks = np.fromfile(blocks_file_name, dtype=_BLOCK)
+        blocks[np.lexsort((blocks["start"], blocks["path"]))].tofile(blocks_file_name + ".tmp")
+        os.replace(blocks_file_name + ".tmp", blocks_file_name)
+        self._write_index(sealed=True)
+
+    def _write_chunk(self, values: List[Tuple[str, Any, float]]):
+        if not values:
+            return
+        if self._file is None:
+            self._open_file()
+        count = len(values)
+        path_ids = np.empty(count, dtype="<u2")
+        timestamps = np.empty(count, dtype="<f8")
+        value_types = np.empty(count, dtype="u1")
+        numbers = np.empty(count, dtype="<f8")
+        integers = numbers.view("<i8")
+        strings: List[str] = []
+        added_paths: List[Tuple[int, str]] = []
+        for position, (vss_name, value, timestamp) in enumerate(values):
+            path_id = self._path_ids.get(vss_name)
+            if path_id is None:
+                path_id = len(self._path_ids)
+                self._path_ids[vss_name] = path_id
+                self._file_paths.append(vss_name)
+                added_paths.append((path_id, vss_name))
+            path_ids[position] = path_id
+            timestamps[position] = timestamp
+            if isinstance(value, (bool, np.bool_)):
+                value_types[position] = ValueType.BOOL
+                integers[position] = value
+            elif isinstance(value, (int, np.integer)) and -2**63 <= value < 2**63:
+                value_types[position] = ValueType.INT
+                integers[position] = value
+            elif isinstance(value, (float, np.floating)):
+                value_types[position] = ValueType.FLOAT
+                numbers[position] = value
+            elif isinstance(value, str):
+                value_types[position] = ValueType.STRING
+                integers[position] = len(strings)
+                strings.append(value)
+            else:
+                value_types[position] = ValueType.JSON
+                integers[position] = len(strings)
+                strings.append(json.dumps(value, default=str))
+
+        added_paths_data = json.dumps(added_paths).encode("utf-8") if added_paths else b""
+        strings_data = json.dumps(strings).encode("utf-8") if strings else b""
+        start_time = float(timestamps.min())
+        end_time = float(timestamps.max())
+        offset = self._file.tell()  # type: ignore[union-attr]
+        self._file.write(_CHUNK_HEADER.pack(  # type: ignore[union-attr]
+            _CHUNK_MAGIC, count, start_time, end_time, len(added_paths_data), len(strings_data)))
+        for data in (added_paths_data, path_ids.tobytes(), timestamps.tobytes(), value_types.tobytes(),
+                     numbers.tobytes(), strings_data):
+            self._file.write(data)  # type: ignore[union-attr]
+        self._file.flush()  # type: ignore[union-attr]
+        size = self._file.tell() - offset  # type: ignore[union-attr]
+        self._write_blocks(path_ids, timestamps, offset)
+
+        self._index.append({"offset": offset, "count": count, "start": start_time, "end": end_time})
+        self._write_index()
+        with self._condition:
+            self._written += count
+            self._chunks += 1
+            self._bytes_written += size
+        if offset + size >= self._max_file_size:
+            self._close_file()
+
+    def _write_blocks(self, path_ids: np.ndarray, timestamps: np.ndarray, offset: int):
+        order = np.argsort(path_ids, kind="stable")
+        sorted_path_ids = path_ids[order]
+        sorted_timestamps = timestamps[order]
+        block_path_ids, starts = np.unique(sorted_path_ids, return_index=True)
+        blocks = np.empty(len(block_path_ids), dtype=_BLOCK)
+        blocks["path"] = block_path_ids
+        blocks["count"] = np.diff(np.append(starts, len(path_ids)))
+        blocks["offset"] = offset
+        blocks["start"] = np.minimum.reduceat(sorted_timestamps, starts)
+        blocks["end"] = np.maximum.reduceat(sorted_timestamps, starts)
+        self._blocks_file.write(blocks.tobytes())  # type: ignore[union-attr]
+        self._blocks_file.flush()  # type: ignore[union-attr]
+
+    def _write_index(self, sealed: bool = False):
+        index_file_name = self._file_name + INDEX_SUFFIX
+        with open(index_file_name + ".tmp", "w", encoding="utf-8") as index_file:
+            json.dump({"file": os.path.basename(self._file_name), "paths": self._file_paths,
+                       "chunks": self._index, "sealed": sealed}, index_file)
+        os.replace(index_file_name + ".tmp", index_file_name)
+
+
+def read_recording(file_name: str, start_time: Optional[float] = None,
+                   end_time: Optional[float] = None) -> Iterator[Tuple[str, float, Any]]:
+    """
+    Read the values of a recording file as (path, timestamp, value) tuples.
+    If given, only chunks overlapping the time range are read.
+    """
+    with open(file_name, "rb") as file:
+        magic, header_length = _FILE_HEADER.unpack(file.read(_FILE_HEADER.size))
+        if magic != _FILE_MAGIC:
+            raise ValueError(f"{file_name} is not a recording file")
+        paths: Dict[int, str] = dict(enumerate(json.loads(file.read(header_length))["paths"]))
+        while True:
+            chunk_header = file.read(_CHUNK_HEADER.size)
+            if len(chunk_header) < _CHUNK_HEADER.size:
+                return
+            magic, count, chunk_start, chunk_end, added_paths_length, strings_length = \
+                _CHUNK_HEADER.unpack(chunk_header)
+            if magic != _CHUNK_MAGIC:
+                raise ValueError(f"Invalid chunk in recording file {file_name}")
+            if added_paths_length > 0:
+                paths.update((path_id, path) for path_id, path in json.loads(file.read(added_paths_length)))
+            columns_length = count * (2 + 8 + 1 + 8)
+            if (start_time is not None and chunk_end < start_time) or (end_time is not None and chunk_start > end_time):
+                file.seek(columns_length + strings_length, os.SEEK_CUR)
+                continue
+            path_ids = np.frombuffer(file.read(count * 2), dtype="<u2")
+            timestamps = np.frombuffer(file.read(count * 8), dtype="<f8")
+            value_types = np.frombuffer(file.read(count), dtype="u1")
+            numbers = np.frombuffer(file.read(count * 8), dtype="<f8")
+            integers = numbers.view("<i8")
+            strings = json.loads(file.read(strings_length)) if strings_length > 0 else []
+            for position in range(count):
+                timestamp = float(timestamps[position])
+                if (start_time is None or timestamp >= start_time) and (end_time is None or timestamp <= end_time):
+                    value = _decode_value(value_types[position], numbers[position], integers[position], strings)
+                    yield paths[int(path_ids[position])], timestamp, value
+
+
+def _decode_value(value_type: int, number: float, integer: int, strings: List[str]) -> Any:
+    if value_type == ValueType.FLOAT:
+        return float(number)
+    if value_type == ValueType.INT:
+        return int(integer)
+    if value_type == ValueType.BOOL:
+        return bool(integer)
+    if value_type == ValueType.STRING:
+        return strings[integer]
+    return json.loads(strings[integer])
+
+
+class _IndexedRecording:
+    """
+    Memory mapped recording file, queried by means of its block index.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        # The block index is read before the index file and the recording file is mapped after both,
+        # so the blocks of a recording file that is still being written refer to mapped chunks only
+        blocks_file_name = file_name + BLOCKS_SUFFIX
+        with open(blocks_file_name, "rb") as blocks_file:
+            blocks_data = blocks_file.read()
+        with open(file_name + INDEX_SUFFIX, encoding="utf-8") as index_file:
+            index = json.load(index_file)
+        self._path_ids: Dict[str, int] = {path: path_id for path_id, path in enumerate(index["paths"])}
+        blocks = np.frombuffer(blocks_data, dtype=_BLOCK, count=len(blocks_data) // _BLOCK.itemsize)
+        if not index.get("sealed", False):
+            blocks = blocks[np.lexsort((blocks["start"], blocks["path"]))]
+        self._blocks = blocks
+        self.start_time = float(blocks["start"].min()) if len(blocks) > 0 else None
+        self.end_time = float(blocks["end"].max()) if len(blocks) > 0 else None
+        with open(file_name, "rb") as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        self._data.close()
+
+    def _path_blocks(self, vss_name: str) -> Tuple[int, np.ndarray]:
+        # The blocks of a path, ordered by their start time
+        path_id = self._path_ids.get(vss_name)
+        if path_id is None:
+            return -1, self._blocks[:0]
+        first = np.searchsorted(self._blocks["path"], path_id, side="left")
+        last = np.searchsorted(self._blocks["path"], path_id, side="right")
+        return path_id, self._blocks[first:last]
+
+    def _read_block(self, path_id: int, offset: int, start_time: Optional[float],
+                    end_time: Optional[float]) -> List[Tuple[float, Any]]:
+        _, count, _, _, added_paths_length, strings_length = _CHUNK_HEADER.unpack_from(self._data, offset)
+        columns = offset + _CHUNK_HEADER.size + added_paths_length
+        path_ids = np.frombuffer(self._data, dtype="<u2", count=count, offset=columns)
+        timestamps = np.frombuffer(self._data, dtype="<f8", count=count, offset=columns + count * 2)
+        selected = path_ids == path_id
+        if start_time is not None:
+            selected &= timestamps >= start_time
+        if end_time is not None:
+            selected &= timestamps <= end_time
+        positions = np.flatnonzero(selected)
+        if len(positions) == 0:
+            return []
+        value_types = np.frombuffer(self._data, dtype="u1", count=count, offset=columns + count * 10)[positions]
+        numbers = np.frombuffer(self._data, dtype="<f8", count=count, offset=columns + count * 11)[positions]
+        integers = numbers.view("<i8")
+        strings: List[str] = []
+        if np.any(value_types >= ValueType.STRING):
+            strings_offset = columns + count * (2 + 8 + 1 + 8)
+            strings = json.loads(self._data[strings_offset:strings_offset + strings_length])
+        return [
+            (float(timestamp), _decode_value(value_type, number, integer, strings))
+            for timestamp, value_type, number, integer
+            in zip(timestamps[positions], value_types, numbers, integers)
+        ]
+
+    def query(self, vss_name: str, start_time: Optional[float], end_time: Optional[float]) -> List[Tuple[float, Any]]:
+        path_id, blocks = self._path_blocks(vss_name)
+        if end_time is not None:
+            blocks = blocks[:np.searchsorted(blocks["start"], end_time, side="right")]
+        if start_time is not None:
+            blocks = blocks[blocks["end"] >= start_time]
+        values: List[Tuple[float, Any]] = []
+        for offset in blocks["offset"]:
+            values.extend(self._read_block(path_id, int(offset), start_time, end_time))
+        values.sort(key=lambda value: value[0])
+        return values
+
+    def last_value(self, vss_name: str, before: Optional[float]) -> Optional[Tuple[float, Any]]:
+        path_id, blocks = self._path_blocks(vss_name)
+        if before is not None:
+            blocks = blocks[:np.searchsorted(blocks["start"], before, side="right")]
+        last: Optional[Tuple[float, Any]] = None
+        # Blocks that end before the latest value found so far cannot contain a later value
+        for block in blocks[np.argsort(blocks["end"], kind="stable")[::-1]]:
+            if last is not None and block["end"] < last[0]:
+                break
+            for value in self._read_block(path_id, int(block["offset"]), None, before):
+                if last is None or value[0] >= last[0]:
+                    last = value
+        return last
+
+
+class RecordingStore:
+    """
+    Queries the values of a VSS Data Entry recorded in the recording files of a directory.
+
+    The recording files are memory mapped and only the chunks which contain values of the
+    queried VSS Data Entry in the queried time range are read. These are found by binary
+    search in the block index of each recording file, so that the effort of a query does
+    not depend on the size of the recording files. Recording files that are still being
+    written can be queried as well, including the chunks written until the store has been created.
+    """
+
+    def __init__(self, directory: str):
+        self._recordings: List[_IndexedRecording] = []
+        for file_name in sorted(glob.glob(os.path.join(directory, "*" + RECORDING_SUFFIX))):
+            if not os.path.exists(file_name + BLOCKS_SUFFIX) or not os.path.exists(file_name + INDEX_SUFFIX):
+                log.warning("Ignoring recording file %s without index", file_name)
+                continue
+            self._recordings.append(_IndexedRecording(file_name))
+
+    def close(self):
+        """Unmap the recording files."""
+        for recording in self._recordings:
+            recording.close()
+        self._recordings = []
+
+    def __enter__(self) -> "RecordingStore":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def query(self, vss_name: str, start_time: Optional[float] = None,
+              end_time: Optional[float] = None) -> Iterator[Tuple[float, Any]]:
+        """
+        Get the values recorded for a VSS Data Entry as (timestamp, value) tuples ordered by timestamp,
+        optionally limited to a time range (including start and end time).
+        """
+        for recording in self._recordings:
+            if recording.start_time is None:
+                continue
+            if (start_time is not None and recording.end_time < start_time) or \
+                    (end_time is not None and recording.start_time > end_time):
+                continue
+            yield from recording.query(vss_name, start_time, end_time)
+
+    def last_value(self, vss_name: str, before: Optional[float] = None) -> Optional[Tuple[float, Any]]:
+        """
+        Get the latest value recorded for a VSS Data Entry as (timestamp, value) tuple,
+        optionally the latest value recorded at or before the given time.
+        Returns None if there is no such value.
+        """
+        last: Optional[Tuple[float, Any]] = None
+        for recording in reversed(self._recordings):
+            if recording.start_time is None or (before is not None and recording.start_time > before):
+                continue
+            if last is not None and recording.end_time < last[0]:
+                break
+            value = recording.last_value(vss_name, before)
+            if value is not None and (last is None or value[0] > last[0]):
+                last = value
+        return last
@@ -14,15 +14,24 @@
 #################################################################################
 
 import logging
-from typing import Any, List
+from typing import Any, Dict, List, Optional, Tuple
 import json
+import queue
+import threading
+import time
 
 from kuksa_client import KuksaClientThread  # type: ignore[import]
 
 from dbcfeederlib import clientwrapper
+from dbcfeederlib import valueconverter
 
 log = logging.getLogger(__name__)
 
+DEFAULT_MAX_IN_FLIGHT = 1
+
+# Time (in seconds) to wait for the response to a set request
+_RESPONSE_TIMEOUT = 5.0
+
 
 class ServerClientWrapper(clientwrapper.ClientWrapper):
     def __init__(self, ip: str = "localhost", port: int = 8090,
@@ -41,6 +50,22 @@ class ServerClientWrapper(clientwrapper.ClientWrapper):
         # Set read-only configs, others to be set just before we use config as they may change
         self._client_config["protocol"] = "ws"
         self._kuksa = None
+        # functions formatting the values of the VSS Data Entries according to their data types
+        self._text_converters: Dict[str, valueconverter.Converter] = {}
+        self._max_in_flight = DEFAULT_MAX_IN_FLIGHT
+        # Pipelined set requests waiting for a response by request ID, guarded by the lock
+        self._lock = threading.Lock()
+        self._pending_requests: Dict[str, Tuple[str, str, float]] = {}
+        self._responses: queue.Queue = queue.Queue()
+        self._window = threading.BoundedSemaphore(DEFAULT_MAX_IN_FLIGHT)
+        self._collector = None
+        self._collecting = False
+        self._request_counter = 0
+        self._max_in_flight_seen = 0
+        self._requests_sent = 0
+        self._values_failed = 0
+        self._total_rtt = 0.0
+        self._max_rtt = 0.0
 
     def _do_init(self):
         log.debug("No additional initialization necessary for KUKSA.val server")
@@ -67,6 +92,29 @@ class ServerClientWrapper(clientwrapper.ClientWrapper):
         self._kuksa.start()
         self._kuksa.authorize(token_or_tokenfile=self._token_path)
 
+        if self._max_in_flight > 1:
+            self._collecting = True
+            self._collector = threading.Thread(target=self._run_collector, name="kuksa-val-server-responses",
+                                               daemon=True)
+            self._collector.start()
+
+    def set_max_in_flight(self, max_requests: int):
+        """
+        Send set requests without waiting for their responses, keeping up to max_requests
+        requests in flight. Sending a value blocks while max_requests requests are in flight.
+        A maximum of 1 sends values synchronously.
+        """
+        if max_requests < 1:
+            raise ValueError("Maximum number of requests in flight must be at least 1")
+        self._max_in_flight = max_requests
+        self._window = threading.BoundedSemaphore(max_requests)
+        log.info("Using up to %d requests in flight", max_requests)
+
+    def set_data_types(self, data_types: Dict[str, str]):
+        super().set_data_types(data_types)
+        self._text_converters = {name: valueconverter.create_text_converter(data_type)
+                                 for name, data_type in data_types.items()}
+
     def is_connected(self) -> bool:
         # This one is quite unreliable, see https://github.com/eclipse/kuksa.val/issues/523
         if self._kuksa is None:
@@ -87,33 +135,167 @@ class ServerClientWrapper(clientwrapper.ClientWrapper):
         log.debug("Signal %s registration information: %s", vss_name, resp)
         return True
 
-    def update_datapoint(self, name: str, value: Any) -> bool:
+    def update_datapoint(self, name: str, value: Any, timestamp: Optional[float] = None) -> bool:
         """
         Update datapoint.
         Supported format for value is still a bit unclear/undefined.
         Like an a bool VSS signal both be fed as a Python bool and a string representing json true/false value
         (possibly with correct case)
         """
+        return self._update_datapoint(name, value, True)
+
+    def update_datapoint_sync(self, name: str, value: Any, timestamp: Optional[float] = None) -> bool:
+        return self._update_datapoint(name, value, False)
+
+    def _update_datapoint(self, name: str, value: Any, pipelined: bool) -> bool:
         if self._kuksa is None:
             log.error("update_datapoint called before client has been started")
             return False
         success = True
-        if isinstance(value, bool):
+        text_converter = self._text_converters.get(name)
+        if text_converter is not None:
+            try:
+                send_value = text_converter(value)
+            except (ValueError, TypeError, OverflowError):
+                log.error("Cannot convert value %s for %s to %s", value, name, self._data_types[name])
+                return False
+        elif isinstance(value, bool):
             # For bool KUKSA server expects lower case (true/false) rather than Python case (True/False)
             send_value = json.dumps(value)
         else:
             send_value = str(value)
+
+        if pipelined and self._collecting and self._kuksa.backend.subprotocol != "VISSv2":
+            return self._send_pipelined(name, send_value)
+
+        start = time.perf_counter()
         tmp_text = self._kuksa.setValue(name, send_value)
+        rtt = time.perf_counter() - start
         log.debug(f"Got setValue response for {name}:{send_value}:{tmp_text}")
         resp = json.loads(tmp_text)
         if "error" in resp:
             log.error(f"Error sending {name} to kuksa-val-server: {resp['error']}")
             success = False
+        with self._lock:
+            self._count_response(success, rtt)
 
         return success
 
+    def _count_response(self, success: bool, rtt: float):
+        # Must be invoked with the lock being held
+        if success:
+            self._requests_sent += 1
+            self._total_rtt += rtt
+            self._max_rtt = max(self._max_rtt, rtt)
+        else:
+            self._values_failed += 1
+
+    @staticmethod
+    def _request_value(send_value: str) -> Any:
+        # Same representation of the value as used by KuksaClientThread.setValue
+        try:
+            json_value = json.loads(send_value)
+        except ValueError:
+            return send_value
+        if isinstance(json_value, list):
+            return [str(item) for item in json_value]
+        return send_value
+
+    def _send_pipelined(self, name: str, send_value: str) -> bool:
+        # Send a set request without waiting for the response, which is handled by the collector thread.
+        # The requests are put into the send queue of the client's websocket connection directly,
+        # registering the common response queue for their request IDs.
+        if send_value == "nan":
+            # rejected by KuksaClientThread.setValue as well
+            log.error("Error sending %s to kuksa-val-server: invalid value %s", name, send_value)
+            with self._lock:
+                self._count_response(False, 0.0)
+            return False
+        self._window.acquire()
+        backend = self._kuksa.backend  # type: ignore[union-attr]
+        with self._lock:
+            self._request_counter += 1
+            request_id = f"dbcfeeder-{self._request_counter}"
+            self._pending_requests[request_id] = (name, send_value, time.perf_counter())
+            self._max_in_flight_seen = max(self._max_in_flight_seen, len(self._pending_requests))
+        request = {
+            "action": "set",
+            "path": name,
+            "attribute": "value",
+            "value": self._request_value(send_value),
+            "requestId": request_id,
+        }
+        backend.recvMsgQueues[request_id] = self._responses
+        backend.sendMsgQueue.put(json.dumps(request))
+        return True
+
+    def _request_completed(self, request_id: str, error: Any):
+        with self._lock:
+            request = self._pending_requests.pop(request_id, None)
+            if request is None:
+                # not sent by us or already timed out
+                return
+            name, send_value, sent_time = request
+            self._count_response(error is None, time.perf_counter() - sent_time)
+        if error is not None:
+            log.error("Error sending %s for %s to kuksa-val-server: %s", send_value, name, error)
+        self._window.release()
+
+    def _expire_requests(self):
+        deadline = time.perf_counter() - _RESPONSE_TIMEOUT
+        with self._lock:
+            expired = [request_id for request_id, (_, _, sent_time) in self._pending_requests.items()
+                       if sent_time < deadline]
+        for request_id in expired:
+            if self._kuksa is not None:
+                self._kuksa.backend.recvMsgQueues.pop(request_id, None)
+            self._request_completed(request_id, "timeout")
+
+    def _run_collector(self):
+        log.info("Starting to process responses from kuksa-val-server")
+        last_expiry_check = time.perf_counter()
+        while self._collecting:
+            try:
+                response = json.loads(self._responses.get(timeout=0.1))
+                self._request_completed(response.get("requestId"), response.get("error"))
+            except queue.Empty:
+                pass
+            except ValueError:
+                log.error("Invalid response from kuksa-val-server", exc_info=True)
+            if time.perf_counter() - last_expiry_check >= 0.1:
+                self._expire_requests()
+                last_expiry_check = time.perf_counter()
+        log.info("Stopped processing responses from kuksa-val-server")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about the set requests sent to the server:
+
+        * requests: the number of successful set requests
+        * failed_values: the number of values rejected by the server or not answered in time
+        * mean_rtt/max_rtt: the mean/maximum time (in seconds) until a request has been answered
+        * in_flight/max_in_flight: the current/maximum number of requests waiting for a response
+        """
+        with self._lock:
+            return {
+                "requests": self._requests_sent,
+                "failed_values": self._values_failed,
+                "mean_rtt": self._total_rtt / self._requests_sent if self._requests_sent > 0 else 0.0,
+                "max_rtt": self._max_rtt,
+                "in_flight": len(self._pending_requests),
+                "max_in_flight": self._max_in_flight_seen
+            }
+
     def stop(self):
         log.info("Stopping server client")
+        if self._collector is not None:
+            # wait for the responses to the requests in flight
+            deadline = time.perf_counter() + _RESPONSE_TIMEOUT
+            while self._pending_requests and time.perf_counter() < deadline:
+                time.sleep(0.01)
+            self._collecting = False
+            self._collector.join()
+            self._collector = None
         if self._kuksa is not None:
             self._kuksa.stop()
             self._kuksa = None
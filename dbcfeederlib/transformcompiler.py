@@ -0,0 +1,425 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+"""
+Compilation of the transformations that can be defined in a mapping
+into plain Python callables.
+
+Transformations are compiled once when the mapping definitions are read,
+so that transforming a CAN signal value does not require parsing or
+interpreting the transformation definition again.
+
+Transformations can also be applied to NumPy arrays of raw values at once
+for processing recorded CAN traffic.
+"""
+
+import functools
+import logging
+import operator
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from cantools.database.can.signal import NamedSignalValue  # type: ignore[import]
+from py_expression_eval import Parser  # type: ignore[import]
+from py_expression_eval import TNUMBER, TOP1, TOP2, TVAR, TFUNCALL  # type: ignore[import]
+
+log = logging.getLogger(__name__)
+
+# The name of the variable that the raw value is bound to in "math" expressions
+MATH_VARIABLE = "x"
+
+_parser = Parser()
+
+# py_expression_eval implements most of its operators as (slow) bound methods,
+# use the equivalent functions from the operator module instead
+_FAST_OPS2 = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "%": operator.mod,
+    "^": operator.pow,
+    "**": operator.pow,
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+_FAST_OPS1 = {
+    "-": operator.neg,
+    "not": operator.not_,
+}
+
+# Operators and functions that must not be evaluated at compile time
+_NON_DETERMINISTIC = frozenset(["random", "d"])
+
+# Operators that can be applied to arrays of floats using NumPy. In contrast to
+# other operators, they behave exactly like their Python counterparts for floats,
+# except for division by zero which raises an error in Python.
+_NUMPY_OPS2 = {
+    "+": np.add,
+    "-": np.subtract,
+    "*": np.multiply,
+    "/": np.true_divide,
+}
+
+# Kinds of NumPy arrays whose elements can be used as dict keys and can be sorted
+_UNIQUE_KINDS = frozenset("biufU")
+
+_VARIABLE = object()
+
+
+class _Node(NamedTuple):
+    """A compiled (sub-)expression."""
+
+    evaluate: Callable[[Any], Any]
+    # the value of the (sub-)expression if it does not depend on the raw value
+    constant: Any = _VARIABLE
+    # the items of an argument list built using the "," operator
+    items: Optional[Tuple["_Node", ...]] = None
+
+    def is_constant(self) -> bool:
+        return self.constant is not _VARIABLE
+
+
+def _constant(value: Any) -> _Node:
+    return _Node(lambda _: value, value)
+
+
+def _unary(func: Callable[[Any], Any], operand: _Node, foldable: bool) -> _Node:
+    if foldable and operand.is_constant():
+        return _constant(func(operand.constant))
+    arg = operand.evaluate
+    return _Node(lambda x: func(arg(x)))
+
+
+def _binary(func: Callable[[Any, Any], Any], left: _Node, right: _Node, foldable: bool) -> _Node:
+    if left.is_constant():
+        if right.is_constant():
+            if foldable:
+                return _constant(func(left.constant, right.constant))
+            lconst = left.constant
+            rconst = right.constant
+            return _Node(lambda _: func(lconst, rconst))
+        lconst = left.constant
+        rarg = right.evaluate
+        return _Node(lambda x: func(lconst, rarg(x)))
+    larg = left.evaluate
+    if right.is_constant():
+        rconst = right.constant
+        return _Node(lambda x: func(larg(x), rconst))
+    rarg = right.evaluate
+    return _Node(lambda x: func(larg(x), rarg(x)))
+
+
+def _argument_list(left: _Node, right: _Node) -> _Node:
+    items = (*(left.items or (left,)), right)
+    evaluators = [item.evaluate for item in items]
+    # like py_expression_eval a stand-alone argument list evaluates to a list
+    return _Node(lambda x: [arg(x) for arg in evaluators], items=items)
+
+
+def _call(func: Callable[..., Any], arguments: _Node, foldable: bool) -> _Node:
+    items = arguments.items or (arguments,)
+    if foldable and all(item.is_constant() for item in items):
+        return _constant(func(*[item.constant for item in items]))
+    if len(items) == 1:
+        return _unary(func, items[0], False)
+    if len(items) == 2:
+        return _binary(func, items[0], items[1], False)
+    evaluators = [item.evaluate for item in items]
+    return _Node(lambda x: func(*[arg(x) for arg in evaluators]))
+
+
+@functools.lru_cache(maxsize=None)
+def compile_math(expression: str) -> Callable[[Any], Any]:
+    """
+    Compile a "math" transformation expression into a callable.
+
+    The returned callable takes the raw value as its only argument and returns
+    the result of the expression with the raw value bound to "x".
+
+    The expression is parsed using py_expression_eval's grammar and the resulting
+    token stream is translated into nested closures. Sub-expressions that do not
+    depend on "x" are evaluated at compile time.
+
+    Compiled expressions are cached, so mappings sharing the same expression
+    also share the same callable.
+
+    Raises ValueError if the expression is invalid.
+    """
+    try:
+        parsed = _parser.parse(expression)
+    except Exception as error:
+        raise ValueError(f"Cannot parse math expression \"{expression}\": {error}") from error
+
+    stack: List[_Node] = []
+    try:
+        for token in parsed.tokens:
+            if token.type_ == TNUMBER:
+                stack.append(_constant(token.number_))
+            elif token.type_ == TVAR:
+                if token.index_ == MATH_VARIABLE:
+                    stack.append(_Node(lambda x: x))
+                elif token.index_ in parsed.functions:
+                    stack.append(_constant(parsed.functions[token.index_]))
+                else:
+                    raise ValueError(f"Unknown variable \"{token.index_}\" in math expression \"{expression}\"")
+            elif token.type_ == TOP1:
+                operand = stack.pop()
+                func = _FAST_OPS1.get(token.index_, parsed.ops1[token.index_])
+                stack.append(_unary(func, operand, token.index_ not in _NON_DETERMINISTIC))
+            elif token.type_ == TOP2:
+                right = stack.pop()
+                left = stack.pop()
+                if token.index_ == ",":
+                    stack.append(_argument_list(left, right))
+                else:
+                    func = _FAST_OPS2.get(token.index_, parsed.ops2[token.index_])
+                    stack.append(_binary(func, left, right, token.index_ not in _NON_DETERMINISTIC))
+            elif token.type_ == TFUNCALL:
+                arguments = stack.pop()
+                function = stack.pop()
+                if not function.is_constant() or not callable(function.constant):
+                    raise ValueError(f"Math expression \"{expression}\" calls something that is not a function")
+                foldable = all(function.constant is not parsed.functions[name] for name in _NON_DETERMINISTIC
+                               if name in parsed.functions)
+                stack.append(_call(function.constant, arguments, foldable))
+            else:
+                raise ValueError(f"Invalid token in math expression \"{expression}\"")
+    except (IndexError, KeyError) as error:
+        raise ValueError(f"Invalid math expression \"{expression}\"") from error
+    except ValueError:
+        raise
+    except Exception as error:
+        # evaluation of a constant sub-expression failed, e.g. division by zero
+        raise ValueError(f"Cannot evaluate math expression \"{expression}\": {error}") from error
+
+    if len(stack) != 1:
+        raise ValueError(f"Invalid math expression \"{expression}\"")
+    log.debug("Compiled math expression \"%s\"", expression)
+    return stack[0].evaluate
+
+
+def compile_mapping(items: List[Dict[str, Any]]) -> Callable[[Any], Any]:
+    """
+    Compile a "mapping" transformation into a callable.
+
+    The returned callable takes the raw value as its only argument and returns the
+    "to" value of the item whose "from" value matches the raw value, or None if no
+    item matches. The items are put into a dict so that a lookup takes constant time
+    regardless of the number of items.
+
+    Raw values are matched using the following rules:
+
+    * Numbers and booleans are matched by value, i.e. 1, 1.0 and true are the same key.
+    * Strings are matched as is, no conversion between strings and numbers is done.
+    * A NamedSignalValue is matched by its name first and by its numeric value second.
+
+    If multiple items use the same "from" value, the first one is used.
+
+    Raises ValueError if an item's "from" value cannot be used as a lookup key.
+    """
+    table: Dict[Any, Any] = {}
+    for item in items:
+        from_value = item["from"]
+        try:
+            if from_value in table:
+                log.warning("Ignoring duplicate mapping of value %s to %s", from_value, item["to"])
+                continue
+        except TypeError as error:
+            raise ValueError(f"Value {from_value} of type {type(from_value).__name__} cannot be mapped") from error
+        table[from_value] = item["to"]
+
+    lookup = table.get
+
+    def transform(value: Any) -> Any:
+        if isinstance(value, NamedSignalValue):
+            result = lookup(value.name)
+            if result is None:
+                result = lookup(value.value)
+            return result
+        try:
+            return lookup(value)
+        except TypeError:
+            # raw value is not hashable and therefore cannot be mapped
+            return None
+
+    return transform
+
+
+# A batch transformation takes an array of raw values and returns an array (of dtype object)
+# with the transformed values along with a mask of the values that could not be transformed
+BatchTransform = Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]
+
+
+def _apply_elementwise(transform: Callable[[Any], Any], values: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    results = np.empty(len(values), dtype=object)
+    failed = np.zeros(len(values), dtype=bool)
+    for index, value in enumerate(values):
+        try:
+            results[index] = transform(value)
+        except Exception:
+            failed[index] = True
+    return results, failed
+
+
+def apply_batch(transform: Callable[[Any], Any], values: np.ndarray,
+                deterministic: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Apply a transformation to all elements of a one-dimensional array.
+
+    If the transformation is deterministic and the array contains numbers, booleans
+    or strings, the transformation is evaluated only once per distinct value.
+
+    Returns an array of dtype object with the transformed values along with a boolean
+    array which marks the elements for which the transformation raised an error.
+    These elements are set to None.
+    """
+    if deterministic and values.dtype.kind in _UNIQUE_KINDS:
+        uniques, inverse = np.unique(values, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        results, failed = _apply_elementwise(transform, uniques.tolist())
+        return results[inverse], failed[inverse]
+    return _apply_elementwise(transform, values.tolist())
+
+
+def _numpy_constant(value: Any) -> Optional[Tuple[str, Any]]:
+    # Python converts large ints to float differently than NumPy does
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if isinstance(value, int) and abs(value) >= 2**53:
+        return None
+    return ("constant", value)
+
+
+def _compile_numpy(expression: str) -> Optional[Callable[[np.ndarray, np.ndarray], Any]]:
+    """
+    Compile a "math" expression into a function that evaluates it for an array of floats.
+
+    The function takes the array of raw values and a boolean array that it marks the elements
+    in for which the expression cannot be evaluated, i.e. those that cause a division by zero.
+
+    Returns None if the expression uses operators or functions that may produce different
+    results when applied by NumPy.
+    """
+    parsed = _parser.parse(expression)
+    stack: List[Tuple[str, Any]] = []
+    for token in parsed.tokens:
+        if token.type_ == TNUMBER:
+            node = _numpy_constant(token.number_)
+            if node is None:
+                return None
+            stack.append(node)
+        elif token.type_ == TVAR and token.index_ == MATH_VARIABLE:
+            stack.append(("array", lambda x, invalid: x))
+        elif token.type_ == TOP1 and token.index_ == "-":
+            kind, operand = stack.pop()
+            if kind == "constant":
+                stack.append(("constant", -operand))
+            else:
+                stack.append(("array", lambda x, invalid, arg=operand: np.negative(arg(x, invalid))))
+        elif token.type_ == TOP2 and token.index_ in _NUMPY_OPS2:
+            right = stack.pop()
+            left = stack.pop()
+            if left[0] == "constant" and right[0] == "constant":
+                # constant sub-expressions have been evaluated when compiling the expression
+                # for single values, so division by zero is not possible here
+                stack.append(("constant", _FAST_OPS2[token.index_](left[1], right[1])))
+                continue
+            stack.append(("array", _numpy_binary(token.index_, left, right)))
+        else:
+            return None
+
+    kind, root = stack.pop()
+    if kind == "constant":
+        return lambda x, invalid: np.full(x.shape, root, dtype=object)
+    return root
+
+
+def _numpy_binary(operator_name: str, left: Tuple[str, Any], right: Tuple[str, Any]) -> Callable[..., Any]:
+    func = _NUMPY_OPS2[operator_name]
+
+    def operand(node: Tuple[str, Any]) -> Callable[[np.ndarray, np.ndarray], Any]:
+        if node[0] == "constant":
+            return lambda x, invalid: node[1]
+        return node[1]
+
+    larg = operand(left)
+    rarg = operand(right)
+    if operator_name == "/":
+        def divide(x: np.ndarray, invalid: np.ndarray) -> Any:
+            divisor = rarg(x, invalid)
+            invalid |= np.equal(divisor, 0)
+            return func(larg(x, invalid), divisor)
+        return divide
+    return lambda x, invalid: func(larg(x, invalid), rarg(x, invalid))
+
+
+@functools.lru_cache(maxsize=None)
+def compile_math_batch(expression: str) -> BatchTransform:
+    """
+    Compile a "math" transformation expression into a function that transforms
+    a one-dimensional array of raw values at once.
+
+    Each element of the resulting array is the same as the result of the function returned
+    by compile_math() for the corresponding raw value, or None if that function raises an error.
+
+    Expressions that only consist of additions, subtractions, multiplications and divisions
+    are evaluated using NumPy for arrays of floats. All other expressions are evaluated
+    once per distinct raw value, unless they make use of random numbers.
+
+    Raises ValueError if the expression is invalid.
+    """
+    scalar = compile_math(expression)
+    vectorized = _compile_numpy(expression)
+    tokens = _parser.parse(expression).tokens
+    deterministic = not any(token.type_ in (TOP1, TOP2, TVAR) and token.index_ in _NON_DETERMINISTIC
+                            for token in tokens)
+
+    def transform(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if vectorized is not None and values.dtype.kind == "f":
+            x = values.astype(np.float64)
+            failed = np.zeros(x.shape, dtype=bool)
+            with np.errstate(all="ignore"):
+                calculated = np.broadcast_to(vectorized(x, failed), x.shape)
+            # converts the elements to Python floats, just like the ones calculated for single values
+            results = calculated.astype(object)
+            results[failed] = None
+            return results, failed
+        return apply_batch(scalar, values, deterministic)
+
+    return transform
+
+
+def compile_mapping_batch(items: List[Dict[str, Any]]) -> BatchTransform:
+    """
+    Compile a "mapping" transformation into a function that transforms a
+    one-dimensional array of raw values at once.
+
+    Each element of the resulting array is the same as the result of the function
+    returned by compile_mapping() for the corresponding raw value.
+    """
+    scalar = compile_mapping(items)
+    return lambda values: apply_batch(scalar, values)
@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+"""
+Conversion of VSS values to the data type of their VSS Data Entry.
+"""
+
+import json
+import logging
+
+from typing import Any, Callable
+
+log = logging.getLogger(__name__)
+
+Converter = Callable[[Any], Any]
+
+_INTEGER_RANGES = {
+    "int8": (-2**7, 2**7 - 1),
+    "int16": (-2**15, 2**15 - 1),
+    "int32": (-2**31, 2**31 - 1),
+    "int64": (-2**63, 2**63 - 1),
+    "uint8": (0, 2**8 - 1),
+    "uint16": (0, 2**16 - 1),
+    "uint32": (0, 2**32 - 1),
+    "uint64": (0, 2**64 - 1),
+}
+
+# string values that are converted to False, like kuksa-client does
+_FALSE_STRINGS = {"False", "false", "F", "f", "0", ""}
+
+
+def _create_integer_converter(minimum: int, maximum: int) -> Converter:
+    def convert(value: Any) -> int:
+        if isinstance(value, str):
+            value = float(value)
+        return min(max(int(round(value)), minimum), maximum)
+    return convert
+
+
+def _to_float(value: Any) -> float:
+    return float(value)
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip() not in _FALSE_STRINGS
+    return bool(value)
+
+
+def _to_str(value: Any) -> str:
+    return value if isinstance(value, str) else str(value)
+
+
+def _unchanged(value: Any) -> Any:
+    return value
+
+
+def _create_array_converter(convert_item: Converter) -> Converter:
+    # kuksa-client parses array values from their string representation
+    def convert(values: Any) -> str:
+        if isinstance(values, str):
+            return values
+        return "[" + ", ".join(json.dumps(convert_item(value)) for value in values) + "]"
+    return convert
+
+
+def _create_scalar_converter(datatype: str) -> Converter:
+    if datatype in _INTEGER_RANGES:
+        return _create_integer_converter(*_INTEGER_RANGES[datatype])
+    if datatype in ("float", "double"):
+        return _to_float
+    if datatype == "boolean":
+        return _to_bool
+    if datatype == "string":
+        return _to_str
+    log.debug("No conversion for VSS data type %s", datatype)
+    return _unchanged
+
+
+def create_converter(datatype: str) -> Converter:
+    """
+    Create a function converting a value to the given VSS data type, e.g. "uint8" or "float[]".
+
+    Integer values are rounded and clamped to the range of the data type, numeric strings are parsed.
+    Boolean strings are interpreted like kuksa-client does. Arrays are converted to the
+    string representation that kuksa-client expects. Values of unknown data types are not converted.
+    The function raises a ValueError or TypeError if a value cannot be converted.
+    """
+    datatype = datatype.lower()
+    if datatype.endswith("[]"):
+        return _create_array_converter(_create_scalar_converter(datatype[:-2]))
+    return _create_scalar_converter(datatype)
+
+
+def create_text_converter(datatype: str) -> Converter:
+    """
+    Create a function converting a value to the given VSS data type and formatting it as text,
+    as expected by KUKSA.val server, e.g. "true" for a boolean value.
+    """
+    convert = create_converter(datatype)
+    if datatype.lower() == "boolean":
+        return lambda value: json.dumps(convert(value))
+    return lambda value: _to_str(convert(value))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+########################################################################
+# Copyright (c) 2023 Contributors to the Eclipse Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+########################################################################
+
+"""
+Query the VSS Data Entry values recorded by the feeder (see --record-dir)
+"""
+
+import argparse
+import datetime
+import logging
+import sys
+
+from typing import Optional
+
+from dbcfeederlib import outputwriter
+from dbcfeederlib.recorder import RecordingStore
+
+log = logging.getLogger("query_recording")
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    # Seconds since the epoch or an ISO 8601 date and time
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def _get_command_line_args_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Query VSS Data Entry values recorded by the feeder")
+    parser.add_argument("directory", metavar="DIRECTORY", help="The directory containing the recording files")
+    parser.add_argument("path", metavar="PATH", nargs="+", help="The VSS Data Entries to query, e.g. Vehicle.Speed")
+    parser.add_argument(
+        "--start",
+        metavar="TIME",
+        help="Only values recorded at or after this time (seconds since the epoch or ISO 8601)",
+    )
+    parser.add_argument(
+        "--end",
+        metavar="TIME",
+        help="Only values recorded at or before this time (seconds since the epoch or ISO 8601)",
+    )
+    parser.add_argument(
+        "--last",
+        action="store_true",
+        help="Only the latest value recorded (at or before the end time, if given)",
+    )
+    parser.add_argument(
+        "--output-format",
+        help="How to write the values",
+        choices=[output_format.value for output_format in outputwriter.OutputFormat],
+        default=outputwriter.OutputFormat.TEXT.value
+    )
+    return parser
+
+
+def main(argv) -> int:
+    parser = _get_command_line_args_parser()
+    args = parser.parse_args(argv[1:])
+    try:
+        start_time = _parse_time(args.start)
+        end_time = _parse_time(args.end)
+    except ValueError as e:
+        parser.error(f"Invalid time: {e}")
+
+    output = outputwriter.OutputWriter(output_format=outputwriter.OutputFormat(args.output_format), block=True)
+    output.start()
+    try:
+        with RecordingStore(args.directory) as store:
+            for vss_name in args.path:
+                if args.last:
+                    last = store.last_value(vss_name, before=end_time)
+                    if last is not None:
+                        output.write(vss_name, last[1], last[0])
+                else:
+                    for timestamp, value in store.query(vss_name, start_time, end_time):
+                        output.write(vss_name, value, timestamp)
+    finally:
+        output.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main(sys.argv))
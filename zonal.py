@@ -23,12 +23,16 @@ import time
 from signal import SIGINT, SIGTERM, signal
 from typing import Any, Dict, List, Optional
 
+from dbcfeederlib.bulkconverter import BulkConverter
 from dbcfeederlib.canclient import CANClient
 from dbcfeederlib.canreader import CanReader
 from dbcfeederlib import dbc2vssmapper
 from dbcfeederlib import dbcreader
 from dbcfeederlib import j1939reader
+from dbcfeederlib import observationqueue
 from dbcfeederlib import elm2canbridge
+from dbcfeederlib import outputwriter
+from dbcfeederlib import recorder
 
 log = logging.getLogger("dbcfeeder")
 
@@ -37,27 +41,57 @@ CONFIG_SECTION_ELMCAN = "elmcan"
 CONFIG_SECTION_GENERAL = "general"
 
 CONFIG_OPTION_CAN_DUMP_FILE = "candumpfile"
+CONFIG_OPTION_COMPILED_PIPELINES = "compiled_pipelines"
 CONFIG_OPTION_DBC_DEFAULT_FILE = "dbc_default_file"
 CONFIG_OPTION_MAPPING = "mapping"
+CONFIG_OPTION_OUTPUT_BUFFER_SIZE = "output_buffer_size"
+CONFIG_OPTION_OUTPUT_COMPRESS = "output_compress"
+CONFIG_OPTION_OUTPUT_FLUSH_INTERVAL = "output_flush_interval"
+CONFIG_OPTION_OUTPUT_FORMAT = "output_format"
+CONFIG_OPTION_OUTPUT_MAX_FILE_SIZE = "output_max_file_size"
+CONFIG_OPTION_OUTPUT_MAX_FILES = "output_max_files"
 CONFIG_OPTION_PORT = "port"
+CONFIG_OPTION_RECORD_DIR = "record_dir"
+CONFIG_OPTION_RECORD_MAX_FILE_SIZE = "record_max_file_size"
+CONFIG_OPTION_QUEUE_MODE = "queue_mode"
+CONFIG_OPTION_QUEUE_OVERFLOW_POLICY = "queue_overflow_policy"
+CONFIG_OPTION_QUEUE_SIZE = "queue_size"
 CONFIG_OPTION_J1939 = "j1939"
 CONFIG_OPTION_PHYSICAL_CAN = "use_physical_can"
 CAN_PORT = "port"
 
+# how often (in seconds) the feeder checks for being stopped if observations are processed inline
+_INLINE_POLL_INTERVAL = 0.1
+
 class Feeder:
 
-    def __init__(self, output_file: Optional[str] = None, dbc2vss: bool = True, vss2dbc: bool = False):
+    def __init__(self, output: Optional[outputwriter.OutputWriter] = None, dbc2vss: bool = True,
+                 vss2dbc: bool = False,
+                 queue_size: int = observationqueue.DEFAULT_QUEUE_SIZE,
+                 queue_overflow_policy: observationqueue.OverflowPolicy = observationqueue.OverflowPolicy.COALESCE,
+                 queue_mode: observationqueue.QueueMode = observationqueue.QueueMode.FIFO):
         self._running: bool = False
         self._reader: Optional[CanReader] = None
         self._mapper: Optional[dbc2vssmapper.Mapper] = None
-        self._dbc2vss_queue: queue.Queue[dbc2vssmapper.VSSObservation] = queue.Queue()
-        self._output_file = output_file
+        self._dbc2vss_queue = observationqueue.create_observation_queue(
+            queue_mode, queue_size, queue_overflow_policy, self._observation_dropped, self._dispatch_observation)
+        self._inline = queue_mode == observationqueue.QueueMode.INLINE
+        self._output = output if output is not None else outputwriter.OutputWriter()
+        self._recorder: Optional[recorder.ColumnarRecorder] = None
+        self._messages_processed = 0
+        self._last_sent_log_entry = 0
         self._elmcan_config: Dict[str, Any] = {}
         self._dbc2vss_enabled = dbc2vss
         self._vss2dbc_enabled = vss2dbc
         self._canclient: Optional[CANClient] = None
         self._transmit: bool = False
 
+    def set_recorder(self, value_recorder: recorder.ColumnarRecorder):
+        """
+        Additionally record the values in files using the given recorder, so they can be queried later.
+        """
+        self._recorder = value_recorder
+
     def start(
         self,
         canport: str,
@@ -68,7 +102,8 @@ class Feeder:
         candumpfile: Optional[str],
         use_j1939: bool = False,
         use_strict_parsing: bool = False,
-        use_physical_can: bool = False
+        use_physical_can: bool = False,
+        use_compiled_pipelines: bool = False
     ):
         self._running = True
         self._mapper = dbc2vssmapper.Mapper(
@@ -76,7 +111,8 @@ class Feeder:
             dbc_file_names=dbc_file_names,
             use_strict_parsing=use_strict_parsing,
             expect_extended_frame_ids=use_j1939,
-            can_signal_default_values_file=dbc_default_file)
+            can_signal_default_values_file=dbc_default_file,
+            use_compiled_pipelines=use_compiled_pipelines)
 
         threads = []
 
@@ -110,9 +146,16 @@ class Feeder:
                     whitelisted_frame_ids.append(filter.can_id)
                 elm2canbridge.elm2canbridge(canport, self._elmcan_config, whitelisted_frame_ids)
 
+            self._output.start()
+            if self._recorder is not None:
+                self._recorder.set_paths(list(self._mapper.get_dbc2vss_entries()))
+                self._recorder.start()
             self._reader.start()
 
-            receiver = threading.Thread(target=self._run_receiver)
+            if self._inline:
+                receiver = threading.Thread(target=self._run_until_stopped)
+            else:
+                receiver = threading.Thread(target=self._run_receiver)
             receiver.start()
             threads.append(receiver)
 
@@ -135,14 +178,59 @@ class Feeder:
     def is_running(self) -> bool:
         return self._running
 
+    def _observation_dropped(self, vss_observation: dbc2vssmapper.VSSObservation):
+        # The reader does not queue unchanged values for "on_change" mappings,
+        # so make sure that the next value is queued again
+        if self._mapper is not None:
+            vss_mapping = self._mapper.get_dbc2vss_mapping(vss_observation.dbc_name, vss_observation.vss_name)
+            if vss_mapping is not None:
+                vss_mapping.last_queued_value = None
+
+    def _dispatch_observation(self, vss_observation: dbc2vssmapper.VSSObservation):
+        # Invoked in the thread of the CAN reader if observations are processed inline,
+        # the values are written by the thread of the output writer
+        self._process_observation(vss_observation)
+
+    def _process_observation(self, vss_observation: dbc2vssmapper.VSSObservation) -> bool:
+        vss_mapping = self._mapper.get_dbc2vss_mapping(vss_observation.dbc_name, vss_observation.vss_name)
+        if vss_observation.transformed:
+            value = vss_observation.vss_value
+        else:
+            value = vss_mapping.transform_value(vss_observation.raw_value)
+        if value is None:
+            log.warning(
+                "Value ignored for dbc %s to VSS %s, from raw value %s of type %s",
+                vss_observation.dbc_name, vss_observation.vss_name, vss_observation.raw_value,
+                type(vss_observation.raw_value)
+            )
+            return False
+        if not vss_mapping.change_condition_fulfilled(value):
+            log.debug("Value condition not fulfilled for VSS %s, value %s", vss_observation.vss_name, value)
+            return False
+        self._output.write(vss_observation.vss_name, value, vss_observation.time)
+        if self._recorder is not None:
+            self._recorder.record(vss_observation.vss_name, value, vss_observation.time)
+        log.debug("Processed DataPoint(%s, %s, %f)", vss_observation.vss_name, value, vss_observation.time)
+        self._messages_processed += 1
+        if self._messages_processed >= (2 * self._last_sent_log_entry):
+            log.info("Processed %d CAN messages", self._messages_processed)
+            log.info("Observation queue: %s", self._dbc2vss_queue.get_statistics())
+            log.info("Output: %s", self._output.get_statistics())
+            if self._reader is not None:
+                log.info("CAN frame processing: %s", self._reader.get_processing_statistics())
+            self._last_sent_log_entry = self._messages_processed
+        return True
+
+    def _run_until_stopped(self):
+        log.info("Starting to process CAN signals")
+        try:
+            while self._running:
+                time.sleep(_INLINE_POLL_INTERVAL)
+        finally:
+            self._stop_output()
+
     def _run_receiver(self):
         processing_started = False
-        messages_processed = 0
-        last_sent_log_entry = 0
-        queue_max_size = 0
-        output = sys.stdout
-        if self._output_file:
-            output = open(self._output_file, 'a', encoding='utf-8')
 
         try:
             while self._running:
@@ -150,37 +238,19 @@ class Feeder:
                     if not processing_started:
                         processing_started = True
                         log.info("Starting to process CAN signals")
-                    queue_size = self._dbc2vss_queue.qsize()
-                    if queue_size > queue_max_size:
-                        queue_max_size = queue_size
                     vss_observation = self._dbc2vss_queue.get(timeout=1)
-                    vss_mapping = self._mapper.get_dbc2vss_mapping(vss_observation.dbc_name, vss_observation.vss_name)
-                    value = vss_mapping.transform_value(vss_observation.raw_value)
-                    if value is None:
-                        log.warning(
-                            "Value ignored for dbc %s to VSS %s, from raw value %s of type %s",
-                            vss_observation.dbc_name, vss_observation.vss_name, vss_observation.raw_value, type(vss_observation.raw_value)
-                        )
-                    elif not vss_mapping.change_condition_fulfilled(value):
-                        log.debug("Value condition not fulfilled for VSS %s, value %s", vss_observation.vss_name, value)
-                    else:
-                        output.write(f"Datapoint({vss_observation.vss_name}, {value}, {vss_observation.time})\n")
-                        output.flush()
-                        log.debug("Processed DataPoint(%s, %s, %f)", vss_observation.vss_name, value, vss_observation.time)
-                        messages_processed += 1
-                        if messages_processed >= (2 * last_sent_log_entry):
-                            log.info(
-                                "Processed %d CAN messages, maximum queue size: %d",
-                                messages_processed, queue_max_size
-                            )
-                            last_sent_log_entry = messages_processed
+                    self._process_observation(vss_observation)
                 except queue.Empty:
                     pass
                 except Exception as e:
                     log.error("Exception caught in main loop: %s", e, exc_info=True)
         finally:
-            if self._output_file and output != sys.stdout:
-                output.close()
+            self._stop_output()
+
+    def _stop_output(self):
+        self._output.stop()
+        if self._recorder is not None:
+            self._recorder.stop()
 
 def _parse_config(filename: str) -> configparser.ConfigParser:
     configfile = None
@@ -213,10 +283,45 @@ def _get_command_line_args_parser() -> argparse.ArgumentParser:
         "--dbcfile", metavar="FILE", help="A (comma-separated) list of DBC files to read message definitions from."
     )
     parser.add_argument(
-        "--dumpfile", metavar="FILE", help="Replay recorded CAN traffic from dumpfile"
+        "--dumpfile", metavar="FILE", help="Replay recorded CAN traffic from dumpfile "
+                                           "(a comma-separated list of files when using --convert)"
+    )
+    parser.add_argument(
+        "--convert",
+        action="store_true",
+        help="Convert the dumpfile(s) to VSS datapoints as fast as possible instead of replaying them in real time",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        metavar="COUNT",
+        help="The number of processes converting dump files (defaults to the number of CPUs)",
     )
     parser.add_argument("--canport", metavar="DEVICE", help="The name of the device representing the CAN bus")
     parser.add_argument("--use-j1939", action="store_true", help="Use J1939 messages on the CAN bus")
+    parser.add_argument(
+        "--queue-mode",
+        help="Which CAN signal values to send: fifo sends all values in the order they have been received, "
+             "latest only sends the latest value received for each VSS data entry, "
+             "inline sends all values directly from the thread reading from the CAN bus",
+        choices=[mode.value for mode in observationqueue.QueueMode]
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        metavar="SIZE",
+        help="The maximum number of CAN signal values waiting to be processed",
+    )
+    parser.add_argument(
+        "--queue-overflow-policy",
+        help="What to do with CAN signal values received while the maximum number of values is waiting",
+        choices=[policy.value for policy in observationqueue.OverflowPolicy]
+    )
+    parser.add_argument(
+        "--compile-pipelines",
+        action="store_true",
+        help="Generate a function per CAN frame that decodes and transforms the mapped signals in one step",
+    )
     parser.add_argument(
         "--use-socketcan",
         action="store_true",
@@ -242,6 +347,52 @@ def _get_command_line_args_parser() -> argparse.ArgumentParser:
         metavar="FILE",
         help="File to write VSS datapoints to (defaults to console if not specified)",
     )
+    parser.add_argument(
+        "--output-format",
+        help="How to write VSS datapoints: text writes Datapoint(path, value, time) per line, "
+             "jsonl writes a JSON object per line, csv writes comma-separated values with a header line",
+        choices=[output_format.value for output_format in outputwriter.OutputFormat]
+    )
+    parser.add_argument(
+        "--output-buffer-size",
+        type=int,
+        metavar="SIZE",
+        help="The number of VSS datapoints buffered before they are written",
+    )
+    parser.add_argument(
+        "--output-flush-interval",
+        type=int,
+        metavar="MILLISECONDS",
+        help="The maximum time buffered VSS datapoints wait until they are written",
+    )
+    parser.add_argument(
+        "--output-max-file-size",
+        type=int,
+        metavar="BYTES",
+        help="The size after which the output file is rotated, 0 disables rotation",
+    )
+    parser.add_argument(
+        "--output-max-files",
+        type=int,
+        metavar="COUNT",
+        help="The number of rotated output files to keep",
+    )
+    parser.add_argument(
+        "--output-compress",
+        action="store_true",
+        help="Compress rotated output files with gzip",
+    )
+    parser.add_argument(
+        "--record-dir",
+        metavar="DIRECTORY",
+        help="A directory to additionally record VSS datapoints in, to be queried with query_recording.py",
+    )
+    parser.add_argument(
+        "--record-max-file-size",
+        type=int,
+        metavar="BYTES",
+        help="The size after which a new recording file is started",
+    )
     parser.add_argument(
         "--lax-dbc-parsing",
         dest="strict",
@@ -287,7 +438,7 @@ def main(argv):
     else:
         canport = config.get(CONFIG_SECTION_CAN, CONFIG_OPTION_PORT, fallback=None)
 
-    if not canport:
+    if not canport and not args.convert:
         parser.error("No CAN port specified")
 
     if args.dbc_default:
@@ -311,6 +462,48 @@ def main(argv):
     else:
         use_j1939 = config.getboolean(CONFIG_SECTION_CAN, CONFIG_OPTION_J1939, fallback=False)
 
+    if args.queue_mode:
+        queue_mode_name = args.queue_mode
+    elif os.environ.get("QUEUE_MODE"):
+        queue_mode_name = os.environ.get("QUEUE_MODE")
+    else:
+        queue_mode_name = config.get(CONFIG_SECTION_GENERAL, CONFIG_OPTION_QUEUE_MODE,
+                                     fallback=observationqueue.QueueMode.FIFO.value)
+    try:
+        queue_mode = observationqueue.QueueMode(queue_mode_name)
+    except ValueError:
+        parser.error(f"Unknown queue mode: {queue_mode_name}")
+
+    if args.queue_size:
+        queue_size = args.queue_size
+    elif os.environ.get("QUEUE_SIZE"):
+        queue_size = int(os.environ.get("QUEUE_SIZE"))  # type: ignore[arg-type]
+    else:
+        queue_size = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_QUEUE_SIZE,
+                                   fallback=observationqueue.DEFAULT_QUEUE_SIZE)
+    if queue_size <= 0:
+        parser.error("Queue size must be greater than 0")
+
+    if args.queue_overflow_policy:
+        queue_overflow_policy_name = args.queue_overflow_policy
+    elif os.environ.get("QUEUE_OVERFLOW_POLICY"):
+        queue_overflow_policy_name = os.environ.get("QUEUE_OVERFLOW_POLICY")
+    else:
+        queue_overflow_policy_name = config.get(CONFIG_SECTION_GENERAL, CONFIG_OPTION_QUEUE_OVERFLOW_POLICY,
+                                                fallback=observationqueue.OverflowPolicy.COALESCE.value)
+    try:
+        queue_overflow_policy = observationqueue.OverflowPolicy(queue_overflow_policy_name)
+    except ValueError:
+        parser.error(f"Unknown queue overflow policy: {queue_overflow_policy_name}")
+
+    if args.compile_pipelines:
+        use_compiled_pipelines = True
+    elif os.environ.get("COMPILE_PIPELINES"):
+        use_compiled_pipelines = True
+    else:
+        use_compiled_pipelines = config.getboolean(CONFIG_SECTION_CAN, CONFIG_OPTION_COMPILED_PIPELINES,
+                                                   fallback=False)
+
     if args.use_physical_can:
         use_physical_can = True
     elif os.environ.get("USE_PHYSICAL_CAN"):
@@ -338,7 +531,109 @@ def main(argv):
             parser.error("Cannot use elmcan without configuration in [elmcan] section!")
         elmcan_config = config[CONFIG_SECTION_ELMCAN]
 
-    feeder = Feeder(output_file=args.output_file, dbc2vss=use_dbc2val, vss2dbc=False)
+    if args.output_format:
+        output_format_name = args.output_format
+    elif os.environ.get("OUTPUT_FORMAT"):
+        output_format_name = os.environ.get("OUTPUT_FORMAT")
+    else:
+        output_format_name = config.get(CONFIG_SECTION_GENERAL, CONFIG_OPTION_OUTPUT_FORMAT,
+                                        fallback=outputwriter.OutputFormat.TEXT.value)
+    try:
+        output_format = outputwriter.OutputFormat(output_format_name)
+    except ValueError:
+        parser.error(f"Unknown output format: {output_format_name}")
+
+    if args.output_buffer_size:
+        output_buffer_size = args.output_buffer_size
+    elif os.environ.get("OUTPUT_BUFFER_SIZE"):
+        output_buffer_size = int(os.environ.get("OUTPUT_BUFFER_SIZE"))  # type: ignore[arg-type]
+    else:
+        output_buffer_size = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_OUTPUT_BUFFER_SIZE,
+                                           fallback=outputwriter.DEFAULT_BUFFER_SIZE)
+    if output_buffer_size <= 0:
+        parser.error("Output buffer size must be greater than 0")
+
+    if args.output_flush_interval:
+        output_flush_interval = args.output_flush_interval
+    elif os.environ.get("OUTPUT_FLUSH_INTERVAL"):
+        output_flush_interval = int(os.environ.get("OUTPUT_FLUSH_INTERVAL"))  # type: ignore[arg-type]
+    else:
+        output_flush_interval = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_OUTPUT_FLUSH_INTERVAL,
+                                              fallback=int(outputwriter.DEFAULT_FLUSH_INTERVAL * 1000))
+    if output_flush_interval <= 0:
+        parser.error("Output flush interval must be greater than 0")
+
+    if args.output_max_file_size is not None:
+        output_max_file_size = args.output_max_file_size
+    elif os.environ.get("OUTPUT_MAX_FILE_SIZE"):
+        output_max_file_size = int(os.environ.get("OUTPUT_MAX_FILE_SIZE"))  # type: ignore[arg-type]
+    else:
+        output_max_file_size = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_OUTPUT_MAX_FILE_SIZE,
+                                             fallback=outputwriter.DEFAULT_MAX_FILE_SIZE)
+    if output_max_file_size < 0:
+        parser.error("Maximum output file size must not be negative")
+
+    if args.output_max_files:
+        output_max_files = args.output_max_files
+    elif os.environ.get("OUTPUT_MAX_FILES"):
+        output_max_files = int(os.environ.get("OUTPUT_MAX_FILES"))  # type: ignore[arg-type]
+    else:
+        output_max_files = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_OUTPUT_MAX_FILES,
+                                         fallback=outputwriter.DEFAULT_MAX_FILES)
+    if output_max_files <= 0:
+        parser.error("Number of rotated output files must be greater than 0")
+
+    if args.output_compress:
+        output_compress = True
+    elif os.environ.get("OUTPUT_COMPRESS"):
+        output_compress = os.environ.get("OUTPUT_COMPRESS").lower() in ('true', '1', 'yes')
+    else:
+        output_compress = config.getboolean(CONFIG_SECTION_GENERAL, CONFIG_OPTION_OUTPUT_COMPRESS, fallback=False)
+
+    if not args.output_file and output_max_file_size > 0:
+        log.warning("Ignoring maximum output file size since values are written to the console")
+
+    output = outputwriter.OutputWriter(
+        file_name=args.output_file, output_format=output_format, buffer_size=output_buffer_size,
+        flush_interval=output_flush_interval / 1000, max_file_size=output_max_file_size,
+        max_files=output_max_files, compress=output_compress, block=args.convert)
+
+    if args.convert:
+        if not candumpfile:
+            parser.error("No dump file(s) specified to convert")
+        if use_j1939:
+            parser.error("Converting dump files is not supported in J1939 mode")
+        if args.jobs is not None and args.jobs <= 0:
+            parser.error("Number of jobs must be greater than 0")
+        converter = BulkConverter(mapping_file=mappingfile, dbc_file_names=dbcfile.split(','),
+                                  use_strict_parsing=args.strict, use_compiled_pipelines=use_compiled_pipelines,
+                                  jobs=args.jobs)
+        output.start()
+        try:
+            converter.convert(candumpfile.split(','), output)
+        finally:
+            output.stop()
+        return 0
+
+    if args.record_dir:
+        record_dir = args.record_dir
+    elif os.environ.get("RECORD_DIR"):
+        record_dir = os.environ.get("RECORD_DIR")
+    else:
+        record_dir = config.get(CONFIG_SECTION_GENERAL, CONFIG_OPTION_RECORD_DIR, fallback=None)
+    if args.record_max_file_size:
+        record_max_file_size = args.record_max_file_size
+    elif os.environ.get("RECORD_MAX_FILE_SIZE"):
+        record_max_file_size = int(os.environ.get("RECORD_MAX_FILE_SIZE"))  # type: ignore[arg-type]
+    else:
+        record_max_file_size = config.getint(CONFIG_SECTION_GENERAL, CONFIG_OPTION_RECORD_MAX_FILE_SIZE,
+                                             fallback=recorder.DEFAULT_MAX_FILE_SIZE)
+
+    feeder = Feeder(output=output, dbc2vss=use_dbc2val, vss2dbc=False,
+                    queue_size=queue_size, queue_overflow_policy=queue_overflow_policy,
+                    queue_mode=queue_mode)
+    if record_dir:
+        feeder.set_recorder(recorder.ColumnarRecorder(record_dir, max_file_size=record_max_file_size))
 
     def signal_handler(signal_received, *_):
         log.info("Received signal %s, stopping...", signal_received)
@@ -359,6 +654,7 @@ def main(argv):
         candumpfile=candumpfile,
         use_j1939=use_j1939,
         use_strict_parsing=args.strict,
+        use_compiled_pipelines=use_compiled_pipelines,
         can_fd=args.canfd,
         use_physical_can=use_physical_can  
     )